@@ -20,628 +20,446 @@ creates a new leaf floating downward in oscillating pattern.
 
 Note: 
 To be effective, the mouse click should not be too close to ants nest.
-"""
-import arcade
-import random
-import math
-import os
-
-# --- Constants ---
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 560
-SCREEN_TITLE = "Arcade Ants Hunt"
-FPS = 30   # Frames per sec
-
-SCALING_LEAF = 1.4
-SCALING_BIG_ANT = 1.2
-SCALING_SMALL_ANT = 0.8
-SCALING_SPIDER = 1.0
-
-COUNT_ANTS = 8
-COUNT_SPIDERS = 4
-COUNT_LEAFS = 4
-SPEED_BIG_ANT = 3.0
-SPEED_SMALL_ANT = 2.5
-
-NEST_RADIUS = 120
-STORE_RADIUS = (
-    SCREEN_HEIGHT - 10 - 2 * NEST_RADIUS) / 4
-PRISON_RADIUS = STORE_RADIUS
-NEST_CENTER_X = SCREEN_WIDTH - NEST_RADIUS - 10
-NEST_CENTER_Y = SCREEN_HEIGHT / 2
-STORE_CENTER_X = NEST_CENTER_X
-STORE_CENTER_Y = (
-    NEST_CENTER_Y
-    + NEST_RADIUS
-    + STORE_RADIUS)
-PRISON_CENTER_X = NEST_CENTER_X
-PRISON_CENTER_Y = (
-    NEST_CENTER_Y
-    - NEST_RADIUS
-    - PRISON_RADIUS)
-
-class Ant(arcade.Sprite):
-
-    def __init__(self, imgFile, scaleFactor, speed):
-
-        super().__init__(imgFile, scaleFactor)
-
-        self.targetSprite = None
-
-        # For angular squiggle
-        self.dTilt = 0.5  # degrees
-        self.tiltMin = -2.5
-        self.tiltMax = 2.5
-        self.tilt = 0
-
-        # For perpetual linear movement within defined boundaries
-        # speed argument is supplied while creating the Ant() object
-        # in class GamePlay.
-        self.speed = speed
-
-        self.xMin = NEST_CENTER_X - 0.7 * NEST_RADIUS
-        self.yMin = NEST_CENTER_Y - 0.7 * NEST_RADIUS
-        self.xMax = self.xMin + 1.4 * NEST_RADIUS
-        self.yMax = self.yMin + 1.4 * NEST_RADIUS
-        self.dx = 0.3
-        self.dy = 0.3
-
-        # Mode:
-        # 0 - Idling in nest.
-        # 1 - Moving outward to capture target.
-        # 2 - Carrying target to holding point (Store or Prison).
-        # 3 - Returning to nest after completion of job.
-        self.mode = 0
-
-        # Hit Rank:
-        # (Used for re-positioning of ant pair after hitting the target)
-        # 1 - It is the first ant to hit the given target
-        # 2 - It is the 2nd ant to hit the given target
-        self.hitRank = 0
-
-    def chaseTarget(self):
-        """
-        This function handles ant activities covering tracking &
-        capture of target, dragging it to holding point (Spider Prison
-        or Leaf Store) and finally - return to ants nest.
-
-        Note:
-            change_x & change_y are built-in attributes of
-            arcade.Sprite class
-        """
-        # No action if there is no target assigned
-        if not self.targetSprite:
-            return
-                
-        # Get the destination location
-        if self.mode == 1:
-            # It is outward trip towards the target.
-            dest_x = self.targetSprite.center_x
-            dest_y = self.targetSprite.center_y
-        elif self.mode == 2:
-            # Dragging the target to holding point.
-            if self.targetSprite.guid == "S":
-                # If Spider - To Prison
-                dest_x = PRISON_CENTER_X
-                dest_y = PRISON_CENTER_Y
-            else:
-                # If Leaf - To Store
-                dest_x = STORE_CENTER_X
-                dest_y = STORE_CENTER_Y
-        else:
-            # Return To Nest
-            dest_x = NEST_CENTER_X
-            dest_y = NEST_CENTER_Y
-
-        # Distance upto destination
-        span = self.getDiagonal(
-            dest_x - self.center_x, 
-            dest_y - self.center_y)
-
-        # Accelerate on approaching target by using
-        # multiplying  factor mf
-        if self.mode == 1:
-            if span < 100:
-                mf = 12
-            elif span < 200:
-                mf = 6
-            elif span < 300:
-                mf = 3
-            else:
-                mf = 1
-        else:
-            # Return at a uniform speed, faster than normal
-            mf = 4
-
-        # If too close to the target, snap into it & start return journey
-        # after both ants of the pair have hit the target.
-        if span <= self.getDiagonal(
-                    self.change_x * mf,  
-                    self.change_y * mf):
-            self.center_x = dest_x
-            self.center_y = dest_y
-
-            if self.mode == 1:
-                # We have reached the end of outward trip
-                # Prepare for moving to holding point:
-                self.targetSprite.hitCount = self.targetSprite.hitCount + 1
-
-                # Assign hitRank
-                # (i.e. whether the ant is first or second one to hit the target)
-                if self.hitRank == 0:
-                    self.hitRank = self.targetSprite.hitCount
-
-                # Reposition the ant pair as per hitRank
-                if self.hitRank > 1:
-                    self.center_x = self.targetSprite.center_x + 5
-                    self.center_y = self.targetSprite.center_y + 5
-                else:
-                    self.center_x = self.targetSprite.center_x - 5
-                    self.center_y = self.targetSprite.center_y - 5
-
-                # Set the velocity based upon normallized vector
-                # taking into account the pertinent holding point.
-                if self.targetSprite.guid == "S":
-                    self.setVelocity(
-                        PRISON_CENTER_X, 
-                        PRISON_CENTER_Y)
-                else:
-                    self.setVelocity(
-                        STORE_CENTER_X, 
-                        STORE_CENTER_Y)
-                
-                # Set the mode for moving to holding point
-                self.mode = 2
-
-            elif self.mode == 2:
-                # We have reached the holding point
-                if self.targetSprite.guid == "S":
-                    self.targetSprite.center_x = PRISON_CENTER_X
-                    self.targetSprite.center_y = PRISON_CENTER_Y
-                    self.scatter(self.targetSprite, 0.7 * PRISON_RADIUS)
-                else:
-                    self.targetSprite.center_x = STORE_CENTER_X
-                    self.targetSprite.center_y = STORE_CENTER_Y
-                    self.scatter(self.targetSprite, 0.7 * STORE_RADIUS)
-                    
-                # Proceed to the nest now
-                self.setVelocity(
-                    NEST_CENTER_X, 
-                    NEST_CENTER_Y)
-
-                # Set the mode for returning to ants nest
-                self.mode = 3
-
-            elif self.mode == 3:
-                # We have returned to ants nest
-
-                # Stop motion
-                self.change_x = 0
-                self.change_y = 0
-                self.hitRank = 0
-
-                # Reposition the returning ants via random scatter
-                self.scatter(self, 0.7 * NEST_RADIUS)
-                
-                # Set the mode to idle
-                self.mode = 0
-
-                # Job Finished - De-assign targetSprite
-                self.targetSprite = None
-
-        else:
-            # Make sure outward or inward movement takes
-            # place only when a pair of ants is active for same target
-            if ((self.mode <= 1 
-                        and  self.targetSprite.lockCount > 1)
-                        or (self.mode > 1 
-                        and  self.targetSprite.hitCount > 1)):
-                self.center_x += self.change_x * mf
-                self.center_y += self.change_y * mf
-
-                if self.mode == 2:
-                    # Drag the target to holding point
-                    # by linking it to ant movement.
-                    self.targetSprite.center_x = self.center_x + 5
-                    self.targetSprite.center_y = self.center_y + 5
-
-        # Constant tracking of moving target.
-        if self.mode == 1:
-            self.setVelocity(dest_x, dest_y)         
-
-    def setVelocity(self, dest_x, dest_y):
-        # Calculate the angle in radians between the start points
-        # and end points. This is the angle the ant will follow.
-        x_diff = dest_x - self.center_x
-        y_diff = dest_y - self.center_y
-
-        # Vector angle in radians
-        angle = math.atan2(y_diff, x_diff)
-
-        # Taking into account the angle, calculate change_x
-        # and change_y. Velocity is how fast the ant travels.
-        self.change_x = math.cos(angle) * self.speed
-        self.change_y = math.sin(angle) * self.speed
-
-        # Rotate the ant so as to point towards destination.
-        # Sprite angle is to be applied in degrees
-        self.angle = math.degrees(angle)
-
-    def getDiagonal(self, spanX, spanY):
-        return math.sqrt(spanX**2 + spanY**2)
-
-    def getVectorAngleRadians(
-                    self, startX, startY, destX, destY):
-        return math.atan2(
-            (destY - startY), (destX - startX))
-
-    def getVectorAngleDegrees(
-                    self, startX, startY, destX, destY):
-        return math.degrees(
-            self.getVectorAngleRadians(
-            startX, startY, destX, destY))
-
-    def scatter(self, mySprite, halfRange):
-        # Random scattering of sprite object within given range.
-        hr = int(halfRange)
-        fr = 2 * hr
-        mySprite.center_x = \
-            mySprite.center_x + random.randrange(fr) - hr
-        mySprite.center_y = \
-            mySprite.center_y + random.randrange(fr) - hr
-
-    def animate(self):
-        # Some squiggling animation:
-        self.tilt = self.tilt + self.dTilt
-        
-        if self.tilt > self.tiltMax:
-            self.dTilt = -self.dTilt
-            self.tilt = self.tiltMax
-
-        if self.tilt < self.tiltMin:
-            self.dTilt = -self.dTilt
-            self.tilt = self.tiltMin
-
-        self.angle = self.angle + self.tilt
 
-    def idleMove(self):
-        # Perpetual movement within specified boundaries
-        if self.mode != 0:
-            return
-
-        self.center_x = self.center_x + self.dx
-        if self.center_x > self.xMax:
-            self.dx = - self.dx
-            self.center_x = self.xMax
-
-        if self.center_x < self.xMin:
-            self.dx = - self.dx
-            self.center_x = self.xMin
-
-        self.center_y = self.center_y + self.dy
-        if self.center_y > self.yMax:
-            self.dy = - self.dy
-            self.center_y = self.yMax
-
-        if self.center_y < self.yMin:
-            self.dy = - self.dy
-            self.center_y = self.yMin
-
-class Leaf(arcade.Sprite):
-    def __init__(self, imgFile, scaleFactor, centerX):
-        super().__init__(imgFile, scaleFactor)
-        self.lockCount = 0
-        self.hitCount = 0
-
-        # For angular oscillation
-        self.dTilt = 0.2  # degrees
-        self.tiltMin = -2.5
-        self.tiltMax = 2.5
-        self.tilt = 0
-
-        # For horizontal oscillation while floating downwards.
-        self.dx = 1.0
-        self.dy = -0.9
-        self.xMin = centerX - 30
-        self.xMax = centerX + 30
-        self.yMin = 0
-        self.yMax = SCREEN_HEIGHT
-
-        # For time delay in sensing target
-        self.timeDelay = 0
-
-    def animate(self):
-        # Some squiggling animation:
-        if self.hitCount > 0:
-            return
-
-        # Angular oscillation
-        self.tilt = self.tilt + self.dTilt
-        
-        if self.tilt > self.tiltMax:
-            self.dTilt = -self.dTilt
-            self.tilt = self.tiltMax
-
-        if self.tilt < self.tiltMin:
-            self.dTilt = -self.dTilt
-            self.tilt = self.tiltMin
-
-        self.angle = self.angle + self.tilt
-
-        # Horizontal oscillation while floating downwards.
-        self.center_x = self.center_x + self.dx
-        if self.center_x > self.xMax:
-            self.dx = -self.dx
-            self.center_x = self.xMax
-
-        if self.center_x < self.xMin:
-            self.dx = -self.dx
-            self.center_x = self.xMin
-
-        self.center_y = self.center_y + self.dy
-        if self.center_y < self.yMin:
-            self.center_y = self.yMax
-
-class Spider(arcade.Sprite):
-    def __init__(self, imgFile, scaleFactor):
-        super().__init__(imgFile, scaleFactor)
-        self.lockCount = 0
-        self.hitCount = 0
-
-        # For angular ooscillation
-        self.dTilt = 0.5  # degrees
-        self.tiltMin = -2.5
-        self.tiltMax = 2.5
-        self.tilt = 0
-
-        # For perpetual movement within given boundaries.
-        self.dx = 2.0
-        self.dy = 3.5
-        self.xMin = 0
-        self.xMax = NEST_CENTER_X - NEST_RADIUS - 100
-        self.yMin = 0
-        self.yMax = SCREEN_HEIGHT
-
-        # For time delay in sensing target
-        self.timeDelay = 0
-        
-    def animate(self):
-        # Some squiggling animation:
-        if self.hitCount > 0:
-            return
-
-        # For angular ooscillation
-        self.tilt = self.tilt + self.dTilt
-        
-        if self.tilt > self.tiltMax:
-            self.dTilt = -self.dTilt
-            self.tilt = self.tiltMax
-
-        if self.tilt < self.tiltMin:
-            self.dTilt = -self.dTilt
-            self.tilt = self.tiltMin
-
-        self.angle = self.angle + self.tilt
+The game logic itself lives in ants_world.py (class World), which runs
+without any window. GamePlay below only renders the World & feeds
+mouse input into it.
+"""
+import argparse
+import time
 
-        # For perpetual movement within given boundaries.
-        self.center_x = self.center_x + self.dx
-        if self.center_x > self.xMax:
-            self.dx = -self.dx
-            self.center_x = self.xMax
+# Start of the startup time report (--startup)
+STARTED = time.perf_counter()
 
-        if self.center_x < self.xMin:
-            self.dx = -self.dx
-            self.center_x = self.xMin
+import arcade
+import arcade.gl.geometry
+
+import ants_overlap
+import ants_snapshot
+import ants_shards
+import ants_stream
+import ants_upload
+from ants_assets import loadTextures, TEXTURE_FILES
+from ants_camera import Camera, ZOOM_STEP
+from ants_clock import FixedStepper, WARP_MAX
+from ants_events import EventLog
+from ants_governor import QualityGovernor, QUALITY_MINIMAL
+from ants_pool import Pool
+from ants_replay import SpawnRecorder
+from ants_profile import FrameProfiler, StartupTimer
+from ants_engine import KIND_SPIDER, KIND_LEAF
+from ants_world import (
+    World,
+    DEMO_OBSTACLES,
+    TARGET_LOOKS,
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    TICK,
+    NEST_RADIUS,
+    STORE_RADIUS,
+    PRISON_RADIUS,
+    NEST_CENTER_X,
+    NEST_CENTER_Y,
+    STORE_CENTER_X,
+    STORE_CENTER_Y,
+    PRISON_CENTER_X,
+    PRISON_CENTER_Y)
 
-        self.center_y = self.center_y + self.dy
-        if self.center_y > self.yMax:
-            self.dy = -self.dy
-            self.center_y = self.yMax
+SCREEN_TITLE = "Arcade Ants Hunt"
+BACKGROUND_COLOR = (235, 235, 235)
+OBSTACLE_COLOR = (160, 150, 140)
+
+# Frames drawn per sec. The world itself ticks at ants_world.FPS,
+# frames in between are interpolated.
+DRAW_FPS = 60
+
+# Time warp multiplier selected by number keys
+WARP_KEYS = {
+    arcade.key.KEY_1: 1.0,
+    arcade.key.KEY_2: 10.0,
+    arcade.key.KEY_3: 100.0,
+    arcade.key.KEY_0: WARP_MAX,
+    }
+
+# Key toggling the phase timing overlay
+TIMINGS_KEY = arcade.key.F3
+
+# Key saving a snapshot of the world (see ants_snapshot.py) & its file
+SNAPSHOT_KEY = arcade.key.F5
+SNAPSHOT_FILE = "world.antsnap"
+
+# Frames between refreshes of the timing overlay text
+TIMINGS_REFRESH = 15
+
+# Window for a multi-colony map, which is viewed through a Camera
+MAP_VIEW_WIDTH = 1280
+MAP_VIEW_HEIGHT = 840
+
+# Map view: arrow keys pan by PAN_SPEED window pixels per sec, the
+# mouse wheel zooms, dragging with the middle button pans
+PAN_KEYS = {
+    arcade.key.LEFT: (-1, 0),
+    arcade.key.RIGHT: (1, 0),
+    arcade.key.DOWN: (0, -1),
+    arcade.key.UP: (0, 1),
+    }
+PAN_SPEED = 600
+
+# World pixels around the view in which sprites are still drawn, so
+# that those partly in view are not cut off
+SPRITE_MARGIN = 32
+
+# Sprites pre-built during setup
+SPRITE_POOL_SIZE = 256
+
+# Draws the texture of the StaticLayer over the whole window.
+# The layer is opaque, so alpha is ignored.
+LAYER_VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+in vec2 in_uv;
+out vec2 uv;
+void main() {
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+    uv = in_uv;
+}
+"""
+LAYER_FRAGMENT_SHADER = """
+#version 330
+uniform sampler2D layer;
+in vec2 uv;
+out vec4 fragColor;
+void main() {
+    fragColor = vec4(texture(layer, uv).rgb, 1.0);
+}
+"""
 
-        if self.center_y < self.yMin:
-            self.dy = -self.dy
-            self.center_y = self.yMin
+class StaticLayer:
+    """
+    The parts of the scene that do not move (instructions, zone
+    labels & circles, delivered prey), rendered into an offscreen
+    framebuffer that is kept. Each frame the result is drawn with a
+    single call, as one screen sized quad.
+
+    Text layout is one of the most expensive things arcade does, so
+    this saves five draw_text & three draw_circle_outline calls per
+    frame, plus a sprite per delivered target.
+    """
+
+    def __init__(self, window, drawFunc):
+        self.window = window
+        self.drawFunc = drawFunc
+        self.fbo = None
+        self.quad = None
+        self.program = None
+
+    def build(self):
+        # Needs an active GL context, so it is done on first use
+        ctx = self.window.ctx
+        self.fbo = ctx.framebuffer(color_attachments=[
+            ctx.texture((SCREEN_WIDTH, SCREEN_HEIGHT), components=4)])
+        self.quad = arcade.gl.geometry.quad_2d_fs()
+        self.program = ctx.program(
+            vertex_shader=LAYER_VERTEX_SHADER,
+            fragment_shader=LAYER_FRAGMENT_SHADER)
+        self.program["layer"] = 0
+
+        with self.fbo.activate():
+            self.fbo.clear(BACKGROUND_COLOR + (255,))
+            self.drawFunc()
+
+    def rebuild(self):
+        # Start over from drawFunc on next use, dropping stamps
+        self.fbo = None
+
+    def stamp(self, spriteList):
+        # Paint the sprites into the layer for good
+        if self.fbo is None:
+            self.build()
+        with self.fbo.activate():
+            spriteList.draw()
+
+    def draw(self):
+        if self.fbo is None:
+            self.build()
+        self.fbo.color_attachments[0].use(0)
+        self.quad.render(self.program)
+
+class RowSprites:
+    """
+    The sprites of a view of a world simulated elsewhere, placed at
+    rows (sprite code, x, y, angle) from source(), a callable giving
+    them as a list or flat (see ants_upload.fillRows). Each sprite
+    code (see ants_shards.SPRITE_LOOKS) has an ants_upload.SpriteBatch
+    of its looks, its sprites taken from spritePool.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.textures = None
+        self.spritePool = None
+        self.batches = None
+
+    def load(self):
+        self.textures = loadTextures(TEXTURE_FILES)
+        self.spritePool = Pool(arcade.Sprite, SPRITE_POOL_SIZE)
+        self.batches = {
+            code: ants_upload.SpriteBatch(
+                arcade.SpriteList(), self.textures[imgFile], scale,
+                self.spritePool)
+            for code, (imgFile, scale) in ants_shards.SPRITE_LOOKS.items()}
+
+    def sync(self):
+        # Place the sprites at the rows source() gives now
+        ants_upload.fillRows(self.batches, self.source())
+
+    def draw(self):
+        for batch in self.batches.values():
+            batch.draw()
 
 class GamePlay(arcade.Window):
     """ Our custom Window Class"""
 
-    def __init__(self):
+    def __init__(
+            self, seed=None, recordPath=None, snapshotPath=None,
+            eventsPath=None, obstacles=()):
         """ Initializer """       
         # Call the parent class initializer
         super().__init__(
             SCREEN_WIDTH,
             SCREEN_HEIGHT,
             SCREEN_TITLE,
-            update_rate=1/FPS)
+            update_rate=1/DRAW_FPS)
+
+        # The simulation being rendered & its fixed timestep clock
+        self.world = None
+        self.stepper = None
+
+        # World seed & file to record the session's spawns to
+        # (see ants_replay.py)
+        self.seed = seed
+        self.recordPath = recordPath
+        self.recorder = None
+
+        # Snapshot to start the world from instead of a fresh one
+        self.snapshotPath = snapshotPath
+
+        # Obstacles (x, y, radius) of a fresh world, see
+        # World.setObstacles; a snapshot brings its own
+        self.obstacles = obstacles
+
+        # File to log the world's lifecycle events to
+        # (see ants_events.py)
+        self.eventsPath = eventsPath
+        self.events = None
 
         # Variables that will hold sprite lists
         self.antsBig = None
-        self.antsBigIdle = None
         self.antsSmall = None
-        self.antsSmallIdle = None
         self.leafs = None
-        self.leafsFresh = None
         self.spiders = None
-        self.spidersFresh = None
-
-    def getTargetSpider(self, deltaTime):        
-        if (len(self.spidersFresh) > 0
-                    and len(self.antsBigIdle) > 1):
-
-            spider = self.spidersFresh[0]
-            # Time delay of 1.5 sec in sensing target
-            spider.timeDelay = spider.timeDelay + deltaTime
-            if spider.timeDelay > 1.5:
-                spider.timeDelay = 0
-                for n in range(2):
-                    ant = self.antsBigIdle[n]
-                    ant.mode = 1
-                    ant.targetSprite = spider
-                    ant.center_x = NEST_CENTER_X
-                    if n > 0:
-                        ant.center_y = NEST_CENTER_Y + 20
-                    else:
-                        ant.center_y = NEST_CENTER_Y - 20
-
-                # Set the target sprite lock count
-                spider.lockCount = spider.lockCount + 2
-
-        for ant in self.antsBig:
-            if ant.mode > 0:
-                # The ant is no longer in idle mode
-                # If both ants in the pair have locked on
-                # the target, call chaseTarget() method in Ant class
-                if ant.targetSprite.lockCount > 1:
-                    ant.chaseTarget()
-
-                # Remove active ant from idle list
-                if ant in self.antsBigIdle:
-                    self.antsBigIdle.remove(ant)
-            else:
-                # The ant is in idle mode. Append it to idle list.
-                if not ant in self.antsBigIdle:
-                    self.antsBigIdle.append(ant)
-
-        for spider in self.spiders:
-            # If the spider is targetted by more than one ant,
-            # remove it from fresh list
-            if spider.lockCount > 1 and spider in self.spidersFresh:
-                self.spidersFresh.remove(spider)
-
-    def getTargetLeaf(self, deltaTime):        
-        if (len(self.leafsFresh) > 0
-                    and len(self.antsSmallIdle) > 1):
-
-            leaf = self.leafsFresh[0]
-            # Time delay of 1.5 sec in sensing target
-            leaf.timeDelay = leaf.timeDelay + deltaTime
-            if leaf.timeDelay > 1.5:
-                leaf.timeDelay = 0
-                for n in range(2):
-                    ant = self.antsSmallIdle[n]
-                    ant.mode = 1
-                    ant.targetSprite = leaf
-                    ant.center_x = NEST_CENTER_X
-                    if n > 0:
-                        ant.center_y = NEST_CENTER_Y + 20
-                    else:
-                        ant.center_y = NEST_CENTER_Y - 20
-
-                # Set the target sprite lock count
-                leaf.lockCount = leaf.lockCount + 2
-
-        for ant in self.antsSmall:
-            if ant.mode > 0:
-                # The ant is no longer in idle mode
-                # If both ants in the pair have locked on
-                # the target, call chaseTarget() method in Ant class
-                if ant.targetSprite.lockCount > 1:
-                    ant.chaseTarget()
-
-                # Remove active ant from idle list
-                if ant in self.antsSmallIdle:
-                    self.antsSmallIdle.remove(ant)
-            else:
-                # The ant is in idle mode. Append it to idle list.
-                if not ant in self.antsSmallIdle:
-                    self.antsSmallIdle.append(ant)
 
-        for leaf in self.leafs:
-            # If the leaf is targetted by more than one ant,
-            # remove it from fresh list
-            if leaf.lockCount > 1 and leaf in self.leafsFresh:
-                self.leafsFresh.remove(leaf)
+        # Sprite drawn for each world entity
+        self.sprites = None
+
+        # Scratch list of the archived prey (see ants_archive.py) yet
+        # to be stamped into the static layer & archive entries
+        # stamped so far, per kind
+        self.stamps = None
+        self.stamped = None
+
+        # Image file -> arcade.Texture & free list of sprites
+        self.textures = None
+        self.spritePool = None
+
+        # Instructions, labels & zone circles, drawn once & cached
+        self.staticLayer = StaticLayer(self, self.drawStatic)
+
+        # Per-phase timings of on_update / on_draw & their overlay
+        self.profiler = FrameProfiler()
+        self.showTimings = False
+        self.timingLines = []
+        self.frameCount = 0
+
+        # Sheds cosmetic work while frames take longer than a tick
+        # (see ants_governor.py), fed with the time of each frame
+        self.governor = QualityGovernor(TICK)
+        self.frameStart = None
+        self.frameTime = None
+
+        # Optional ants_profile.StartupTimer, marked during setup()
+        self.startup = None
+
+    def addSprite(self, entity, spriteList):
+        # Pooled arcade sprite mirroring the given world entity
+        sprite = self.spritePool.acquire()
+        sprite.texture = self.textures[entity.imgFile]
+        sprite.scale = entity.scale
+        self.sprites[entity] = sprite
+        spriteList.append(sprite)
+
+    def dropSprite(self, target):
+        # World.releaseHook: the target goes back to the world's pool,
+        # its sprite back to ours. stampArchive() takes over drawing it.
+        sprite = self.sprites.pop(target)
+        sprite.remove_from_sprite_lists()
+        self.spritePool.release(sprite)
+
+    def stampArchive(self):
+        # Paint prey archived since the last call into the static
+        # layer, using pooled sprites just for the moment.
+        archive = self.world.archive
+        for kind in archive.kinds():
+            imgFile, scale = TARGET_LOOKS[kind]
+            start = self.stamped.get(kind, 0)
+            for x, y, angle in archive.since(kind, start):
+                sprite = self.spritePool.acquire()
+                sprite.texture = self.textures[imgFile]
+                sprite.scale = scale
+                sprite.center_x = x
+                sprite.center_y = y
+                sprite.angle = angle
+                self.stamps.append(sprite)
+            self.stamped[kind] = archive.count(kind)
+
+        if len(self.stamps) == 0:
+            return
+        self.staticLayer.stamp(self.stamps)
+        while len(self.stamps) > 0:
+            self.spritePool.release(self.stamps.pop())
+
+    def syncSprites(self, alpha=1.0):
+        # Copy entity positions & angles onto their sprites,
+        # interpolated between the last two ticks.
+        sprites = self.sprites
+        for entity, x, y, angle in self.world.lerpTransforms(alpha):
+            sprite = sprites[entity]
+            sprite.center_x = x
+            sprite.center_y = y
+            sprite.angle = angle
 
     def setup(self):
-        arcade.set_background_color((235, 235, 235))
+        arcade.set_background_color(BACKGROUND_COLOR)
+
+        if self.eventsPath is not None:
+            self.events = EventLog(self.eventsPath)
+        if self.snapshotPath is not None:
+            self.world = ants_snapshot.load(self.snapshotPath)
+            self.world.events = self.events
+            self.obstacles = self.world.obstacles
+        else:
+            self.world = World(seed=self.seed, obstacles=self.obstacles)
+            self.world.events = self.events
+            self.world.setup()
+        if self.recordPath is not None:
+            self.recorder = SpawnRecorder(self.world, self.recordPath)
+        self.world.profiler = self.profiler
+        self.world.releaseHook = self.dropSprite
+        self.stepper = FixedStepper(self.world, TICK)
+        if self.startup is not None:
+            self.startup.mark("setup.world")
+
+        # Images loaded once & shared by all sprites, see ants_assets.py
+        self.textures = loadTextures(TEXTURE_FILES)
+        if self.startup is not None:
+            self.startup.mark("assets")
+        self.spritePool = Pool(arcade.Sprite, SPRITE_POOL_SIZE)
 
         # Sprite lists
         self.antsBig = arcade.SpriteList()
-        self.antsBigIdle = arcade.SpriteList()
         self.antsSmall = arcade.SpriteList()
-        self.antsSmallIdle = arcade.SpriteList()
         self.leafs = arcade.SpriteList()
-        self.leafsFresh = arcade.SpriteList()
         self.spiders = arcade.SpriteList()
-        self.spidersFresh = arcade.SpriteList()
+        self.stamps = arcade.SpriteList()
+        self.stamped = {}
+        self.sprites = {}
 
-        # Create the leafs
-        # Keep margin of 100 from ant's nest
-        xRange = SCREEN_WIDTH - 2 * NEST_RADIUS - 100
+        for leaf in self.world.leafs:
+            self.addSprite(leaf, self.leafs)
 
-        # First leaf at x value of 50
-        spacing = (xRange - 50) / COUNT_LEAFS
-        
-        for n in range(COUNT_LEAFS):
-            centerX = 50 + n * spacing
-            leaf = Leaf(
-                "leaf.png", SCALING_LEAF, centerX)
-            leaf.guid = "L"
-            leaf.center_x = centerX
-            leaf.center_y = SCREEN_HEIGHT
-            self.leafs.append(leaf)
-            self.leafsFresh.append(leaf)
-
-        # Create the spiders
-        spacing = (SCREEN_HEIGHT - 40) / COUNT_SPIDERS
-        for n in range(COUNT_SPIDERS):
-            spider = Spider(
-                "spider.png", SCALING_SPIDER)
-            spider.guid = "S"
-            spider.center_x = 20
-            spider.center_y = 20 + n * spacing
-            self.spiders.append(spider)
-            self.spidersFresh.append(spider)
-
-        # Create the ants, half big & half small
-        rr = 0.7 * NEST_RADIUS
-        halfCount = COUNT_ANTS // 2
-        
-        for n in range(COUNT_ANTS):
-            if n < halfCount:
-                ant = Ant(
-                    "ant.png",
-                    SCALING_BIG_ANT,
-                    SPEED_BIG_ANT)
-                ant.center_x = NEST_CENTER_X
-                ant.center_y = NEST_CENTER_Y
-                ant.scatter(ant, rr)
-                self.antsBig.append(ant)
-                self.antsBigIdle.append(ant)
-            else:
-                ant = Ant(
-                    "ant.png",
-                    SCALING_SMALL_ANT,
-                    SPEED_SMALL_ANT)
-                ant.center_x = NEST_CENTER_X
-                ant.center_y = NEST_CENTER_Y
-                ant.scatter(ant, rr)
-                self.antsSmall.append(ant)
-                self.antsSmallIdle.append(ant)
+        for spider in self.world.spiders:
+            self.addSprite(spider, self.spiders)
+
+        for ant in self.world.antsBig:
+            self.addSprite(ant, self.antsBig)
+
+        for ant in self.world.antsSmall:
+            self.addSprite(ant, self.antsSmall)
+
+        self.syncSprites()
+        if self.startup is not None:
+            self.startup.mark("setup.sprites")
+
+    def frameStats(self):
+        # Phase name -> timing summary, see ants_profile.py
+        return self.profiler.stats()
+
+    def qualityStats(self):
+        # Quality level & its history, see ants_governor.py
+        return self.governor.stats()
 
     def on_update(self, deltaTime):
         """ Movement and game logic """
-        for ant in self.antsBig:
-            ant.animate()
-            ant.idleMove()
+        self.frameStart = time.perf_counter()
+        if self.frameTime is not None and self.stepper.warp != WARP_MAX:
+            # Under WARP_MAX every frame is full by design
+            self.world.setQuality(self.governor.observe(self.frameTime))
 
-        for leaf in self.leafs:
-            leaf.animate()
-            
-        for spider in self.spiders:
-            spider.animate()
+        prof = self.profiler
+        if prof is not None:
+            t = prof.start()
 
-        for ant in self.antsSmall:
-            ant.animate()
-            ant.idleMove()
+        self.stepper.advance(deltaTime)
 
-        self.getTargetSpider(deltaTime)
-        self.getTargetLeaf(deltaTime)
+        if prof is not None:
+            prof.lap("frame.update", t)
 
     def on_draw(self):
         """ Draw everything """
+        prof = self.profiler
+        if prof is not None:
+            t = prof.start()
+
+        self.syncSprites(self.stepper.alpha)
+        if prof is not None:
+            t = prof.lap("draw.sync", t)
+
         arcade.start_render()
 
+        self.stampArchive()
+        self.staticLayer.draw()
+        if prof is not None:
+            t = prof.lap("draw.static", t)
+
+        self.antsBig.draw()
+        if prof is not None:
+            t = prof.lap("draw.antsBig", t)
+
+        self.antsSmall.draw()
+        if prof is not None:
+            t = prof.lap("draw.antsSmall", t)
+
+        self.spiders.draw()
+        if prof is not None:
+            t = prof.lap("draw.spiders", t)
+
+        self.leafs.draw()
+        if prof is not None:
+            t = prof.lap("draw.leafs", t)
+
+        if self.showTimings:
+            self.drawTimings()
+            if prof is not None:
+                prof.lap("draw.overlay", t)
+
+        if self.frameStart is not None:
+            self.frameTime = time.perf_counter() - self.frameStart
+
+    def drawStatic(self):
+        """
+        Draw the parts of the scene that never change. Called only
+        once, while building the StaticLayer.
+        """
         txt = "Left Click For New Spider.\n"
         txt = txt + "Right Click For New Leaf"
         tx = 40
@@ -688,10 +506,28 @@ class GamePlay(arcade.Window):
             PRISON_CENTER_Y, 
             PRISON_RADIUS, (180, 0, 0), 4)
 
-        self.antsBig.draw()
-        self.antsSmall.draw()
-        self.spiders.draw()
-        self.leafs.draw()
+        # Obstacles the ants route round
+        for x, y, radius in self.obstacles:
+            arcade.draw_circle_filled(x, y, radius, OBSTACLE_COLOR)
+
+    def drawTimings(self):
+        # Timing overlay, text refreshed every few frames
+        self.frameCount = self.frameCount + 1
+        if (self.profiler is not None
+                and self.frameCount % TIMINGS_REFRESH == 1):
+            self.timingLines = self.profiler.report()
+            stats = self.governor.stats()
+            self.timingLines.append(
+                "quality %s, frame %.1f of %.1f ms, %d changes" % (
+                    stats["quality"], stats["frameMs"],
+                    stats["budgetMs"], stats["changes"]))
+
+        ty = SCREEN_HEIGHT - 20
+        for line in self.timingLines:
+            arcade.draw_text(
+                line, 10, ty, arcade.color.DARK_BLUE, 10,
+                font_name="Courier New")
+            ty = ty - 14
 
     def on_mouse_press(self, x, y, button, key_modifiers):
         """
@@ -706,34 +542,471 @@ class GamePlay(arcade.Window):
             pressed during this event. See :ref:`keyboard_modifiers`.
         """
         # No action if mouse click is too close to ants nest.
-        if  x > NEST_CENTER_X - NEST_RADIUS - 100:
+        if not self.world.canSpawnAt(x, y):
             return
         
         if button == arcade.MOUSE_BUTTON_LEFT:
             # Create Spider at clicked position
-            spider = Spider(
-                "spider.png", SCALING_SPIDER)
-            spider.guid = "S"
-            spider.center_x = x
-            spider.center_y = y
-            self.spiders.append(spider)
-            self.spidersFresh.append(spider)
+            spider = self.world.spawnSpider(x, y)
+            self.addSprite(spider, self.spiders)
         else:
             # Create Leaf at clicked position
-            leaf = Leaf(
-                "leaf.png", SCALING_LEAF, x)
-            leaf.guid = "L"
-            leaf.center_x = x
-            leaf.center_y = y
-            self.leafs.append(leaf)
-            self.leafsFresh.append(leaf)
+            leaf = self.world.spawnLeaf(x, y)
+            self.addSprite(leaf, self.leafs)
+
+    def on_key_press(self, key, key_modifiers):
+        """
+        Number keys select the time warp:
+            1 - real time, 2 - 10x, 3 - 100x, 0 - as fast as possible
+        F3 toggles the phase timing overlay.
+        F5 saves a snapshot of the world to SNAPSHOT_FILE.
+        """
+        if key in WARP_KEYS:
+            self.stepper.warp = WARP_KEYS[key]
+        elif key == TIMINGS_KEY:
+            self.showTimings = not self.showTimings
+            self.frameCount = 0
+        elif key == SNAPSHOT_KEY:
+            ants_snapshot.save(self.world, SNAPSHOT_FILE)
+
+    def closeLogs(self):
+        # Finish the spawn recording & event log, if any
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+class RemoteView(GamePlay):
+    """
+    GamePlay for a World that lives in another process: it draws rows
+    (sprite code, x, y, angle) instead of entities, from the source
+    given to setupSprites(), & stamps the rows of archived prey
+    gathered in stampRows.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        # RowSprites, as in ShardView
+        self.sprites = None
+
+        # Whether the rows changed since the last draw, & the archived
+        # prey received since, yet to be stamped
+        self.flipped = False
+        self.stampRows = []
+
+    def setupSprites(self, source):
+        # Sprites drawn at the rows from source(), see RowSprites
+        self.sprites = RowSprites(source)
+        self.sprites.load()
+        if self.startup is not None:
+            self.startup.mark("assets")
+        self.stamps = arcade.SpriteList()
+        self.flipped = True
+        if self.startup is not None:
+            self.startup.mark("setup.sprites")
+
+    def stampArchive(self):
+        # Paint the archived prey received into the static layer
+        if not self.stampRows:
+            return
+        spritePool = self.sprites.spritePool
+        for code, x, y, angle in self.stampRows:
+            imgFile, scale = ants_shards.SPRITE_LOOKS[code]
+            sprite = spritePool.acquire()
+            sprite.texture = self.sprites.textures[imgFile]
+            sprite.scale = scale
+            sprite.center_x = x
+            sprite.center_y = y
+            sprite.angle = angle
+            self.stamps.append(sprite)
+        self.stampRows = []
+
+        self.staticLayer.stamp(self.stamps)
+        while len(self.stamps) > 0:
+            spritePool.release(self.stamps.pop())
+
+    def on_draw(self):
+        """ Draw the last rows received """
+        prof = self.profiler
+        if prof is not None:
+            t = prof.start()
+
+        if self.flipped:
+            # The rows come interpolated
+            self.sprites.sync()
+            if prof is not None:
+                t = prof.lap("draw.sync", t)
+
+        arcade.start_render()
+
+        self.stampArchive()
+        self.staticLayer.draw()
+        if prof is not None:
+            t = prof.lap("draw.static", t)
+
+        self.sprites.draw()
+        self.flipped = False
+        if prof is not None:
+            t = prof.lap("draw.sprites", t)
+
+        if self.showTimings:
+            self.drawTimings()
+            if prof is not None:
+                prof.lap("draw.overlay", t)
+
+        if self.frameStart is not None:
+            self.frameTime = time.perf_counter() - self.frameStart
+
+class OverlapView(RemoteView):
+    """
+    GamePlay with its World simulated in a worker process (see
+    ants_overlap.py): the window only posts input & draws the last
+    state the worker finished, while the worker steps the next one.
+    """
+
+    def __init__(
+            self, seed=None, recordPath=None, snapshotPath=None,
+            eventsPath=None, obstacles=()):
+        super().__init__(
+            seed, recordPath, snapshotPath, eventsPath, obstacles)
+        # The worker owns the world, its recording & event log
+        self.sim = ants_overlap.OverlappedWorld(
+            seed=seed, snapshotPath=snapshotPath, recordPath=recordPath,
+            eventsPath=eventsPath, savePath=SNAPSHOT_FILE,
+            obstacles=obstacles)
+
+    def setup(self):
+        arcade.set_background_color(BACKGROUND_COLOR)
+
+        self.sim.start()
+        self.stepper = FixedStepper(self.sim, TICK)
+        if self.snapshotPath is not None:
+            # Only the header is read here, the worker loads the world
+            snap = ants_snapshot.Snapshot(self.snapshotPath)
+            self.obstacles = snap.header["config"].get("obstacles", [])
+            snap.close()
+        if self.startup is not None:
+            self.startup.mark("setup.world")
+
+        # The front buffer, which the worker already interpolated,
+        # read in place
+        self.setupSprites(self.sim.flatTransforms)
+        self.stampRows = self.sim.stamps()
+
+    def on_update(self, deltaTime):
+        """ Hand the ticks due to the worker, take its last state """
+        self.frameStart = time.perf_counter()
+        if self.frameTime is not None and self.stepper.warp != WARP_MAX:
+            # A frame lasts as long as the slower of drawing & the
+            # worker's round
+            self.sim.setQuality(self.governor.observe(max(
+                self.frameTime, self.sim.stats()["roundTime"])))
+
+        prof = self.profiler
+        if prof is not None:
+            t = prof.start()
+
+        self.stepper.advance(deltaTime)
+        if self.sim.swap(self.stepper.alpha):
+            self.flipped = True
+            self.stampRows.extend(self.sim.stamps())
+            if prof is not None:
+                prof.record("sim.round", self.sim.stats()["roundTime"])
+
+        if prof is not None:
+            prof.lap("frame.update", t)
+
+    def on_mouse_press(self, x, y, button, key_modifiers):
+        # As GamePlay; the worker drops spawns too close to the nest
+        if button == arcade.MOUSE_BUTTON_LEFT:
+            self.sim.spawn(KIND_SPIDER, x, y)
+        else:
+            self.sim.spawn(KIND_LEAF, x, y)
+
+    def on_key_press(self, key, key_modifiers):
+        # As GamePlay; F5 asks the worker for the snapshot
+        if key == SNAPSHOT_KEY:
+            self.sim.save()
+        else:
+            super().on_key_press(key, key_modifiers)
+
+    def closeLogs(self):
+        # Stop the worker, which finishes the recording & event log
+        self.sim.close()
+
+class StreamView(RemoteView):
+    """
+    Watches a World simulated & served by another process (see
+    ants_stream.py), drawing the state as streamed. Input stays with
+    the simulation, so clicks & warp keys do nothing here.
+    """
+
+    def __init__(self, address):
+        super().__init__()
+        # (host, port) of the StatePublisher & our connection to it
+        self.address = address
+        self.client = None
+
+    def setup(self):
+        arcade.set_background_color(BACKGROUND_COLOR)
+
+        self.client = ants_stream.StateClient(*self.address)
+        if self.startup is not None:
+            self.startup.mark("setup.world")
+        self.setupSprites(self.client.transforms)
+
+    def on_update(self, deltaTime):
+        """ Apply the frames received since the last update """
+        self.frameStart = time.perf_counter()
+        prof = self.profiler
+        if prof is not None:
+            t = prof.start()
+
+        if self.client.poll():
+            self.flipped = True
+            resynced, rows = self.client.takeStamps()
+            if resynced:
+                # A keyframe: the scene & all prey archived so far
+                self.obstacles = self.client.config.get("obstacles", [])
+                self.staticLayer.rebuild()
+                self.stampRows = []
+            self.stampRows.extend(rows)
+
+        if prof is not None:
+            prof.lap("frame.update", t)
+
+    def on_mouse_press(self, x, y, button, key_modifiers):
+        pass
+
+    def on_key_press(self, key, key_modifiers):
+        if key == TIMINGS_KEY:
+            super().on_key_press(key, key_modifiers)
+
+    def closeLogs(self):
+        self.client.close()
+
+class ShardView(arcade.Window):
+    """
+    Renders a multi-colony map (see ants_shards.py), composing the
+    entities of all shards into one view that pans & zooms.
+    Only the entities around the view are fetched from the shards &
+    drawn, so the draw cost depends on the view, not the map size.
+    """
+
+    def __init__(self, cols, rows, seed=None):
+        self.shards = ants_shards.ShardSet(cols, rows, seed=seed)
+        super().__init__(
+            MAP_VIEW_WIDTH,
+            MAP_VIEW_HEIGHT,
+            SCREEN_TITLE,
+            update_rate=1/DRAW_FPS)
+        self.camera = Camera(
+            MAP_VIEW_WIDTH, MAP_VIEW_HEIGHT, *self.shards.mapSize())
+        self.panning = set()
+        self.stepper = None
+
+        # Quality of the colonies in view, see GamePlay; those out of
+        # view always run at QUALITY_MINIMAL
+        self.governor = QualityGovernor(TICK)
+        self.frameStart = None
+        self.frameTime = None
+
+        # RowSprites of the shards' entities in view
+        self.sprites = RowSprites(self.transformsInView)
+
+        # Zone circles & region borders of the whole map
+        self.shapes = None
+
+        # Optional ants_profile.StartupTimer, see GamePlay
+        self.startup = None
+
+    def setup(self):
+        arcade.set_background_color(BACKGROUND_COLOR)
+        mapWidth, mapHeight = self.shards.mapSize()
+
+        self.shards.start()
+        self.stepper = FixedStepper(self.shards, TICK)
+
+        if self.startup is not None:
+            self.startup.mark("setup.shards")
+        self.sprites.load()
+        if self.startup is not None:
+            self.startup.mark("assets")
+
+        self.shapes = arcade.ShapeElementList()
+        for col in range(self.shards.cols):
+            for row in range(self.shards.rows):
+                for x, y, radius, color in (
+                        (NEST_CENTER_X, NEST_CENTER_Y, NEST_RADIUS,
+                         (0, 0, 180)),
+                        (STORE_CENTER_X, STORE_CENTER_Y, STORE_RADIUS,
+                         (0, 180, 0)),
+                        (PRISON_CENTER_X, PRISON_CENTER_Y, PRISON_RADIUS,
+                         (180, 0, 0))):
+                    mapX, mapY, angle = ants_shards.toMap(
+                        col, row, x, y, 0)
+                    self.shapes.append(arcade.create_ellipse_outline(
+                        mapX, mapY, radius, radius, color, 4))
+        for col in range(1, self.shards.cols):
+            if not ants_shards.isMirrored(col):
+                # Facing hunting grounds, no border
+                continue
+            x = col * SCREEN_WIDTH
+            self.shapes.append(arcade.create_line(
+                x, 0, x, mapHeight, arcade.color.GRAY, 2))
+
+    def transformsInView(self):
+        # The shards' latest transforms around the view
+        return self.shards.transforms(
+            self.camera.visibleRect(SPRITE_MARGIN))
+
+    def on_update(self, deltaTime):
+        self.frameStart = time.perf_counter()
+        level = self.governor.level
+        if self.frameTime is not None and self.stepper.warp != WARP_MAX:
+            level = self.governor.observe(self.frameTime)
+        rect = self.camera.visibleRect(SPRITE_MARGIN)
+        for index in range(len(self.shards)):
+            if self.shards.inView(index, rect):
+                self.shards.setQuality(index, level)
+            else:
+                self.shards.setQuality(index, QUALITY_MINIMAL)
+
+        for key in self.panning:
+            dx, dy = PAN_KEYS[key]
+            self.camera.pan(
+                dx * PAN_SPEED * deltaTime, dy * PAN_SPEED * deltaTime)
+        # The frame's ticks, as one round of the shards
+        self.stepper.advance(deltaTime)
+        self.shards.flush()
+
+    def on_draw(self):
+        self.sprites.sync()
+        arcade.start_render()
+        arcade.set_viewport(*self.camera.viewport())
+        self.shapes.draw()
+        self.sprites.draw()
+
+        if self.frameStart is not None:
+            self.frameTime = time.perf_counter() - self.frameStart
+
+    def on_mouse_press(self, x, y, button, key_modifiers):
+        # Spawn in whichever colony's region was clicked
+        if button == arcade.MOUSE_BUTTON_LEFT:
+            kind = KIND_SPIDER
+        elif button == arcade.MOUSE_BUTTON_RIGHT:
+            kind = KIND_LEAF
+        else:
+            # Middle button pans, see on_mouse_drag()
+            return
+        self.shards.spawn(kind, *self.camera.toWorld(x, y))
+
+    def on_mouse_drag(self, x, y, dx, dy, buttons, key_modifiers):
+        if buttons & arcade.MOUSE_BUTTON_MIDDLE:
+            # The map follows the mouse
+            self.camera.pan(-dx, -dy)
+
+    def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+        self.camera.zoomAt(ZOOM_STEP ** scroll_y, x, y)
+
+    def on_key_press(self, key, key_modifiers):
+        """
+        Number keys select the time warp, as in GamePlay.
+        Arrow keys pan while held.
+        """
+        if key in WARP_KEYS:
+            self.stepper.warp = WARP_KEYS[key]
+        elif key in PAN_KEYS:
+            self.panning.add(key)
+
+    def on_key_release(self, key, key_modifiers):
+        self.panning.discard(key)
 
 #====================
 def main():
     """ Main method """
-    gp = GamePlay()
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="seed of the world (default: random)")
+    parser.add_argument(
+        "--record", metavar="PATH",
+        help="record the session's spawns for ants_replay.py")
+    parser.add_argument(
+        "--snapshot", metavar="PATH",
+        help="start from a world snapshot, e.g. one saved with F5")
+    parser.add_argument(
+        "--events", metavar="PATH",
+        help="log lifecycle events, see ants_events.py")
+    parser.add_argument(
+        "--colonies", type=ants_shards.parseColonies, metavar="COLSxROWS",
+        help="map of many colonies, one process each (see ants_shards.py)")
+    parser.add_argument(
+        "--obstacles", action="store_true",
+        help="place rocks for the ants to route round (see ants_flow.py)")
+    parser.add_argument(
+        "--overlap", action="store_true",
+        help="simulate in a worker process while drawing"
+        " (see ants_overlap.py)")
+    parser.add_argument(
+        "--view", type=ants_stream.parseAddress, metavar="HOST:PORT",
+        help="watch a world served by ants_stream.py")
+    parser.add_argument(
+        "--startup", action="store_true",
+        help="print how long import, asset load & setup() took")
+    args = parser.parse_args()
+    startup = StartupTimer(STARTED) if args.startup else None
+    if startup is not None:
+        startup.mark("import")
+    if args.snapshot and args.record:
+        # A recording replays from a fresh world of its config
+        parser.error("--record cannot be combined with --snapshot")
+    if args.colonies and args.overlap:
+        # Shards already simulate in worker processes
+        parser.error("--overlap cannot be combined with --colonies")
+    if args.view and (args.colonies or args.overlap):
+        # The world is simulated by the process served from
+        parser.error("--view cannot be combined with --colonies"
+                     " or --overlap")
+
+    if args.colonies:
+        view = ShardView(*args.colonies, seed=args.seed)
+        if startup is not None:
+            startup.mark("window")
+            view.startup = startup
+        try:
+            view.setup()
+            if startup is not None:
+                startup.mark("setup.shapes")
+                for line in startup.report():
+                    print(line)
+            arcade.run()
+        finally:
+            view.shards.close()
+        return
+
+    obstacles = DEMO_OBSTACLES if args.obstacles else ()
+    if args.view:
+        gp = StreamView(args.view)
+    elif args.overlap:
+        gp = OverlapView(
+            args.seed, args.record, args.snapshot, args.events, obstacles)
+    else:
+        gp = GamePlay(
+            args.seed, args.record, args.snapshot, args.events, obstacles)
+    if startup is not None:
+        startup.mark("window")
+        gp.startup = startup
     gp.setup()
-    arcade.run()
+    if startup is not None:
+        for line in startup.report():
+            print(line)
+    try:
+        arcade.run()
+    finally:
+        gp.closeLogs()
 
 #====================
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""
+Arc_AntsHunt - Archive Of Delivered Prey
+========================================
+
+Once a spider or leaf has been delivered & its pair of ants is back
+in the nest, the World has no further use for the target object. It
+goes back to its pool (see ants_pool.py) & all that is kept of it is
+an entry in the PreyArchive: where it came to rest in Spider Prison /
+Leaf Store, plus a running count per kind.
+
+Entries are packed into flat float arrays (x, y, angle per entry, 12
+bytes), so even a very long session costs little memory, and nothing
+in the archive is visited by World.step().
+
+The renderer picks up new entries via since() & stamps them into a
+cached layer, so drawing the archive costs the same for 10 entries as
+for 100,000.
+"""
+from array import array
+
+class PreyArchive:
+    """ Resting places of delivered targets, per kind """
+
+    def __init__(self):
+        # Kind -> flat array of x, y, angle triples
+        self.entries = {}
+
+    def __len__(self):
+        # Targets archived so far, of all kinds
+        return sum(len(entries) for entries in self.entries.values()) // 3
+
+    def add(self, kind, x, y, angle):
+        entries = self.entries.get(kind)
+        if entries is None:
+            entries = self.entries[kind] = array("f")
+        entries.extend((x, y, angle))
+
+    def count(self, kind):
+        # Targets of given kind archived so far
+        entries = self.entries.get(kind)
+        if entries is None:
+            return 0
+        return len(entries) // 3
+
+    def kinds(self):
+        return list(self.entries)
+
+    def since(self, kind, start):
+        # [(x, y, angle), ...] of the entries of kind from index start
+        entries = self.entries.get(kind)
+        if entries is None:
+            return []
+        flat = entries[3 * start:]
+        return list(zip(flat[0::3], flat[1::3], flat[2::3]))
@@ -0,0 +1,167 @@
+"""
+Arc_AntsHunt - Asset Bundle
+===========================
+
+arcade.load_texture() decodes the PNG file & then scans the pixels for
+the sprite's hit box, on every start of the game. Both results never
+change, so they are kept in a bundle file next to the images, which
+loads with a plain read & no PNG decoding:
+
+    magic       8 bytes  b"ANTPAK1\\n"
+    headerSize  uint32   little endian
+    header      JSON: image file -> {"size": [w, h], "offset": n,
+                "hitBox": [[x, y], ...], "source": [mtime_ns, bytes]}
+    pixels      raw RGBA rows of each image, at offset from here on
+
+The bundle is rebuilt from the PNG files whenever one of them changed
+(by "source") or the bundle is missing. Where it can not be written,
+the textures are simply loaded from the PNG files.
+
+Neither arcade nor PIL is imported until textures are asked for, so the
+headless tools never pay for them.
+
+The stored hit box is handed to arcade through Texture._hit_box_points,
+an internal of arcade 2.6; where it is missing, arcade computes the
+hit box from the pixels as usual.
+
+    python ants_assets.py    # (re)build the bundle & time both ways
+"""
+import json
+import os
+import struct
+import sys
+import time
+
+MAGIC = b"ANTPAK1\n"
+HEADER_SIZE = struct.Struct("<I")
+
+BUNDLE_FILE = "assets.antpak"
+
+# Images of the game's sprites
+TEXTURE_FILES = ("ant.png", "spider.png", "leaf.png")
+
+def sourceStamp(imgFile):
+    # What the bundle remembers of a source image to spot changes
+    stat = os.stat(imgFile)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def build(imgFiles, path=BUNDLE_FILE):
+    """ Decode imgFiles & write them to a bundle file at path """
+    import PIL.Image
+    from arcade.hitbox import calculate_hit_box_points_simple
+
+    header = {}
+    pixels = []
+    offset = 0
+    for imgFile in imgFiles:
+        image = PIL.Image.open(imgFile).convert("RGBA")
+        data = image.tobytes()
+        header[imgFile] = {
+            "size": list(image.size),
+            "offset": offset,
+            "hitBox": [list(point) for point in
+                       calculate_hit_box_points_simple(image)],
+            "source": sourceStamp(imgFile),
+            }
+        pixels.append(data)
+        offset = offset + len(data)
+
+    text = json.dumps(header).encode()
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_SIZE.pack(len(text)))
+        f.write(text)
+        for data in pixels:
+            f.write(data)
+
+def read(path, imgFiles):
+    """
+    (header, pixels) of the bundle at path, or None if it is missing,
+    damaged or out of date for imgFiles.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if not data.startswith(MAGIC):
+        return None
+
+    start = len(MAGIC)
+    (size,) = HEADER_SIZE.unpack_from(data, start)
+    start = start + HEADER_SIZE.size
+    try:
+        header = json.loads(data[start:start + size])
+    except ValueError:
+        return None
+    pixels = memoryview(data)[start + size:]
+
+    for imgFile in imgFiles:
+        entry = header.get(imgFile)
+        if entry is None or entry["source"] != sourceStamp(imgFile):
+            return None
+        width, height = entry["size"]
+        if entry["offset"] + 4 * width * height > len(pixels):
+            return None
+    return header, pixels
+
+def loadTextures(imgFiles, path=BUNDLE_FILE):
+    """
+    Image file -> arcade.Texture for each of imgFiles, from the bundle
+    at path, (re)building it first if needed.
+    """
+    import arcade
+    import PIL.Image
+
+    found = read(path, imgFiles)
+    if found is None:
+        try:
+            build(imgFiles, path)
+        except OSError:
+            # E.g. a read-only install: decode the PNG files instead
+            return {imgFile: arcade.load_texture(imgFile)
+                    for imgFile in imgFiles}
+        found = read(path, imgFiles)
+
+    header, pixels = found
+    textures = {}
+    for imgFile in imgFiles:
+        entry = header[imgFile]
+        width, height = entry["size"]
+        offset = entry["offset"]
+        image = PIL.Image.frombuffer(
+            "RGBA", (width, height),
+            bytes(pixels[offset:offset + 4 * width * height]),
+            "raw", "RGBA", 0, 1)
+        texture = arcade.Texture(imgFile, image)
+        if hasattr(texture, "_hit_box_points"):
+            # Hit box as arcade would have computed it from the pixels
+            texture._hit_box_points = tuple(
+                tuple(point) for point in entry["hitBox"])
+        textures[imgFile] = texture
+    return textures
+
+#====================
+def main():
+    """ Rebuild the bundle & compare its load time with the PNG files """
+    imgFiles = TEXTURE_FILES
+    build(imgFiles)
+    print("Built %s (%d bytes)" % (BUNDLE_FILE, os.path.getsize(BUNDLE_FILE)))
+
+    import arcade
+    start = time.perf_counter()
+    for imgFile in imgFiles:
+        texture = arcade.load_texture(imgFile, can_cache=False)
+        texture.hit_box_points
+    decoded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loadTextures(imgFiles)
+    bundled = time.perf_counter() - start
+    print("PNG files %.2f ms, bundle %.2f ms" % (
+        1000 * decoded, 1000 * bundled))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
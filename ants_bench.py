@@ -0,0 +1,399 @@
+"""
+Arc_AntsHunt - Benchmark Suite
+==============================
+
+Drives the headless World through named, scripted load scenarios and
+records for each one:
+    - ticks per second (wall clock)
+    - p50 / p95 / p99 tick time in milliseconds
+    - capture latency, i.e. simulated seconds from spawn of a target
+      to its delivery in Spider Prison / Leaf Store
+    - peak RSS in MB
+
+Every scenario runs in a fresh process, so that peak RSS belongs to
+that scenario alone, & with fixed seeds, so that two runs produce the
+same workload. It runs a few times over; wall clock metrics are the
+median of the runs & their spread is kept as the noise of the metric.
+
+Results go to a JSON file & can be compared against a stored
+baseline. The exit status is 1 if any scenario regressed by more than
+the tolerance, for use as a pre-deploy check. Deterministic metrics
+(captures, capture latency) & peak RSS are held to TOLERANCE, wall
+clock metrics to TIME_TOLERANCE or their noise, whichever is larger:
+
+    python ants_bench.py --save-baseline
+    python ants_bench.py --baseline bench_baseline.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import random
+import sys
+import time
+
+try:
+    import resource
+except ImportError:   # pragma: no cover - not available on Windows
+    resource = None
+
+import ants_dispatch
+import ants_snapshot
+import ants_world
+
+RESULTS_FILE = "bench_results.json"
+BASELINE_FILE = "bench_baseline.json"
+
+# Allowed relative change for the worse before a metric counts as a
+# regression: deterministic metrics & peak RSS, wall clock metrics
+TOLERANCE = 0.15
+TIME_TOLERANCE = 0.25
+
+# Runs per scenario, each in a fresh process
+REPEATS = 5
+
+# Wall clock metrics, as key paths into the stats of a run
+TIME_METRICS = (
+    ("ticksPerSec",),
+    ("wallSec",),
+    ("tickMs", "mean"),
+    ("tickMs", "p50"),
+    ("tickMs", "p95"),
+    ("tickMs", "p99"),
+    )
+
+class Scenario:
+    """
+    A named workload: colony size, run length & a spawn script.
+
+    spawns(world, tick, rng) is called before every tick & may spawn
+    targets into the world.
+    """
+
+    def __init__(
+            self, name, description, seconds,
+            countAnts=ants_world.COUNT_ANTS,
+            countSpiders=ants_world.COUNT_SPIDERS,
+            countLeafs=ants_world.COUNT_LEAFS,
+            spawns=None):
+        self.name = name
+        self.description = description
+        self.seconds = seconds
+        self.countAnts = countAnts
+        self.countSpiders = countSpiders
+        self.countLeafs = countLeafs
+        self.spawns = spawns
+
+def randomPoint(rng):
+    # Random spawn point on the hunting ground
+    return (
+        rng.uniform(20, ants_world.SPAWN_X_MAX),
+        rng.uniform(20, ants_world.SCREEN_HEIGHT - 20))
+
+def spiderBurst(world, tick, rng):
+    # 1000 spiders all at once, 2 sec into the run
+    if tick == 2 * ants_world.FPS:
+        world.spawnSpiders([randomPoint(rng) for n in range(1000)])
+
+def leafDrizzle(world, tick, rng):
+    # A leaf every 0.25 sec
+    if tick % (ants_world.FPS // 4) == 0:
+        world.spawnLeaf(*randomPoint(rng))
+
+def mixedDrizzle(world, tick, rng):
+    # A spider & a leaf every 0.1 sec
+    if tick % (ants_world.FPS // 10) == 0:
+        world.spawnSpider(*randomPoint(rng))
+        world.spawnLeaf(*randomPoint(rng))
+
+SCENARIOS = [
+    Scenario(
+        "default",
+        "8 ants, 4 spiders & 4 leaves, no further spawns",
+        60),
+    Scenario(
+        "spider-burst-1k",
+        "default colony, burst of 1000 spiders at 2 sec",
+        30,
+        spawns=spiderBurst),
+    Scenario(
+        "leaf-drizzle",
+        "default colony, a leaf every 0.25 sec",
+        120,
+        spawns=leafDrizzle),
+    Scenario(
+        "ants-10k",
+        "10000 ants, a spider & a leaf every 0.1 sec",
+        20,
+        countAnts=10000,
+        spawns=mixedDrizzle),
+    ]
+
+def scenarioNamed(name):
+    for scenario in SCENARIOS:
+        if scenario.name == name:
+            return scenario
+    raise KeyError("Unknown scenario: %s" % name)
+
+def percentile(values, pct):
+    # Nearest rank percentile of an already sorted list
+    if not values:
+        return None
+    rank = math.ceil(pct / 100 * len(values)) - 1
+    return values[max(0, min(len(values) - 1, rank))]
+
+def summarize(values, scale=1.0):
+    ordered = sorted(v * scale for v in values)
+    if not ordered:
+        return {"count": 0, "mean": None,
+                "p50": None, "p95": None, "p99": None}
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        }
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+def lookup(stats, path):
+    # Value at key path in nested dicts, None if missing
+    for key in path:
+        stats = stats.get(key) if stats else None
+    return stats
+
+def peakRssMb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # Reported in bytes on macOS, KB elsewhere
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def runScenario(name, engine, dispatch, seed, snapshot=None):
+    """
+    Run one scenario in the current process & return its stats.
+    With a snapshot, the world is loaded from it (colony size &
+    dispatch included) instead of set up afresh.
+    """
+    scenario = scenarioNamed(name)
+
+    rng = random.Random(seed + 1)
+
+    if snapshot is not None:
+        world = ants_snapshot.load(snapshot, engine)
+    else:
+        world = ants_world.World(
+            scenario.countAnts,
+            scenario.countSpiders,
+            scenario.countLeafs,
+            engine,
+            dispatch,
+            seed=seed)
+        world.setup()
+
+    ticks = int(scenario.seconds * ants_world.FPS)
+    tickTimes = []
+    clock = time.perf_counter
+    started = clock()
+    for tick in range(ticks):
+        if scenario.spawns is not None:
+            scenario.spawns(world, tick, rng)
+        t0 = clock()
+        world.step(ants_world.TICK)
+        tickTimes.append(clock() - t0)
+    elapsed = clock() - started
+
+    stepTime = sum(tickTimes)
+    return {
+        "description": scenario.description,
+        "ticks": ticks,
+        "ticksPerSec": ticks / stepTime if stepTime > 0 else None,
+        "wallSec": elapsed,
+        "tickMs": summarize(tickTimes, 1000),
+        "captures": world.captureCount(),
+        "captureLatencySec": summarize(world.captureLatencies),
+        "peakRssMb": peakRssMb(),
+        }
+
+def runIsolated(
+        name, engine, dispatch, seed, snapshot=None, repeats=REPEATS):
+    """
+    Run one scenario repeats times, each in a fresh process so that
+    peak RSS is its own, & merge the stats of the runs: wall clock
+    metrics are their median, with their relative spread
+    ((max - min) / median) under "noise", peak RSS the highest.
+    The other metrics do not depend on the run.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        runs = [pool.apply(
+                    runScenario, (name, engine, dispatch, seed, snapshot))
+                for n in range(max(1, repeats))]
+
+    stats = runs[0]
+    stats["tickMs"] = dict(stats["tickMs"])
+    stats["repeats"] = len(runs)
+    stats["noise"] = {}
+    for path in TIME_METRICS:
+        values = [lookup(run, path) for run in runs]
+        if None in values:
+            continue
+        middle = median(values)
+        parent = stats
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = middle
+        if middle:
+            stats["noise"][".".join(path)] = (
+                (max(values) - min(values)) / middle)
+    rss = [run["peakRssMb"] for run in runs if run["peakRssMb"]]
+    if rss:
+        stats["peakRssMb"] = max(rss)
+    return stats
+
+def compare(results, baseline, tolerance, timeTolerance=TIME_TOLERANCE):
+    """
+    List of regressions of results against baseline, as text.
+    Higher is worse for all metrics except ticks per second &
+    captures. A wall clock metric regresses only by more than
+    timeTolerance & the noise of both sides together.
+    """
+    checks = [
+        (("ticksPerSec",), False),
+        (("tickMs", "p99"), True),
+        (("captures",), False),
+        (("captureLatencySec", "mean"), True),
+        (("peakRssMb",), True),
+        ]
+
+    regressions = []
+    for name, base in baseline["scenarios"].items():
+        current = results["scenarios"].get(name)
+        if current is None:
+            continue
+        for path, higherIsWorse in checks:
+            old = lookup(base, path)
+            new = lookup(current, path)
+            if not old or new is None:
+                continue
+
+            limit = tolerance
+            if path in TIME_METRICS:
+                metric = ".".join(path)
+                noise = (base.get("noise", {}).get(metric, 0)
+                         + current.get("noise", {}).get(metric, 0))
+                limit = max(timeTolerance, noise)
+
+            change = new / old - 1
+            if not higherIsWorse:
+                change = -change
+            if change > limit:
+                regressions.append("%s %s: %.4g -> %.4g (%+.1f%%)" % (
+                    name, ".".join(path), old, new,
+                    100 * (new / old - 1)))
+    return regressions
+
+#====================
+def main():
+    """ Run the benchmark scenarios """
+    parser = argparse.ArgumentParser(
+        description="Arc_AntsHunt benchmark suite")
+    parser.add_argument(
+        "--scenario", action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="scenario to run (repeatable, default: all)")
+    parser.add_argument(
+        "--engine",
+        choices=(ants_world.ENGINE_PYTHON, ants_world.ENGINE_NUMPY),
+        default=ants_world.ENGINE_PYTHON)
+    parser.add_argument(
+        "--dispatch",
+        choices=(ants_dispatch.DISPATCH_FIFO,
+                 ants_dispatch.DISPATCH_BATCH,
+                 ants_dispatch.DISPATCH_TIMED),
+        default=ants_dispatch.DISPATCH_FIFO)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--snapshot", metavar="PATH",
+        help="start every scenario from this world snapshot")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    parser.add_argument(
+        "--baseline",
+        help="baseline results file to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=TOLERANCE,
+        help="allowed change of deterministic metrics & peak RSS")
+    parser.add_argument(
+        "--time-tolerance", type=float, default=TIME_TOLERANCE,
+        help="least allowed change of wall clock metrics")
+    parser.add_argument(
+        "--repeats", type=int, default=REPEATS,
+        help="runs per scenario, wall clock metrics are their median")
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="also store the results as %s" % BASELINE_FILE)
+    parser.add_argument(
+        "--list", action="store_true", help="list scenarios & exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print("%-16s %s" % (scenario.name, scenario.description))
+        return 0
+
+    names = args.scenario or [scenario.name for scenario in SCENARIOS]
+    results = {
+        "engine": args.engine,
+        "dispatch": args.dispatch,
+        "seed": args.seed,
+        "snapshot": args.snapshot,
+        "repeats": args.repeats,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scenarios": {},
+        }
+
+    for name in names:
+        stats = runIsolated(
+            name, args.engine, args.dispatch, args.seed, args.snapshot,
+            args.repeats)
+        results["scenarios"][name] = stats
+        tickMs = stats["tickMs"]
+        print("%-16s %9.0f ticks/sec (+-%.0f%%)  p50 %.3f  p95 %.3f"
+              "  p99 %.3f ms  %4d captures  peak %.0f MB" % (
+                  name, stats["ticksPerSec"] or 0,
+                  50 * stats["noise"].get("ticksPerSec", 0),
+                  tickMs["p50"], tickMs["p95"], tickMs["p99"],
+                  stats["captures"], stats["peakRssMb"] or 0))
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(
+            results, baseline, args.tolerance, args.time_tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            return 1
+        print("No regressions against %s" % args.baseline)
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Arc_AntsHunt - Camera
+=====================
+
+Pan & zoom over a world larger than the window, such as a map of
+many colonies (see ants_shards.py).
+
+The camera looks at the world point (center_x, center_y) with zoom
+window pixels per world pixel. It knows nothing about arcade: the
+renderer applies viewport() via arcade.set_viewport() & asks
+visibleRect() which part of the world to draw.
+"""
+
+# Zoom limits: from the whole world in the window up to MAX_ZOOM
+MAX_ZOOM = 4.0
+
+# Zoom step per mouse wheel click
+ZOOM_STEP = 1.25
+
+class Camera:
+    """ View of a worldWidth x worldHeight world in a window """
+
+    def __init__(
+            self, windowWidth, windowHeight, worldWidth, worldHeight,
+            zoom=1.0):
+        self.windowWidth = windowWidth
+        self.windowHeight = windowHeight
+        self.worldWidth = worldWidth
+        self.worldHeight = worldHeight
+
+        # Smallest zoom shows the whole world
+        self.minZoom = min(
+            1.0, windowWidth / worldWidth, windowHeight / worldHeight)
+        self.zoom = min(max(zoom, self.minZoom), MAX_ZOOM)
+        self.center_x = worldWidth / 2
+        self.center_y = worldHeight / 2
+        self.clamp()
+
+    def clamp(self):
+        # Keep the view inside the world, centered where it is smaller
+        halfWidth = self.windowWidth / self.zoom / 2
+        halfHeight = self.windowHeight / self.zoom / 2
+        if 2 * halfWidth >= self.worldWidth:
+            self.center_x = self.worldWidth / 2
+        else:
+            self.center_x = min(
+                max(self.center_x, halfWidth), self.worldWidth - halfWidth)
+        if 2 * halfHeight >= self.worldHeight:
+            self.center_y = self.worldHeight / 2
+        else:
+            self.center_y = min(
+                max(self.center_y, halfHeight),
+                self.worldHeight - halfHeight)
+
+    def pan(self, dx, dy):
+        # Move the view by (dx, dy) window pixels
+        self.center_x = self.center_x + dx / self.zoom
+        self.center_y = self.center_y + dy / self.zoom
+        self.clamp()
+
+    def zoomAt(self, factor, x, y):
+        # Zoom by factor, keeping the world point under window
+        # position (x, y) in place
+        worldX, worldY = self.toWorld(x, y)
+        self.zoom = min(max(self.zoom * factor, self.minZoom), MAX_ZOOM)
+        self.center_x = worldX - (x - self.windowWidth / 2) / self.zoom
+        self.center_y = worldY - (y - self.windowHeight / 2) / self.zoom
+        self.clamp()
+
+    def toWorld(self, x, y):
+        # Window position -> world position
+        return (self.center_x + (x - self.windowWidth / 2) / self.zoom,
+                self.center_y + (y - self.windowHeight / 2) / self.zoom)
+
+    def visibleRect(self, margin=0):
+        # (left, bottom, right, top) of the world in view, widened
+        # by margin world pixels
+        halfWidth = self.windowWidth / self.zoom / 2 + margin
+        halfHeight = self.windowHeight / self.zoom / 2 + margin
+        return (self.center_x - halfWidth, self.center_y - halfHeight,
+                self.center_x + halfWidth, self.center_y + halfHeight)
+
+    def viewport(self):
+        # (left, right, bottom, top) for arcade.set_viewport()
+        left, bottom, right, top = self.visibleRect()
+        return left, right, bottom, top
@@ -0,0 +1,103 @@
+"""
+Arc_AntsHunt - Fixed Timestep Clock
+===================================
+
+Decouples simulation ticks from rendered frames.
+
+All motion in the World is expressed per tick (e.g. Spider.dx pixels
+per tick), so the World must always be stepped by the same deltaTime.
+FixedStepper accumulates the real frame time, scaled by a time-warp
+multiplier, and runs as many fixed ticks as that time covers:
+    - A dropped frame is made up for by extra ticks on the next frame,
+      instead of slowing the world down.
+    - A warp of 10 or 100 fast-forwards the world, independent of the
+      display rate. WARP_MAX runs as many ticks as fit in the frame.
+
+The leftover fraction of a tick is exposed as alpha, so the renderer
+can interpolate between the last two world states.
+"""
+import time
+
+# Warp multiplier for "as fast as possible"
+WARP_MAX = float("inf")
+
+# Upper limit of ticks per frame, so that a slow machine can not get
+# into a spiral of ever longer frames. Time beyond it is dropped.
+MAX_TICKS_PER_FRAME = 250
+
+class FixedStepper:
+    """ Runs world.step(tick) at a fixed rate, scaled by warp """
+
+    def __init__(
+            self, world, tick, warp=1.0,
+            maxTicksPerFrame=MAX_TICKS_PER_FRAME, frameBudget=None):
+        self.world = world
+        self.tick = tick
+        self.warp = warp
+        self.maxTicksPerFrame = maxTicksPerFrame
+
+        # Wall clock seconds per frame that may be spent on ticks
+        # when warp is WARP_MAX. Defaults to 80 % of one tick.
+        if frameBudget is None:
+            frameBudget = 0.8 * tick
+        self.frameBudget = frameBudget
+
+        # Simulated time not yet covered by a tick
+        self.accumulator = 0.0
+
+        # Ticks run during the last call to advance()
+        self.ticksLastFrame = 0
+
+    @property
+    def alpha(self):
+        # Position between the previous & current world state (0 - 1)
+        return min(self.accumulator / self.tick, 1.0)
+
+    def advance(self, frameTime):
+        """
+        Run the ticks due for frameTime seconds of real time.
+        Returns the number of ticks run.
+        """
+        if self.warp == WARP_MAX:
+            return self.advanceMax()
+
+        self.accumulator = self.accumulator + frameTime * self.warp
+        ticks = int(self.accumulator / self.tick)
+        if ticks > self.maxTicksPerFrame:
+            # Too far behind, let the world slow down instead
+            ticks = self.maxTicksPerFrame
+            self.accumulator = ticks * self.tick
+
+        self.runTicks(ticks)
+        self.accumulator = self.accumulator - ticks * self.tick
+        self.ticksLastFrame = ticks
+        return ticks
+
+    def runTicks(self, ticks):
+        for n in range(ticks):
+            if n == ticks - 1:
+                # Keep the state before the final tick for interpolation
+                self.world.savePrevious()
+            self.world.step(self.tick)
+
+    def advanceMax(self):
+        # As many ticks as fit in the frame budget
+        deadline = time.perf_counter() + self.frameBudget
+        ticks = 0
+        while ticks < self.maxTicksPerFrame:
+            self.world.step(self.tick)
+            ticks = ticks + 1
+            if time.perf_counter() >= deadline:
+                break
+
+        # Show the latest state as it is (alpha of 1)
+        self.accumulator = self.tick
+        self.ticksLastFrame = ticks
+        return ticks
+
+    def runFor(self, simSeconds):
+        """ Fast-forward simSeconds of simulated time, no rendering """
+        ticks = int(round(simSeconds / self.tick))
+        self.runTicks(ticks)
+        self.accumulator = 0.0
+        return ticks
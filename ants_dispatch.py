@@ -0,0 +1,359 @@
+"""
+Arc_AntsHunt - Batch Target Dispatch
+====================================
+
+The default (FIFO) policy in World.getTarget() locks the two oldest
+idle ants onto the oldest fresh target, at most one pair per frame,
+wherever the ants & the target happen to be. Only that oldest target
+is being sensed (its timeDelay counted up) at a time, so a backlog of
+n fresh targets takes n sensing delays to clear.
+
+TimedDispatcher keeps the FIFO choice of ants, but senses all fresh
+targets at once & without polling: each target is given the tick at
+which it counts as sensed when it enters the world (Target.senseTick)
+& goes onto a heap of such deadlines. A tick only looks at the top of
+the heap & at the queue of sensed targets waiting for ants, so ticks
+with nothing due do no dispatch work, & a backlog clears in about one
+sensing delay, ants permitting.
+
+BatchDispatcher instead matches all sensed targets to the available
+ant pairs at once, minimizing the total predicted travel time of the
+colony:
+    - Up to EXACT_LIMIT pair x target combinations, an optimal
+      assignment is found via the Hungarian algorithm.
+    - Beyond that, targets are served greedily, cheapest job first,
+      each by the two nearest idle ants (via the spatial hash).
+
+Throughput comparison against FIFO:
+    python ants_dispatch.py --seconds 300
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import math
+import random
+
+from ants_registry import ANT_IDLE, TARGET_FRESH
+
+# Largest pairs x targets matrix solved exactly. The pure Python
+# Hungarian algorithm is O(n^2 m), so this keeps it within a frame.
+EXACT_LIMIT = 2500
+
+# Dispatch policies accepted by World
+DISPATCH_FIFO = "fifo"
+DISPATCH_BATCH = "batch"
+DISPATCH_TIMED = "timed"
+
+# Backlog sizes compared by main()
+BACKLOGS = (4, 16, 64)
+
+def hungarian(cost):
+    """
+    Minimum cost assignment for a rectangular cost matrix
+    (list of rows). Returns a list of (row, col) pairs, one for
+    each row if rows <= cols, else one for each col.
+    """
+    if not cost or not cost[0]:
+        return []
+
+    if len(cost) > len(cost[0]):
+        # Solve the transposed problem, which has fewer rows
+        transposed = [list(col) for col in zip(*cost)]
+        return [(i, j) for j, i in hungarian(transposed)]
+
+    n = len(cost)
+    m = len(cost[0])
+    inf = float("inf")
+
+    # Potentials, column -> row matching & augmenting path links,
+    # all 1-based with index 0 as the virtual root.
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # Flip the augmenting path
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    return [(p[j] - 1, j - 1) for j in range(1, m + 1) if p[j] != 0]
+
+def outboundTicks(span, speed, accelTiers):
+    """
+    Predicted frames for an ant to cover span pixels on its outward
+    trip, taking into account the acceleration of Ant.chaseTarget()
+    per accelTiers (see ants_world.ACCEL_TIERS, e.g. x3 within 300,
+    x6 within 200, x12 within 100 pixels).
+    """
+    ticks = 0.0
+    mf = 1
+    # From the outermost tier inwards
+    for limit, factor in sorted(accelTiers, reverse=True):
+        if span > limit:
+            ticks = ticks + (span - limit) / (speed * mf)
+            span = limit
+        mf = factor
+    return ticks + span / (speed * mf)
+
+class BatchDispatcher:
+    """ Matches all sensed fresh targets to idle ant pairs per tick """
+
+    def __init__(
+            self, nestX, nestY, carryFactor, accelTiers,
+            exactLimit=EXACT_LIMIT):
+        # Nest center, speed multiplier of loaded ants & acceleration
+        # of outbound ones
+        self.nestX = nestX
+        self.nestY = nestY
+        self.carryFactor = carryFactor
+        self.accelTiers = accelTiers
+        self.exactLimit = exactLimit
+
+    def dispatch(self, world, targets, ants, deltaTime):
+        fresh = targets.members(TARGET_FRESH)
+        if not fresh:
+            return
+
+        # All fresh targets are being sensed at the same time
+        ready = []
+        for target in fresh:
+            target.timeDelay = target.timeDelay + deltaTime
+            if target.timeDelay > world.senseDelay:
+                ready.append(target)
+
+        if not ready or ants.count(ANT_IDLE) < 2:
+            return
+
+        pairs = self.makePairs(ants.members(ANT_IDLE))
+        if len(pairs) * len(ready) <= self.exactLimit:
+            cost = [[self.jobCost(world, pair, target)
+                     for target in ready]
+                    for pair in pairs]
+            for i, j in hungarian(cost):
+                world.launchPair(pairs[i], ready[j], False)
+        else:
+            self.dispatchGreedy(world, ready, ants)
+
+    def dispatchGreedy(self, world, ready, ants):
+        # Cheapest jobs first, each served by the two nearest idle
+        # ants, until the idle ants run out.
+        speed = ants.first(ANT_IDLE)[0].speed
+        ready.sort(key=lambda target: self.targetCost(
+            world, self.nestX, self.nestY, speed, target))
+        for target in ready:
+            if ants.count(ANT_IDLE) < 2:
+                break
+            pair = world.nearestIdleAnts(
+                target.center_x, target.center_y, 2, ants)
+            world.launchPair(pair, target, False)
+
+    def makePairs(self, idle):
+        # Pair up neighbouring idle ants, going round the nest
+        idle.sort(key=lambda ant: math.atan2(
+            ant.center_y - self.nestY, ant.center_x - self.nestX))
+        return [idle[n:n + 2] for n in range(0, len(idle) - 1, 2)]
+
+    def jobCost(self, world, pair, target):
+        # Predicted frames for the pair to reach & deliver target
+        x = (pair[0].center_x + pair[1].center_x) / 2
+        y = (pair[0].center_y + pair[1].center_y) / 2
+        speed = min(pair[0].speed, pair[1].speed)
+        return self.targetCost(world, x, y, speed, target)
+
+    def targetCost(self, world, x, y, speed, target):
+        span = math.hypot(target.center_x - x, target.center_y - y)
+        hx, hy = world.holdingPoint(target)
+        carry = math.hypot(hx - target.center_x, hy - target.center_y)
+        return (outboundTicks(span, speed, self.accelTiers)
+                + carry / (self.carryFactor * speed))
+
+def senseTicks(senseDelay, tick):
+    # Ticks of sensing until the timeDelay of a target, counted up by
+    # tick at a time as under FIFO, exceeds senseDelay
+    ticks = 0
+    timeDelay = 0
+    while timeDelay <= senseDelay:
+        timeDelay = timeDelay + tick
+        ticks = ticks + 1
+    return ticks
+
+class TimedDispatcher:
+    """
+    Sensing deadlines of all fresh targets, per kind of target,
+    see module docstring. World.register() calls schedule() for each
+    fresh target.
+    """
+
+    def __init__(self, senseDelay, tick):
+        self.senseTicks = senseTicks(senseDelay, tick)
+        self.reset()
+
+    def reset(self):
+        # Forget all targets, e.g. when the world is cleared
+        # Per target guid: heap of (senseTick, order, target, uid) &
+        # queue of the (target, uid) sensed but still waiting for ants.
+        # The uid tells a pooled target's later spawns apart.
+        self.timers = {"S": [], "L": []}
+        self.waiting = {"S": collections.deque(), "L": collections.deque()}
+        self.order = itertools.count()
+
+    def schedule(self, world, target):
+        # Start sensing target. A target restored from a snapshot
+        # keeps the deadline it had.
+        if target.senseTick < 0:
+            target.senseTick = world.tickCount + self.senseTicks - 1
+        heapq.heappush(self.timers[target.guid], (
+            target.senseTick, next(self.order), target, target.uid))
+
+    def dispatch(self, world, targets, ants, deltaTime):
+        if targets is world.spidersRegistry:
+            guid = "S"
+        else:
+            guid = "L"
+        timers = self.timers[guid]
+        waiting = self.waiting[guid]
+
+        now = world.tickCount
+        while timers and timers[0][0] <= now:
+            senseTick, order, target, uid = heapq.heappop(timers)
+            waiting.append((target, uid))
+
+        while waiting and ants.count(ANT_IDLE) > 1:
+            target, uid = waiting.popleft()
+            if (target.uid != uid or target not in targets
+                    or targets.state(target) != TARGET_FRESH):
+                # Gone meanwhile, e.g. across an open edge
+                continue
+            world.launchPair(ants.first(ANT_IDLE, 2), target, True)
+
+def measureDrain(dispatch, backlog, seed=1):
+    """
+    Spawn backlog targets at once (half spiders, half leaves) into a
+    world with an idle pair of ants for each & return the simulated
+    seconds until the last of them is locked.
+    """
+    import ants_world
+
+    spawner = random.Random(seed + 1)
+    world = ants_world.World(
+        countAnts=4 * backlog, countSpiders=0, countLeafs=0,
+        dispatch=dispatch, seed=seed)
+    world.setup()
+    for n in range(backlog):
+        x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+        y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+        if n % 2:
+            world.spawnSpider(x, y)
+        else:
+            world.spawnLeaf(x, y)
+
+    while (world.spidersRegistry.count(TARGET_FRESH)
+            or world.leafsRegistry.count(TARGET_FRESH)):
+        world.step(ants_world.TICK)
+    return world.simTime
+
+def measureThroughput(
+        dispatch, seconds, seed=1, spawnEvery=0.5, countAnts=8):
+    """
+    Run a headless world under given dispatch policy with a steady,
+    seeded stream of spawns (half spiders, half leaves).
+
+    Returns captures per simulated second.
+    """
+    # ants_world imports this module, so import it only when needed
+    import ants_world
+
+    spawner = random.Random(seed + 1)
+
+    world = ants_world.World(
+        countAnts=countAnts, dispatch=dispatch, seed=seed)
+    world.setup()
+
+    deltaTime = ants_world.TICK
+    spawnTicks = max(1, round(spawnEvery * ants_world.FPS))
+    for tick in range(int(seconds * ants_world.FPS)):
+        if tick % spawnTicks == 0:
+            x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+            y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+            if spawner.random() < 0.5:
+                world.spawnSpider(x, y)
+            else:
+                world.spawnLeaf(x, y)
+        world.step(deltaTime)
+
+    return world.captureCount() / world.simTime
+
+#====================
+def main():
+    """ Compare capture throughput & backlog drain of the policies """
+    parser = argparse.ArgumentParser(
+        description="Captures per simulated second, FIFO vs batch"
+        " vs timed, & time to clear a backlog")
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--spawn-every", type=float, default=0.5,
+        help="simulated seconds between spawns")
+    parser.add_argument("--ants", type=int, default=8)
+    args = parser.parse_args()
+
+    policies = (DISPATCH_FIFO, DISPATCH_BATCH, DISPATCH_TIMED)
+    results = {}
+    for dispatch in policies:
+        results[dispatch] = measureThroughput(
+            dispatch, args.seconds, args.seed,
+            args.spawn_every, args.ants)
+        print("%-6s %.3f captures/sec" % (dispatch, results[dispatch]))
+
+    fifo = results[DISPATCH_FIFO]
+    if fifo > 0:
+        for dispatch in policies[1:]:
+            print("%s vs fifo: %+.1f%%" % (
+                dispatch, 100 * (results[dispatch] / fifo - 1)))
+
+    print("Seconds until a backlog of fresh targets is locked:")
+    print("%-8s" % "backlog" + "".join(
+        "%8s" % dispatch for dispatch in policies))
+    for backlog in BACKLOGS:
+        print("%-8d" % backlog + "".join(
+            "%8.2f" % measureDrain(dispatch, backlog, args.seed)
+            for dispatch in policies))
+
+#====================
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Arc_AntsHunt - NumPy Motion Engine
+==================================
+
+Optional struct-of-arrays engine for the per-frame motion of ants,
+spiders & leaves.
+
+Without the engine, World.step() calls animate() / idleMove() on every
+entity one at a time. With it, each entity type keeps its position,
+velocity, tilt, dTilt, bounds & mode in contiguous NumPy arrays and the
+whole population is advanced in one vectorized pass.
+
+Entities added to the engine are switched over to a "bound" subclass
+whose motion attributes (center_x, angle, mode ...) read & write the
+arrays directly. So the rest of the game logic, e.g. Ant.chaseTarget(),
+keeps working on individual entities unchanged.
+
+NumPy is an optional dependency. Use available() before creating a
+MotionEngine. It is only imported then, so that the python engine &
+the headless tools do not pay for importing it.
+"""
+# NumPy module, once imported by available()
+np = None
+
+# Entity attribute -> array column.
+# "state" holds the ant mode, or the target hitCount.
+ANT_FIELDS = {
+    "center_x": "x",
+    "center_y": "y",
+    "angle": "angle",
+    "tilt": "tilt",
+    "dTilt": "dTilt",
+    "tiltMin": "tiltMin",
+    "tiltMax": "tiltMax",
+    "dx": "dx",
+    "dy": "dy",
+    "xMin": "xMin",
+    "xMax": "xMax",
+    "yMin": "yMin",
+    "yMax": "yMax",
+    "mode": "state",
+    }
+
+TARGET_FIELDS = dict(ANT_FIELDS)
+del TARGET_FIELDS["mode"]
+TARGET_FIELDS["hitCount"] = "state"
+
+FLOAT_COLUMNS = (
+    "x", "y", "angle",
+    "tilt", "dTilt", "tiltMin", "tiltMax",
+    "dx", "dy", "xMin", "xMax", "yMin", "yMax",
+    "prevX", "prevY", "prevAngle")
+
+# "cellX" & "cellY" remember the spatial hash cell of each row
+INT_COLUMNS = ("state", "cellX", "cellY")
+
+# Kinds of entity handled by the engine
+KIND_ANT = "ant"
+KIND_SPIDER = "spider"
+KIND_LEAF = "leaf"
+
+# cellX of a row not yet filed into the spatial hash
+CELL_UNSET = -2**63
+
+def available():
+    # True if NumPy could be imported, importing it on first call
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:   # pragma: no cover - optional dependency
+            return False
+        np = numpy
+    return True
+
+class FloatColumn:
+    """ Data descriptor mapping an attribute onto a float array cell """
+
+    def __init__(self, column):
+        self.column = column
+
+    def __get__(self, obj, objType=None):
+        if obj is None:
+            return self
+        return float(obj._arrays.columns[self.column][obj._slot])
+
+    def __set__(self, obj, value):
+        obj._arrays.columns[self.column][obj._slot] = value
+
+class IntColumn(FloatColumn):
+    """ Data descriptor mapping an attribute onto an int array cell """
+
+    def __get__(self, obj, objType=None):
+        if obj is None:
+            return self
+        return int(obj._arrays.columns[self.column][obj._slot])
+
+class EntityArrays:
+    """
+    Contiguous arrays for one entity type.
+
+    Only the first 'count' rows are live. Arrays grow by doubling
+    whenever the capacity is exhausted.
+    """
+
+    def __init__(self, kind, capacity=64):
+        self.kind = kind
+        self.count = 0
+        self.capacity = capacity
+        self.columns = {}
+        for name in FLOAT_COLUMNS:
+            self.columns[name] = np.zeros(capacity, dtype=np.float64)
+        for name in INT_COLUMNS:
+            self.columns[name] = np.zeros(capacity, dtype=np.int64)
+
+        # Row -> entity object
+        self.entities = []
+
+    def grow(self, capacity=None):
+        # Double the capacity, or raise it to capacity
+        if capacity is None:
+            capacity = 2 * self.capacity
+        self.capacity = capacity
+        for name, column in self.columns.items():
+            bigger = np.zeros(self.capacity, dtype=column.dtype)
+            bigger[:self.count] = column[:self.count]
+            self.columns[name] = bigger
+
+    def add(self, entity, fields):
+        if self.count == self.capacity:
+            self.grow()
+
+        slot = self.count
+        for attr, column in fields.items():
+            self.columns[column][slot] = entity.__dict__.pop(attr)
+
+        self.entities.append(entity)
+        self.count = self.count + 1
+
+        # No earlier state to interpolate from
+        self.columns["prevX"][slot] = self.columns["x"][slot]
+        self.columns["prevY"][slot] = self.columns["y"][slot]
+        self.columns["prevAngle"][slot] = self.columns["angle"][slot]
+
+        # Force a spatial hash update on the next changedCells()
+        self.columns["cellX"][slot] = CELL_UNSET
+        return slot
+
+    def addMany(self, entities, fields, values=None):
+        # Same as add() for each of entities, one column at a time.
+        # values, if given, maps each attribute of fields to an array
+        # of the entities' values, to take instead of their attributes
+        # (which they then do not have). Returns the slot of the first
+        # one.
+        self.reserve(len(entities))
+        start = self.count
+        end = start + len(entities)
+        for attr, column in fields.items():
+            if values is not None:
+                self.columns[column][start:end] = values[attr]
+            else:
+                self.columns[column][start:end] = [
+                    entity.__dict__.pop(attr) for entity in entities]
+
+        self.entities.extend(entities)
+        self.count = end
+
+        for a, b in (("prevX", "x"), ("prevY", "y"), ("prevAngle", "angle")):
+            self.columns[a][start:end] = self.columns[b][start:end]
+        self.columns["cellX"][start:end] = CELL_UNSET
+        return start
+
+    def fileCells(self, start, end, cellSize):
+        # Spatial hash cell keys of rows start to end, remembered as
+        # seen by changedCells()
+        cx = np.floor(self.columns["x"][start:end] / cellSize)
+        cy = np.floor(self.columns["y"][start:end] / cellSize)
+        self.columns["cellX"][start:end] = cx
+        self.columns["cellY"][start:end] = cy
+        return list(zip(
+            cx.astype(np.int64).tolist(), cy.astype(np.int64).tolist()))
+
+    def remove(self, entity, fields):
+        """
+        Copy the attributes of entity back out of the arrays & fill
+        its row with the last row, keeping the live rows contiguous.
+        """
+        slot = entity._slot
+        for attr, column in fields.items():
+            value = self.columns[column][slot]
+            if column in INT_COLUMNS:
+                entity.__dict__[attr] = int(value)
+            else:
+                entity.__dict__[attr] = float(value)
+
+        last = self.count - 1
+        if slot != last:
+            for column in self.columns.values():
+                column[slot] = column[last]
+            moved = self.entities[last]
+            self.entities[slot] = moved
+            moved._slot = slot
+
+        self.entities.pop()
+        self.count = last
+
+    def reserve(self, count):
+        # Room for count more rows without any further growth
+        capacity = self.capacity
+        while self.count + count > capacity:
+            capacity = 2 * capacity
+        if capacity > self.capacity:
+            self.grow(capacity)
+
+    def view(self, column):
+        # Live part of a column
+        return self.columns[column][:self.count]
+
+class MotionEngine:
+    """
+    Holds one EntityArrays per entity type and advances
+    all of them in a single vectorized pass via advance().
+    """
+
+    def __init__(self, capacity=64):
+        if not available():
+            raise ImportError(
+                "MotionEngine requires NumPy (pip install numpy)")
+
+        self.arrays = {
+            KIND_ANT: EntityArrays(KIND_ANT, capacity),
+            KIND_SPIDER: EntityArrays(KIND_SPIDER, capacity),
+            KIND_LEAF: EntityArrays(KIND_LEAF, capacity),
+            }
+
+        # Cache of bound subclasses, one per entity class
+        self.boundClasses = {}
+
+    def boundClass(self, cls, fields):
+        bound = self.boundClasses.get(cls)
+        if bound is None:
+            attrs = {}
+            for attr, column in fields.items():
+                if column == "state":
+                    attrs[attr] = IntColumn(column)
+                else:
+                    attrs[attr] = FloatColumn(column)
+            bound = type(cls.__name__, (cls,), attrs)
+            self.boundClasses[cls] = bound
+        return bound
+
+    def add(self, entity, kind):
+        """
+        Move the motion attributes of entity into the arrays of
+        given kind & switch it over to the array backed subclass.
+        """
+        if kind == KIND_ANT:
+            fields = ANT_FIELDS
+        else:
+            fields = TARGET_FIELDS
+
+        arrays = self.arrays[kind]
+        entity._slot = arrays.add(entity, fields)
+        entity._arrays = arrays
+        entity.__class__ = self.boundClass(entity.__class__, fields)
+
+    def addMany(self, entities, kind, values=None, cellSize=None):
+        """
+        add() for a list of entities of the same kind & class.
+        values, if given, holds their motion attributes, see
+        EntityArrays.addMany(). With cellSize, returns the spatial
+        hash cell keys of the entities, as changedCells() sees them.
+        """
+        if not entities:
+            return []
+        if kind == KIND_ANT:
+            fields = ANT_FIELDS
+        else:
+            fields = TARGET_FIELDS
+
+        arrays = self.arrays[kind]
+        start = arrays.addMany(entities, fields, values)
+        bound = self.boundClass(entities[0].__class__, fields)
+        slot = start
+        for entity in entities:
+            entity._slot = slot
+            entity._arrays = arrays
+            entity.__class__ = bound
+            slot = slot + 1
+        if cellSize is not None:
+            return arrays.fileCells(start, slot, cellSize)
+        return None
+
+    def remove(self, entity):
+        """
+        Opposite of add(): entity gets its attributes back & reverts
+        to its own (unbound) class. It can be add()ed again later.
+        """
+        arrays = entity._arrays
+        if arrays.kind == KIND_ANT:
+            fields = ANT_FIELDS
+        else:
+            fields = TARGET_FIELDS
+
+        arrays.remove(entity, fields)
+        entity.__class__ = entity.__class__.__bases__[0]
+        del entity._slot
+        del entity._arrays
+
+    def savePrevious(self):
+        # Remember positions & angles for render interpolation
+        for arrays in self.arrays.values():
+            arrays.view("prevX")[:] = arrays.view("x")
+            arrays.view("prevY")[:] = arrays.view("y")
+            arrays.view("prevAngle")[:] = arrays.view("angle")
+
+    def lerpTransforms(self, alpha, teleportSpan):
+        """
+        (entity, x, y, angle) for every entity, interpolated between
+        the saved previous state & the current one. Moves longer than
+        teleportSpan are jumps (e.g. scatter) & are not interpolated.
+        """
+        found = []
+        for arrays in self.arrays.values():
+            if not arrays.count:
+                continue
+            x = arrays.view("x")
+            y = arrays.view("y")
+            angle = arrays.view("angle")
+            dx = x - arrays.view("prevX")
+            dy = y - arrays.view("prevY")
+            # Turn the shortest way round
+            dAngle = (angle - arrays.view("prevAngle") + 180) % 360 - 180
+
+            back = np.where(
+                dx * dx + dy * dy > teleportSpan * teleportSpan,
+                0.0, 1.0 - alpha)
+            found.extend(zip(
+                arrays.entities,
+                (x - dx * back).tolist(),
+                (y - dy * back).tolist(),
+                (angle - dAngle * back).tolist()))
+        return found
+
+    def changedCells(self, cellSize):
+        """
+        (entity, cell key) for every entity whose spatial hash cell
+        differs from the one seen on the previous call.
+        """
+        changed = []
+        for arrays in self.arrays.values():
+            if not arrays.count:
+                continue
+
+            cx = np.floor(arrays.view("x") / cellSize).astype(np.int64)
+            cy = np.floor(arrays.view("y") / cellSize).astype(np.int64)
+            oldX = arrays.view("cellX")
+            oldY = arrays.view("cellY")
+
+            rows = np.flatnonzero((cx != oldX) | (cy != oldY))
+            if len(rows) == 0:
+                continue
+            oldX[rows] = cx[rows]
+            oldY[rows] = cy[rows]
+
+            entities = arrays.entities
+            for row, kx, ky in zip(
+                    rows.tolist(), cx[rows].tolist(), cy[rows].tolist()):
+                changed.append((entities[row], (kx, ky)))
+        return changed
+
+    def advance(self, tilt=True, wander=True):
+        """
+        One frame of animate() / idleMove() for every entity.
+        tilt & wander False leave out the squiggle of all entities &
+        the wandering of idle ants (see World.setQuality).
+        """
+        ants = self.arrays[KIND_ANT]
+        if ants.count:
+            # Ants squiggle all the time, but wander only in the nest
+            if tilt:
+                self.tiltPass(ants, None)
+            if wander:
+                idle = ants.view("state") == 0
+                self.bouncePass(ants, idle, "x", "dx", "xMin", "xMax")
+                self.bouncePass(ants, idle, "y", "dy", "yMin", "yMax")
+
+        spiders = self.arrays[KIND_SPIDER]
+        if spiders.count:
+            # Spiders move until hit by ants
+            free = spiders.view("state") == 0
+            if tilt:
+                self.tiltPass(spiders, free)
+            self.bouncePass(spiders, free, "x", "dx", "xMin", "xMax")
+            self.bouncePass(spiders, free, "y", "dy", "yMin", "yMax")
+
+        leafs = self.arrays[KIND_LEAF]
+        if leafs.count:
+            # Leaves oscillate sideways & keep floating downwards,
+            # wrapping back to the top after reaching the bottom.
+            free = leafs.view("state") == 0
+            if tilt:
+                self.tiltPass(leafs, free)
+            self.bouncePass(leafs, free, "x", "dx", "xMin", "xMax")
+            y = leafs.view("y")
+            y += np.where(free, leafs.view("dy"), 0.0)
+            wrap = free & (y < leafs.view("yMin"))
+            y[wrap] = leafs.view("yMax")[wrap]
+
+    def tiltPass(self, arrays, mask):
+        # Angular oscillation between tiltMin & tiltMax.
+        # mask of None means every entity takes part.
+        tilt = arrays.view("tilt")
+        dTilt = arrays.view("dTilt")
+        tiltMin = arrays.view("tiltMin")
+        tiltMax = arrays.view("tiltMax")
+
+        if mask is None:
+            tilt += dTilt
+        else:
+            tilt += np.where(mask, dTilt, 0.0)
+
+        over = tilt > tiltMax
+        under = tilt < tiltMin
+        np.negative(dTilt, out=dTilt, where=over | under)
+        np.copyto(tilt, tiltMax, where=over)
+        np.copyto(tilt, tiltMin, where=under)
+
+        if mask is None:
+            arrays.view("angle")[:] += tilt
+        else:
+            arrays.view("angle")[:] += np.where(mask, tilt, 0.0)
+
+    def bouncePass(self, arrays, mask, pos, vel, low, high):
+        # Linear movement along one axis, reversing at the bounds
+        p = arrays.view(pos)
+        v = arrays.view(vel)
+        pMin = arrays.view(low)
+        pMax = arrays.view(high)
+
+        p += np.where(mask, v, 0.0)
+
+        over = mask & (p > pMax)
+        under = mask & (p < pMin)
+        np.negative(v, out=v, where=over | under)
+        np.copyto(p, pMax, where=over)
+        np.copyto(p, pMin, where=under)
@@ -0,0 +1,301 @@
+"""
+Arc_AntsHunt - Lifecycle Event Log
+==================================
+
+The World reports every change in the life of its targets & ants as
+an event, for analysis of colony behaviour after (or during) a run:
+
+    spawn   a target appears                 ant -1
+    lock    an ant locks onto a target       one event per ant of pair
+    hit     an ant reaches its target        one event per ant of pair
+    deliver the target rests in Spider Prison / Leaf Store
+    home    an ant is back in the nest after the job
+
+Each event carries the tick, the kind of target (spider / leaf), the
+ids of the ant & target involved (see World.newId) and the x, y at
+which it happened.
+
+World.step() must never wait on the disk, so emit() only appends the
+event to a bounded ring buffer. A background thread drains that
+buffer every FLUSH_INTERVAL seconds, writes the events to the log file
+& hands them on to subscribers. If the buffer fills up faster than it
+is drained, the oldest events are dropped & counted in dropped.
+
+Log files are either JSON lines (path ending in .jsonl) or binary:
+
+    magic       8 bytes  b"ANTEVT1\\n"
+    records     30 bytes each: tick uint32, event uint8, kind uint8,
+                ant & target ids int32, x & y float64, little endian
+
+In-process consumers subscribe to the stream:
+
+    for event in world.events.subscribe():
+        ...
+
+    python ants_world.py --ticks 9000 --events run.antevt
+    python ants_events.py run.antevt
+"""
+import argparse
+import collections
+import json
+import struct
+import sys
+import threading
+
+import ants_engine
+
+MAGIC = b"ANTEVT1\n"
+RECORD = struct.Struct("<IBBiidd")
+
+# Event types
+EVENT_SPAWN = "spawn"
+EVENT_LOCK = "lock"
+EVENT_HIT = "hit"
+EVENT_DELIVER = "deliver"
+EVENT_HOME = "home"
+
+EVENT_CODES = {
+    EVENT_SPAWN: 1,
+    EVENT_LOCK: 2,
+    EVENT_HIT: 3,
+    EVENT_DELIVER: 4,
+    EVENT_HOME: 5,
+    }
+
+KIND_CODES = {
+    ants_engine.KIND_SPIDER: 1,
+    ants_engine.KIND_LEAF: 2,
+    }
+
+# Events held by the ring buffer & by each subscriber
+CAPACITY = 1 << 16
+
+# Seconds between two drains of the ring buffer
+FLUSH_INTERVAL = 0.05
+
+FORMAT_JSONL = "jsonl"
+FORMAT_BINARY = "binary"
+
+Event = collections.namedtuple(
+    "Event", ("tick", "event", "kind", "antId", "targetId", "x", "y"))
+
+def formatFor(path):
+    # Log file format implied by the file name
+    if path.endswith(".jsonl"):
+        return FORMAT_JSONL
+    return FORMAT_BINARY
+
+class Subscription:
+    """
+    Events of an EventLog as they come in, in order.
+    Iterating waits for the next event & stops once the log is
+    closed & all its events have been seen. poll() does not wait.
+    """
+
+    def __init__(self, capacity=CAPACITY):
+        # capacity None keeps every event until taken
+        self.queue = collections.deque(maxlen=capacity)
+        self.ready = threading.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, events):
+        # Called by the writer thread
+        if self.queue.maxlen is not None:
+            room = self.queue.maxlen - len(self.queue)
+            if len(events) > room:
+                self.dropped = self.dropped + len(events) - room
+        self.queue.extend(events)
+        self.ready.set()
+
+    def poll(self):
+        # Events received since the last call, without waiting
+        found = []
+        while self.queue:
+            found.append(self.queue.popleft())
+        return found
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            self.ready.clear()
+            if self.queue:
+                return self.queue.popleft()
+            if self.closed:
+                raise StopIteration
+            self.ready.wait()
+
+class EventLog:
+    """
+    Bounded ring buffer of events, drained by a background thread
+    into the log file at path (if any) & to subscribers.
+    close() when done.
+    """
+
+    def __init__(self, path=None, fmt=None, capacity=CAPACITY):
+        self.path = path
+        self.format = fmt or (formatFor(path) if path else None)
+        if self.format not in (None, FORMAT_JSONL, FORMAT_BINARY):
+            raise ValueError("Unknown event log format: %r" % (fmt,))
+
+        self.buffer = collections.deque(maxlen=capacity)
+        self.emitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+        self.file = None
+        if path is not None:
+            if self.format == FORMAT_JSONL:
+                self.file = open(path, "w")
+            else:
+                self.file = open(path, "wb")
+                self.file.write(MAGIC)
+
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="ants-events", daemon=True)
+        self.thread.start()
+
+    def emit(self, tick, event, kind, antId, targetId, x, y):
+        # Called by the World. Never waits: a full buffer drops its
+        # oldest event.
+        buffer = self.buffer
+        if len(buffer) == buffer.maxlen:
+            self.dropped = self.dropped + 1
+        buffer.append(Event(tick, event, kind, antId, targetId, x, y))
+        self.emitted = self.emitted + 1
+
+    def subscribe(self, capacity=CAPACITY):
+        # New Subscription to the events emitted from now on
+        subscription = Subscription(capacity)
+        with self.lock:
+            self.subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.remove(subscription)
+        subscription.closed = True
+        subscription.ready.set()
+
+    def run(self):
+        # Writer thread: drain, write & fan out until closed
+        while not self.stopping.wait(FLUSH_INTERVAL):
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        buffer = self.buffer
+        events = []
+        while buffer:
+            events.append(buffer.popleft())
+        if not events:
+            return
+
+        if self.file is not None:
+            self.write(events)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.put(events)
+
+    def write(self, events):
+        if self.format == FORMAT_JSONL:
+            self.file.write("".join(
+                json.dumps(event._asdict()) + "\n" for event in events))
+        else:
+            pack = RECORD.pack
+            self.file.write(b"".join(
+                pack(tick, EVENT_CODES[event], KIND_CODES[kind],
+                     antId, targetId, x, y)
+                for tick, event, kind, antId, targetId, x, y in events))
+        self.file.flush()
+        self.written = self.written + len(events)
+
+    def close(self):
+        # Write out what is left, end all subscriptions & the thread
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        self.thread.join()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        with self.lock:
+            subscribers = self.subscribers
+            self.subscribers = []
+        for subscription in subscribers:
+            subscription.closed = True
+            subscription.ready.set()
+
+def readEvents(path):
+    """ Events of a log file written by EventLog, in order """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if not data.startswith(MAGIC):
+        # JSON lines, skipping a partly written last line
+        for line in data.decode().splitlines():
+            try:
+                yield Event(**json.loads(line))
+            except ValueError:
+                continue
+        return
+
+    events = {code: event for event, code in EVENT_CODES.items()}
+    kinds = {code: kind for kind, code in KIND_CODES.items()}
+    offset = len(MAGIC)
+    end = offset + (len(data) - offset) // RECORD.size * RECORD.size
+    for tick, event, kind, antId, targetId, x, y in RECORD.iter_unpack(
+            data[offset:end]):
+        yield Event(
+            tick, events[event], kinds[kind], antId, targetId, x, y)
+
+#====================
+def main():
+    """ Summarize an event log """
+    parser = argparse.ArgumentParser(
+        description="Summarize an Arc_AntsHunt event log")
+    parser.add_argument("path")
+    parser.add_argument(
+        "--jsonl", action="store_true",
+        help="print the events as JSON lines instead")
+    args = parser.parse_args()
+
+    counts = collections.Counter()
+    spawned = {}
+    latencies = []
+    lastTick = 0
+    for event in readEvents(args.path):
+        if args.jsonl:
+            print(json.dumps(event._asdict()))
+            continue
+        counts[event.event, event.kind] += 1
+        lastTick = event.tick
+        if event.event == EVENT_SPAWN:
+            spawned[event.targetId] = event.tick
+        elif (event.event == EVENT_DELIVER
+                and event.targetId in spawned):
+            latencies.append(event.tick - spawned.pop(event.targetId))
+
+    if args.jsonl:
+        return 0
+
+    print("Events up to tick %d" % lastTick)
+    for event in EVENT_CODES:
+        print("  %-8s  %8d spiders  %8d leaves" % (
+            event,
+            counts[event, ants_engine.KIND_SPIDER],
+            counts[event, ants_engine.KIND_LEAF]))
+    if latencies:
+        print("Spawn to delivery: mean %.1f ticks, max %d ticks" % (
+            sum(latencies) / len(latencies), max(latencies)))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Arc_AntsHunt - Flow Fields
+==========================
+
+Carrying ants head for Spider Prison or Leaf Store, & returning ants
+for the nest: always one of three fixed points. With obstacles in the
+world (circular rocks, see World.setObstacles), a straight line will
+not do, yet a path search per ant would be costly.
+
+Instead, each destination gets a flow field over a grid of CELL x CELL
+cells, computed once, & again only when the obstacles change:
+    1. A distance transform (Dijkstra over the 8 neighbours of each
+       cell) gives the travel distance from every cell to the cell of
+       the destination. Cells inside an obstacle cost BLOCKED_COST
+       times as much to cross, so paths go round them, & an ant that
+       finds itself inside one still finds the shortest way out.
+    2. The heading of each cell is down the slope of that distance
+       (a Sobel gradient), kept as unit vector & angle.
+An ant on its way then steers by a single lookup of the cell it is in,
+whatever the number of ants or obstacles. Within the destination's
+zone, which obstacles keep clear of, ants head straight for its center
+as before.
+
+Cost of building the fields & of routing with them:
+    python ants_flow.py --ants 2000
+"""
+import argparse
+import heapq
+import math
+import random
+import sys
+import time
+
+import ants_dispatch
+from ants_registry import ANT_CARRYING, ANT_RETURNING
+
+# Side of a grid cell, in pixels
+CELL = 10
+
+# Cost factor of crossing a cell inside an obstacle
+BLOCKED_COST = 1000
+
+# Neighbour offsets with the length of the step
+STEPS = (
+    (1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+    (1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)),
+    (-1, 1, math.sqrt(2)), (-1, -1, math.sqrt(2)))
+
+class FlowField:
+    """
+    Headings toward (destX, destY) for every cell of a cols x rows
+    grid, given which cells are blocked (see module docstring). Within
+    radius of the destination, ants go straight for it instead.
+    """
+
+    def __init__(self, destX, destY, radius, cols, rows, blocked,
+                 cell=CELL):
+        # Destination & the radius of its zone
+        self.destX = destX
+        self.destY = destY
+        self.radius = radius
+        self.cols = cols
+        self.rows = rows
+        self.cell = cell
+
+        self.distance = self.distances(blocked)
+        self.headX = [0.0] * (cols * rows)
+        self.headY = [0.0] * (cols * rows)
+        self.angle = [0.0] * (cols * rows)
+        self.slopes(blocked)
+
+    def cellOf(self, x, y):
+        # Index of the cell at (x, y), clamped to the grid
+        col = min(max(int(x // self.cell), 0), self.cols - 1)
+        row = min(max(int(y // self.cell), 0), self.rows - 1)
+        return row * self.cols + col
+
+    def distances(self, blocked):
+        # Travel distance of every cell to the destination's cell
+        cols = self.cols
+        rows = self.rows
+        distance = [math.inf] * (cols * rows)
+        start = self.cellOf(self.destX, self.destY)
+        distance[start] = 0.0
+        heap = [(0.0, start)]
+        while heap:
+            d, index = heapq.heappop(heap)
+            if d > distance[index]:
+                continue
+            row, col = divmod(index, cols)
+            for dc, dr, length in STEPS:
+                c = col + dc
+                r = row + dr
+                if not (0 <= c < cols and 0 <= r < rows):
+                    continue
+                n = r * cols + c
+                if blocked[n] or blocked[index]:
+                    length = length * BLOCKED_COST
+                nd = d + length
+                if nd < distance[n]:
+                    distance[n] = nd
+                    heapq.heappush(heap, (nd, n))
+        return distance
+
+    def slopes(self, blocked):
+        # Unit heading down the distance slope, per cell. Free cells
+        # leave blocked neighbours out, so that ants slide along an
+        # obstacle instead of being pushed off it.
+        cols = self.cols
+        rows = self.rows
+        distance = self.distance
+        for row in range(rows):
+            for col in range(cols):
+                index = row * cols + col
+                around = []
+                for dr in (-1, 0, 1):
+                    r = min(max(row + dr, 0), rows - 1)
+                    for dc in (-1, 0, 1):
+                        n = r * cols + min(max(col + dc, 0), cols - 1)
+                        if blocked[n] and not blocked[index]:
+                            around.append(distance[index])
+                        else:
+                            around.append(distance[n])
+                (downLeft, down, downRight, left, mid, right,
+                 upLeft, up, upRight) = around
+                hx = (upLeft + 2 * left + downLeft
+                      - upRight - 2 * right - downRight)
+                hy = (downLeft + 2 * down + downRight
+                      - upLeft - 2 * up - upRight)
+                if hx == 0 and hy == 0:
+                    # Flat, e.g. the destination's own cell
+                    hx = self.destX - (col + 0.5) * self.cell
+                    hy = self.destY - (row + 0.5) * self.cell
+                norm = math.hypot(hx, hy) or 1.0
+                self.headX[index] = hx / norm
+                self.headY[index] = hy / norm
+                self.angle[index] = math.degrees(math.atan2(hy, hx))
+
+    def heading(self, x, y):
+        # (unit x, unit y, angle in degrees) to take at (x, y)
+        index = self.cellOf(x, y)
+        return self.headX[index], self.headY[index], self.angle[index]
+
+class FlowFields:
+    """
+    A FlowField per destination zone (ants_spatial.Zone) of a
+    width x height world, around the given obstacle zones.
+    """
+
+    def __init__(self, width, height, destinations, obstacles,
+                 cell=CELL):
+        self.cols = -(-int(width) // cell)
+        self.rows = -(-int(height) // cell)
+        self.cell = cell
+        self.destinations = list(destinations)
+        self.fields = {}
+        self.setObstacles(obstacles)
+
+    def setObstacles(self, obstacles):
+        # Recompute all fields for the given obstacle zones
+        cell = self.cell
+        blocked = [False] * (self.cols * self.rows)
+        for row in range(self.rows):
+            for col in range(self.cols):
+                x = (col + 0.5) * cell
+                y = (row + 0.5) * cell
+                for obstacle in obstacles:
+                    # Cells the obstacle touches
+                    if obstacle.contains(x, y, cell * math.sqrt(0.5)):
+                        blocked[row * self.cols + col] = True
+                        break
+        self.blocked = blocked
+        self.fields = {
+            zone.name: FlowField(
+                zone.center_x, zone.center_y, zone.radius,
+                self.cols, self.rows, blocked, cell)
+            for zone in self.destinations}
+
+    def field(self, name):
+        # FlowField toward the destination zone of that name
+        return self.fields[name]
+
+#====================
+def main():
+    """ Time building the fields & routing ants with them """
+    import ants_world
+
+    parser = argparse.ArgumentParser(
+        description="Flow field build & routing cost")
+    parser.add_argument(
+        "--ants", type=int, default=2000,
+        help="ants carrying or returning at once")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rocks = ants_world.World(
+        countAnts=args.ants, countSpiders=0, countLeafs=0,
+        seed=args.seed, obstacles=ants_world.DEMO_OBSTACLES)
+    print("%d fields of %d x %d cells built in %.1f ms" % (
+        len(rocks.flow.fields), rocks.flow.cols, rocks.flow.rows,
+        1000 * (time.perf_counter() - start)))
+
+    # One target per pair of ants, all in the hunting ground & clear
+    # of the obstacles, sensed at once (see ants_dispatch.py)
+    spawner = random.Random(args.seed)
+    points = []
+    while len(points) < args.ants // 2:
+        x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+        y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+        if rocks.canSpawnAt(x, y):
+            points.append((x, y))
+
+    for obstacles in ((), ants_world.DEMO_OBSTACLES):
+        world = ants_world.World(
+            countAnts=args.ants, countSpiders=0, countLeafs=0,
+            dispatch=ants_dispatch.DISPATCH_TIMED, seed=args.seed,
+            obstacles=obstacles)
+        world.setup()
+        world.spawnSpiders(points[::2])
+        world.spawnLeafs(points[1::2])
+
+        ticks = int(args.seconds * ants_world.FPS)
+        elapsed = 0.0
+        routed = 0
+        inside = 0
+        for tick in range(ticks):
+            start = time.perf_counter()
+            world.step(ants_world.TICK)
+            elapsed = elapsed + time.perf_counter() - start
+            # Carrying & returning ants, & how many are in a rock
+            # (whether the world knows of the rocks or not)
+            for ant in world.antsBig + world.antsSmall:
+                if ant.mode in (ANT_CARRYING, ANT_RETURNING):
+                    routed = routed + 1
+                    if rocks.obstacleAt(
+                            ant.center_x, ant.center_y) is not None:
+                        inside = inside + 1
+        print("%d obstacles: %.2f ms/tick, %d captures, %d ant-ticks"
+              " carrying or returning, %d of them inside an obstacle" % (
+                  len(obstacles), 1000 * elapsed / ticks,
+                  world.captureCount(), routed, inside))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Arc_AntsHunt - Quality Governor
+===============================
+
+A burst of spawns can push the frame time past its budget, & the frame
+rate collapses. Much of the per-tick work is only there for the looks,
+so the governor watches the frame time & sheds that work step by step
+while over budget, restoring it once there is room again:
+
+    QUALITY_FULL     everything
+    QUALITY_REDUCED  no tilt squiggle of ants, spiders & leaves
+    QUALITY_MINIMAL  also no wandering of idle ants in the nest
+
+Chasing, carrying & delivering targets, & the motion of the targets
+themselves, are never shed: only the angles of the sprites & the
+resting positions of idle ants differ from a run at full quality.
+
+The governor only decides; the World applies the level (see
+World.setQuality), & a spawn recording keeps the level changes so that
+ants_replay.py re-runs them at the same ticks.
+
+A map of many colonies (see ants_shards.py) runs the colonies out of
+view at QUALITY_MINIMAL, whatever the level of those in view.
+
+Governed headless run, each tick taken as a frame:
+    python ants_governor.py --ants 20000 --budget 0.016
+    python ants_governor.py --ants 20000 --budget 0.016 --fixed
+"""
+import argparse
+import random
+import sys
+import time
+
+QUALITY_MINIMAL = 0
+QUALITY_REDUCED = 1
+QUALITY_FULL = 2
+
+QUALITY_NAMES = {
+    QUALITY_MINIMAL: "minimal",
+    QUALITY_REDUCED: "reduced",
+    QUALITY_FULL: "full",
+    }
+
+# Smoothing of the frame time: weight of the latest frame
+SMOOTHING = 0.1
+
+# Shed work once the smoothed frame time is above this share of the
+# budget, restore it once below the lower share
+SHED_ABOVE = 0.9
+RESTORE_BELOW = 0.5
+
+# Frames to wait after a change before shedding more / restoring.
+# Restoring waits longer, so that the level does not flap.
+SHED_HOLD = 15
+RESTORE_HOLD = 90
+
+class QualityGovernor:
+    """
+    Quality level for frames of budget seconds, updated by observe()
+    with the time each frame took.
+    """
+
+    def __init__(self, budget, level=QUALITY_FULL):
+        self.budget = budget
+        self.level = level
+
+        # Smoothed frame time, frames since the last change & the
+        # number of changes so far
+        self.frameTime = None
+        self.held = 0
+        self.changes = 0
+
+        # Frames spent at each level
+        self.frames = {level: 0 for level in QUALITY_NAMES}
+
+    def observe(self, seconds):
+        # Take the time of one frame, return the level for the next
+        if self.frameTime is None:
+            self.frameTime = seconds
+        else:
+            self.frameTime = (
+                SMOOTHING * seconds + (1 - SMOOTHING) * self.frameTime)
+        self.frames[self.level] += 1
+        self.held = self.held + 1
+
+        if (self.frameTime > SHED_ABOVE * self.budget
+                and self.level > QUALITY_MINIMAL
+                and self.held >= SHED_HOLD):
+            self.change(self.level - 1)
+        elif (self.frameTime < RESTORE_BELOW * self.budget
+                and self.level < QUALITY_FULL
+                and self.held >= RESTORE_HOLD):
+            self.change(self.level + 1)
+        return self.level
+
+    def change(self, level):
+        self.level = level
+        self.held = 0
+        self.changes = self.changes + 1
+
+    def stats(self):
+        # Current level & history, e.g. for an overlay or a report
+        return {
+            "level": self.level,
+            "quality": QUALITY_NAMES[self.level],
+            "frameMs": 1000 * (self.frameTime or 0.0),
+            "budgetMs": 1000 * self.budget,
+            "changes": self.changes,
+            "frames": {
+                QUALITY_NAMES[level]: count
+                for level, count in self.frames.items()},
+            }
+
+#====================
+def main():
+    """ Run a world through a spawn burst under the governor """
+    import ants_world
+
+    parser = argparse.ArgumentParser(
+        description="Governed headless run through a spawn burst")
+    parser.add_argument("--ants", type=int, default=20000)
+    parser.add_argument("--ticks", type=int, default=900)
+    parser.add_argument(
+        "--burst", type=int, default=2000,
+        help="targets spawned at once, a third into the run")
+    parser.add_argument(
+        "--budget", type=float, default=ants_world.TICK,
+        help="seconds per frame (default: one tick)")
+    parser.add_argument(
+        "--engine",
+        choices=(ants_world.ENGINE_PYTHON, ants_world.ENGINE_NUMPY),
+        default=ants_world.ENGINE_PYTHON)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--fixed", action="store_true",
+        help="stay at full quality, for comparison")
+    args = parser.parse_args()
+
+    world = ants_world.World(
+        countAnts=args.ants, countSpiders=0, countLeafs=0,
+        engine=args.engine, seed=args.seed)
+    world.setup()
+    governor = QualityGovernor(args.budget)
+    spawner = random.Random(args.seed)
+
+    over = 0
+    total = 0.0
+    for tick in range(args.ticks):
+        if tick == args.ticks // 3:
+            for n in range(args.burst):
+                x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+                y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+                if n % 2:
+                    world.spawnSpider(x, y)
+                else:
+                    world.spawnLeaf(x, y)
+        start = time.perf_counter()
+        world.step(ants_world.TICK)
+        elapsed = time.perf_counter() - start
+        total = total + elapsed
+        if elapsed > args.budget:
+            over = over + 1
+        if not args.fixed:
+            world.setQuality(governor.observe(elapsed))
+
+    stats = governor.stats()
+    print("%d ticks, mean %.2f ms, %d over the %.1f ms budget,"
+          " %d captures" % (
+              args.ticks, 1000 * total / args.ticks, over,
+              stats["budgetMs"], world.captureCount()))
+    if not args.fixed:
+        print("quality %s at the end, %d changes, frames per level: %s"
+              % (stats["quality"], stats["changes"], ", ".join(
+                  "%s %d" % item for item in stats["frames"].items())))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,539 @@
+"""
+Arc_AntsHunt - Overlapped Simulation
+====================================
+
+GamePlay runs on_update & on_draw back to back on one thread: a heavy
+tick delays the draw, & a slow draw delays the next tick. Here the
+World runs in a worker process instead, & the window only draws, so
+that on a multi-core host a frame takes max(update, draw) rather than
+their sum.
+
+The worker writes the entities' transforms into one of two buffers in
+shared memory (the back buffer), while the renderer draws the other
+one (the front buffer), the last one completed. They meet once per
+frame, in swap(), & never lock per sprite:
+    1. At the start of a frame the renderer looks whether the worker
+       finished its round. If not, it draws the same front buffer
+       again & the ticks due pile up for the next round.
+    2. If so, the buffer just written becomes the front buffer, & the
+       renderer posts the next round (ticks due, spawns, quality &
+       render alpha) to be written into the old front buffer, which
+       it no longer reads.
+The worker interpolates the transforms by the posted alpha, as
+World.lerpTransforms() does for GamePlay, so the renderer shows the
+state one frame later but just as smooth.
+
+Prey archived during a round goes into the round's buffer as well,
+for the renderer to stamp into its static layer (see ants_archive.py).
+
+Frame times, simulation & drawing each on their own vs overlapped:
+    python ants_overlap.py --ants 4000 --draw-ms 12
+    python Arc_AntsHunt.py --overlap
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from array import array
+from multiprocessing import shared_memory
+
+import ants_dispatch
+import ants_engine
+import ants_snapshot
+import ants_world
+from ants_clock import MAX_TICKS_PER_FRAME
+from ants_events import EventLog
+from ants_governor import QUALITY_FULL
+from ants_replay import SpawnRecorder
+from ants_shards import (
+    SPRITE_BIG_ANT,
+    SPRITE_SMALL_ANT,
+    SPRITE_SPIDER,
+    SPRITE_LEAF,
+    KIND_SPIDER,
+    KIND_LEAF,
+    MAX_SPAWNS,
+    SPAWN_SIZE,
+    TRANSFORM_SIZE)
+from ants_world import World, SPAWN_X_MAX
+
+# Control & stats slots, in float64: set by the renderer before a
+# round, respectively by the worker during it
+CONTROL_RUNNING = 0
+CONTROL_TICKS = 1
+CONTROL_ALPHA = 2
+CONTROL_QUALITY = 3
+CONTROL_BUFFER = 4
+CONTROL_SAVE = 5
+STAT_TICK = 6
+STAT_CAPTURES = 7
+STAT_ENTITIES = 8
+STAT_HIDDEN = 9
+STAT_ROUND_TIME = 10
+CONTROL_SIZE = 12
+
+# Archived prey stamped per round: sprite code, x, y, angle. Prey that
+# does not fit waits for the next round.
+MAX_STAMPS = 256
+STAMP_SIZE = 4
+
+# Sprite code of archived prey, by archive kind
+STAMP_CODES = {
+    ants_engine.KIND_SPIDER: SPRITE_SPIDER,
+    ants_engine.KIND_LEAF: SPRITE_LEAF,
+    }
+
+# Seconds to wait for the worker's first state & for it to stop
+START_TIMEOUT = 60
+
+# Snapshot written on request, see OverlappedWorld.save()
+SNAPSHOT_FILE = "world.antsnap"
+
+def rows(section, size):
+    # Rows posted to section, as tuples
+    count = int(section[0])
+    flat = section[1:1 + count * size].tolist()
+    return [tuple(flat[n:n + size]) for n in range(0, len(flat), size)]
+
+def post(section, size, flat):
+    # Replace the rows of section by flat (an array("d"))
+    section[1:1 + len(flat)] = flat
+    section[0] = len(flat) // size
+
+class OverlapBlock:
+    """ Shared memory of the renderer & worker, split into sections """
+
+    def __init__(self, name, capacity, create=False):
+        bufferSize = (1 + capacity * TRANSFORM_SIZE
+                      + 1 + MAX_STAMPS * STAMP_SIZE)
+        size = 8 * (CONTROL_SIZE + 1 + MAX_SPAWNS * SPAWN_SIZE
+                    + 2 * bufferSize)
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = capacity
+
+        self.data = self.shm.buf.cast("d")
+        start = 0
+        self.controls = self.data[start:start + CONTROL_SIZE]
+        start = start + CONTROL_SIZE
+        self.spawns = self.data[start:start + 1 + MAX_SPAWNS * SPAWN_SIZE]
+        start = start + len(self.spawns)
+        # Per buffer: transforms, then the prey archived in its round
+        self.transforms = []
+        self.stamps = []
+        for n in range(2):
+            self.transforms.append(
+                self.data[start:start + 1 + capacity * TRANSFORM_SIZE])
+            start = start + len(self.transforms[n])
+            self.stamps.append(
+                self.data[start:start + 1 + MAX_STAMPS * STAMP_SIZE])
+            start = start + len(self.stamps[n])
+
+    def close(self, unlink=False):
+        # Views must go before the block they point into
+        for view in (self.transforms + self.stamps
+                     + [self.controls, self.spawns, self.data]):
+            view.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class OverlapWorker:
+    """ The World, run inside the worker process """
+
+    def __init__(self, block, worldArgs, snapshotPath, recordPath,
+                 eventsPath, savePath):
+        self.block = block
+        self.savePath = savePath
+        self.events = None
+        if eventsPath is not None:
+            self.events = EventLog(eventsPath)
+        if snapshotPath is not None:
+            self.world = ants_snapshot.load(snapshotPath)
+        else:
+            self.world = World(**worldArgs)
+            self.world.setup()
+        self.world.events = self.events
+        self.recorder = None
+        if recordPath is not None:
+            self.recorder = SpawnRecorder(self.world, recordPath)
+
+        # Archive entries stamped so far, per kind
+        self.stamped = {}
+
+    def takeSpawns(self):
+        world = self.world
+        for kind, x, y in rows(self.block.spawns, SPAWN_SIZE):
+            if not world.canSpawnAt(x, y):
+                continue
+            if kind == KIND_SPIDER:
+                world.spawnSpider(x, y)
+            else:
+                world.spawnLeaf(x, y)
+        self.block.spawns[0] = 0
+
+    def runRound(self):
+        controls = self.block.controls
+        start = time.perf_counter()
+        world = self.world
+        world.setQuality(int(controls[CONTROL_QUALITY]))
+        self.takeSpawns()
+        ticks = int(controls[CONTROL_TICKS])
+        for n in range(ticks):
+            if n == ticks - 1:
+                # Keep the state before the final tick, as FixedStepper
+                world.savePrevious()
+            world.step(ants_world.TICK)
+
+        buffer = int(controls[CONTROL_BUFFER])
+        self.publish(buffer, controls[CONTROL_ALPHA])
+        self.stamp(buffer)
+        if controls[CONTROL_SAVE]:
+            ants_snapshot.save(world, self.savePath)
+            controls[CONTROL_SAVE] = 0
+        controls[STAT_TICK] = world.tickCount
+        controls[STAT_CAPTURES] = world.captureCount()
+        controls[STAT_ROUND_TIME] = time.perf_counter() - start
+
+    def publish(self, buffer, alpha):
+        # Interpolated transforms into the given buffer, in drawing order
+        world = self.world
+        codes = {}
+        for code, members in (
+                (SPRITE_BIG_ANT, world.antsBig),
+                (SPRITE_SMALL_ANT, world.antsSmall),
+                (SPRITE_SPIDER, world.spiders),
+                (SPRITE_LEAF, world.leafs)):
+            for entity in members:
+                codes[entity] = code
+
+        flat = array("d")
+        for entity, x, y, angle in world.lerpTransforms(alpha):
+            flat.extend((codes[entity], x, y, angle))
+        controls = self.block.controls
+        controls[STAT_ENTITIES] = len(codes)
+        limit = self.block.capacity * TRANSFORM_SIZE
+        controls[STAT_HIDDEN] = max(0, len(flat) - limit) // TRANSFORM_SIZE
+        post(self.block.transforms[buffer], TRANSFORM_SIZE, flat[:limit])
+
+    def stamp(self, buffer):
+        # Prey archived since the last round into the given buffer
+        archive = self.world.archive
+        flat = array("d")
+        for kind in archive.kinds():
+            start = self.stamped.get(kind, 0)
+            room = MAX_STAMPS - len(flat) // STAMP_SIZE
+            entries = archive.since(kind, start)[:room]
+            for x, y, angle in entries:
+                flat.extend((STAMP_CODES[kind], x, y, angle))
+            self.stamped[kind] = start + len(entries)
+        post(self.block.stamps[buffer], STAMP_SIZE, flat)
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.events is not None:
+            self.events.close()
+
+def runWorker(name, capacity, worldArgs, snapshotPath, recordPath,
+              eventsPath, savePath, go, done):
+    """ Worker process main loop, see module docstring """
+    block = OverlapBlock(name, capacity)
+    worker = None
+    try:
+        worker = OverlapWorker(
+            block, worldArgs, snapshotPath, recordPath, eventsPath,
+            savePath)
+        while True:
+            go.wait()
+            go.clear()
+            if not block.controls[CONTROL_RUNNING]:
+                break
+            worker.runRound()
+            done.set()
+    finally:
+        if worker is not None:
+            worker.close()
+        block.close()
+
+class OverlappedWorld:
+    """
+    A World simulated in a worker process, driven from the renderer.
+    Has step() & savePrevious(), so ants_clock.FixedStepper can run
+    it like a World: the ticks it steps are only counted, & handed to
+    the worker by swap() once per frame. close() when done.
+    """
+
+    def __init__(
+            self, countAnts=ants_world.COUNT_ANTS,
+            countSpiders=ants_world.COUNT_SPIDERS,
+            countLeafs=ants_world.COUNT_LEAFS,
+            engine=ants_world.ENGINE_PYTHON,
+            dispatch=ants_dispatch.DISPATCH_FIFO,
+            seed=None, capacity=None, snapshotPath=None,
+            recordPath=None, eventsPath=None, savePath=SNAPSHOT_FILE,
+            obstacles=()):
+        self.worldArgs = {
+            "countAnts": countAnts,
+            "countSpiders": countSpiders,
+            "countLeafs": countLeafs,
+            "engine": engine,
+            "dispatch": dispatch,
+            "seed": seed,
+            "obstacles": obstacles,
+            }
+        self.snapshotPath = snapshotPath
+        self.recordPath = recordPath
+        self.eventsPath = eventsPath
+        self.savePath = savePath
+
+        # Transform rows per buffer, room for plenty of targets
+        if capacity is None:
+            capacity = countAnts + 4096
+        self.capacity = capacity
+
+        # Ticks & spawns not yet handed to the worker
+        self.pending = 0
+        self.spawns = []
+
+        # Buffer drawn by the renderer & quality level of the next round
+        self.front = 0
+        self.quality = QUALITY_FULL
+
+        self.block = None
+        self.process = None
+        self.go = None
+        self.done = None
+
+    def start(self):
+        # Start the worker process & wait for its first state
+        context = multiprocessing.get_context("spawn")
+        self.block = OverlapBlock(None, self.capacity, create=True)
+        self.block.controls[CONTROL_RUNNING] = 1
+        self.go = context.Event()
+        self.done = context.Event()
+        self.process = context.Process(
+            target=runWorker,
+            args=(self.block.name, self.capacity, self.worldArgs,
+                  self.snapshotPath, self.recordPath, self.eventsPath,
+                  self.savePath, self.go, self.done),
+            daemon=True)
+        self.process.start()
+
+        self.post(1.0)
+        deadline = time.perf_counter() + START_TIMEOUT
+        while not self.done.wait(0.1):
+            if (not self.process.is_alive()
+                    or time.perf_counter() > deadline):
+                self.close()
+                raise RuntimeError("simulation worker did not start")
+        self.swap(1.0)
+
+    def spawn(self, kind, x, y):
+        """
+        Queue a spider (ants_engine.KIND_SPIDER) or leaf at (x, y)
+        for the next round. Returns False if x is out of bounds; the
+        worker drops spawns too close to the nest, as World does.
+        """
+        if x > SPAWN_X_MAX:
+            return False
+        if kind == ants_engine.KIND_SPIDER:
+            code = KIND_SPIDER
+        else:
+            code = KIND_LEAF
+        self.spawns.append((code, x, y))
+        return True
+
+    def step(self, deltaTime):
+        # Count one tick for the next round, for FixedStepper.
+        # Ticks beyond what a frame may run are dropped, as there,
+        # so that a slow worker lets the world slow down.
+        self.pending = min(self.pending + 1, MAX_TICKS_PER_FRAME)
+
+    def savePrevious(self):
+        # The worker keeps its previous state, see runRound()
+        pass
+
+    def setQuality(self, level):
+        # Quality level from the next round on
+        self.quality = level
+
+    def save(self):
+        # Snapshot the world to savePath at the end of the next round
+        self.block.controls[CONTROL_SAVE] = 1
+
+    def swap(self, alpha):
+        """
+        Frame boundary: if the worker finished its round, make its
+        buffer the front one & post the next round, to be drawn at
+        alpha. Returns whether the front buffer changed.
+        """
+        if not self.done.is_set():
+            if not self.process.is_alive():
+                raise RuntimeError("simulation worker stopped")
+            return False
+        self.done.clear()
+        self.front = int(self.block.controls[CONTROL_BUFFER])
+        self.post(alpha)
+        return True
+
+    def post(self, alpha):
+        # Hand the next round to the worker, writing the back buffer
+        controls = self.block.controls
+        spawns = self.spawns[:MAX_SPAWNS]
+        del self.spawns[:MAX_SPAWNS]
+        flat = array("d")
+        for spawn in spawns:
+            flat.extend(spawn)
+        post(self.block.spawns, SPAWN_SIZE, flat)
+
+        controls[CONTROL_TICKS] = self.pending
+        controls[CONTROL_ALPHA] = alpha
+        controls[CONTROL_QUALITY] = self.quality
+        controls[CONTROL_BUFFER] = 1 - self.front
+        self.pending = 0
+        self.go.set()
+
+    def transforms(self):
+        # (sprite code, x, y, angle) rows of the front buffer
+        return [(int(code), x, y, angle) for code, x, y, angle in
+                rows(self.block.transforms[self.front], TRANSFORM_SIZE)]
+
+    def flatTransforms(self):
+        # transforms(), flat & in place: valid until the next swap()
+        section = self.block.transforms[self.front]
+        return section[1:1 + int(section[0]) * TRANSFORM_SIZE]
+
+    def stamps(self):
+        # (sprite code, x, y, angle) of the prey archived in the round
+        # of the front buffer
+        return [(int(code), x, y, angle) for code, x, y, angle in
+                rows(self.block.stamps[self.front], STAMP_SIZE)]
+
+    def stats(self):
+        # Counters of the worker, as of its last finished round
+        controls = self.block.controls
+        return {
+            "tick": int(controls[STAT_TICK]),
+            "captures": int(controls[STAT_CAPTURES]),
+            "entities": int(controls[STAT_ENTITIES]),
+            "hidden": int(controls[STAT_HIDDEN]),
+            "roundTime": controls[STAT_ROUND_TIME],
+            }
+
+    def close(self):
+        # Stop the worker process & free the shared memory
+        if self.block is None:
+            return
+        if self.process.is_alive():
+            # Let the last round finish before stopping
+            self.done.wait(START_TIMEOUT)
+        self.block.controls[CONTROL_RUNNING] = 0
+        self.go.set()
+        self.process.join(START_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.block.close(unlink=True)
+        self.block = None
+
+def spin(seconds):
+    # Keep the CPU busy for seconds, standing in for drawing
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+#====================
+def main():
+    """ Compare frame times of serial & overlapped update / draw """
+    parser = argparse.ArgumentParser(
+        description="Frame time of update + draw, serial vs overlapped")
+    parser.add_argument("--ants", type=int, default=4000)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument(
+        "--draw-ms", type=float, default=12.0,
+        help="CPU time spent drawing a frame (simulated)")
+    parser.add_argument(
+        "--spawn-every", type=int, default=5,
+        help="frames between spawns")
+    parser.add_argument(
+        "--engine",
+        choices=(ants_world.ENGINE_PYTHON, ants_world.ENGINE_NUMPY),
+        default=ants_world.ENGINE_PYTHON)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    draw = args.draw_ms / 1000
+
+    def spawnAt(spawner):
+        kind = spawner.choice((
+            ants_engine.KIND_SPIDER, ants_engine.KIND_LEAF))
+        return (kind, spawner.uniform(20, SPAWN_X_MAX),
+                spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20))
+
+    # Serial: a tick per frame, then the draw
+    world = World(
+        countAnts=args.ants, countSpiders=0, countLeafs=0,
+        engine=args.engine, seed=args.seed)
+    world.setup()
+    spawner = random.Random(args.seed)
+    start = time.perf_counter()
+    for frame in range(args.frames):
+        if frame % args.spawn_every == 0:
+            kind, x, y = spawnAt(spawner)
+            if kind == ants_engine.KIND_SPIDER:
+                world.spawnSpider(x, y)
+            else:
+                world.spawnLeaf(x, y)
+        world.savePrevious()
+        world.step(ants_world.TICK)
+        world.lerpTransforms(1.0)
+        spin(draw)
+    serial = (time.perf_counter() - start) / args.frames
+    serialCaptures = world.captureCount()
+
+    # Overlapped: the same ticks & spawns, drawn while the worker steps
+    sim = OverlappedWorld(
+        countAnts=args.ants, countSpiders=0, countLeafs=0,
+        engine=args.engine, seed=args.seed)
+    sim.start()
+    spawner = random.Random(args.seed)
+    try:
+        start = time.perf_counter()
+        frame = 0
+        stalls = 0
+        while frame < args.frames:
+            if not sim.done.is_set():
+                # Worker still on the last frame's tick: draw it again
+                stalls = stalls + 1
+                spin(draw)
+                continue
+            if frame % args.spawn_every == 0:
+                sim.spawn(*spawnAt(spawner))
+            sim.step(ants_world.TICK)
+            sim.swap(1.0)
+            sim.transforms()
+            spin(draw)
+            frame = frame + 1
+        overlapped = (time.perf_counter() - start) / args.frames
+        sim.done.wait(START_TIMEOUT)
+        sim.swap(1.0)
+        sim.done.wait(START_TIMEOUT)
+        stats = sim.stats()
+    finally:
+        sim.close()
+
+    print("%d CPUs, %d ants, %d frames, draw %.1f ms" % (
+        os.cpu_count() or 1, args.ants, args.frames, args.draw_ms))
+    print("serial     %.2f ms/frame, %d captures" % (
+        1000 * serial, serialCaptures))
+    print("overlapped %.2f ms/frame, %d captures, %d frames waited"
+          " on the worker" % (1000 * overlapped, stats["captures"], stalls))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Arc_AntsHunt - Object Pools
+===========================
+
+Free lists of reusable objects, so that bursts of spawns do not have to
+build (and later garbage collect) a fresh object each time.
+
+Used by the World for spiders & leaves (a delivered target goes back to
+its pool once both ants of the pair are home) and by the game window
+for arcade sprites.
+
+A pool can be pre-warmed to a given size up front, e.g. during setup,
+so that the first burst of spawns does not pay for construction either.
+"""
+
+# Objects pre-built per pool by default
+POOL_SIZE = 64
+
+class Pool:
+    """ Free list of objects, built via factory() whenever it runs dry """
+
+    def __init__(self, factory, size=0):
+        self.factory = factory
+        self.free = []
+
+        # Objects built by the pool & hand-outs served from the free list
+        self.created = 0
+        self.reused = 0
+
+        self.prewarm(size)
+
+    def __len__(self):
+        # Objects ready to be handed out
+        return len(self.free)
+
+    def prewarm(self, size):
+        # Fill the free list up to size objects
+        while len(self.free) < size:
+            self.free.append(self.make())
+
+    def make(self):
+        self.created = self.created + 1
+        return self.factory()
+
+    def acquire(self):
+        # A free object if there is one, else a new one
+        if self.free:
+            self.reused = self.reused + 1
+            return self.free.pop()
+        return self.make()
+
+    def release(self, obj):
+        # Hand obj back for reuse. The caller resets it on acquire().
+        self.free.append(obj)
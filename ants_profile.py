@@ -0,0 +1,158 @@
+"""
+Arc_AntsHunt - Frame Phase Profiler
+===================================
+
+Times each phase of World.step() & GamePlay.on_draw() with rolling
+statistics, so a frame rate drop can be traced to the animate loops,
+target dispatch, sprite drawing or text drawing.
+
+Usage pattern (as in World.step):
+
+    prof = self.profiler
+    if prof is not None:
+        t = prof.start()
+    ... phase work ...
+    if prof is not None:
+        t = prof.lap("update.animate", t)
+
+With no profiler attached the cost is one attribute test per phase,
+per frame (not per entity). With a profiler attached each lap is a
+perf_counter() call plus an append to a bounded ring.
+
+Stats are pulled via FrameProfiler.stats(), or shown on screen via the
+timing overlay of the game window (F3).
+"""
+import collections
+import math
+import time
+
+# Samples kept per phase (10 sec at 30 ticks per sec)
+WINDOW = 300
+
+class PhaseStats:
+    """
+    Rolling window of the latest samples of one phase, plus a
+    histogram of the same samples in power-of-two microsecond buckets.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.samples = collections.deque(maxlen=window)
+
+        # Bucket n counts samples of 2^(n-1) to 2^n - 1 microseconds
+        self.buckets = [0] * 32
+        self.total = 0
+
+    def add(self, seconds):
+        samples = self.samples
+        if len(samples) == samples.maxlen:
+            # Oldest sample is about to drop out of the window
+            self.buckets[self.bucket(samples[0])] -= 1
+        samples.append(seconds)
+        self.buckets[self.bucket(seconds)] += 1
+        self.total = self.total + 1
+
+    def bucket(self, seconds):
+        return min(int(seconds * 1e6).bit_length(), 31)
+
+    def summary(self):
+        # Times in milliseconds over the current window
+        ordered = sorted(self.samples)
+        count = len(ordered)
+        if count == 0:
+            return None
+
+        def pct(p):
+            rank = math.ceil(p / 100 * count) - 1
+            return 1000 * ordered[max(0, min(count - 1, rank))]
+
+        return {
+            "count": count,
+            "total": self.total,
+            "mean": 1000 * sum(ordered) / count,
+            "p50": pct(50),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": 1000 * ordered[-1],
+            }
+
+    def histogram(self):
+        # [(upper bound in microseconds, count), ...] for used buckets
+        return [(1 << n, count)
+                for n, count in enumerate(self.buckets) if count]
+
+class FrameProfiler:
+    """ Rolling per-phase timings, keyed by phase name """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.phases = {}
+
+    def start(self):
+        return time.perf_counter()
+
+    def lap(self, name, since):
+        """
+        Record the time since 'since' against phase name &
+        return now, to be used as 'since' of the next phase.
+        """
+        now = time.perf_counter()
+        self.record(name, now - since)
+        return now
+
+    def record(self, name, seconds):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseStats(self.window)
+        phase.add(seconds)
+
+    def stats(self):
+        # Phase name -> summary dict (see PhaseStats.summary)
+        found = {}
+        for name in sorted(self.phases):
+            summary = self.phases[name].summary()
+            if summary is not None:
+                found[name] = summary
+        return found
+
+    def histogram(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            return []
+        return phase.histogram()
+
+    def reset(self):
+        self.phases = {}
+
+    def report(self):
+        # Stats as fixed width text lines
+        lines = ["%-22s %8s %8s %8s %8s" % (
+            "phase (ms)", "mean", "p95", "p99", "max")]
+        for name, s in self.stats().items():
+            lines.append("%-22s %8.3f %8.3f %8.3f %8.3f" % (
+                name, s["mean"], s["p95"], s["p99"], s["max"]))
+        return lines
+
+class StartupTimer:
+    """
+    Wall clock time of the phases of a program's startup, e.g. import,
+    asset load & setup(). mark() ends a phase & starts the next.
+    """
+
+    def __init__(self, start=None):
+        if start is None:
+            start = time.perf_counter()
+        self.start = start
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self):
+        # Phases as fixed width text lines, then the total
+        lines = ["%-22s %8s" % ("startup phase", "ms")]
+        since = self.start
+        for name, at in self.marks:
+            lines.append("%-22s %8.1f" % (name, 1000 * (at - since)))
+            since = at
+        lines.append("%-22s %8.1f" % ("total", 1000 * (since - self.start)))
+        return lines
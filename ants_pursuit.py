@@ -0,0 +1,261 @@
+"""
+Arc_AntsHunt - Intercept Pursuit
+================================
+
+By default (direct pursuit) an outbound ant heads for where its target
+is right now, every tick. Against a spider bouncing around at
+dx 2.0 / dy 3.5 pixels per tick this is a tail chase: the ant keeps
+turning after the spider & only catches it once the acceleration near
+the target (ants_world.ACCEL_TIERS) lets it close in.
+
+Under intercept pursuit the ant instead heads for the point where it
+can meet the target earliest:
+    - The target's path over the next HORIZON ticks is predicted from
+      its velocity & the bounds it bounces off (spiders) or wraps
+      round (leaves), step for step the same as Target.animate(),
+      so the prediction is exact until the target is hit.
+    - The ant picks the first future tick t at which the predicted
+      position is within t ticks of travel for it, allowing for the
+      acceleration near the target (ants_dispatch.outboundTicks).
+    - From then on, the ant only re-checks the ticks around the one
+      picked last (Ant.aimTick), which moves little from tick to
+      tick, rather than searching the whole horizon again.
+    - If there is no such tick within the horizon, or once the target
+      has been hit & stops moving, the ant heads straight for it.
+
+A target's path is computed once & shared by both ants of its pair;
+it is only recomputed once the ants get near its end.
+
+Capture latency comparison against direct pursuit:
+    python ants_pursuit.py --seconds 300
+"""
+import argparse
+import math
+import random
+
+from ants_dispatch import DISPATCH_FIFO
+
+# Pursuit modes accepted by World
+PURSUIT_DIRECT = "direct"
+PURSUIT_INTERCEPT = "intercept"
+
+# Ticks of target motion predicted ahead
+HORIZON = 300
+
+def predictPath(target, ticks):
+    """
+    ([x, ...], [y, ...]) of target now & after each of the next ticks
+    calls of its animate(), assuming it is not hit meanwhile.
+    """
+    x = target.center_x
+    y = target.center_y
+    dx = target.dx
+    dy = target.dy
+    xMin = target.xMin
+    xMax = target.xMax
+    yMin = target.yMin
+    yMax = target.yMax
+    xs = [x]
+    ys = [y]
+    # Spiders bounce off all four bounds, leaves only off the sides &
+    # start over at the top once below the bottom (see Leaf.animate)
+    bounceY = target.guid == "S"
+    for n in range(ticks):
+        x = x + dx
+        if x > xMax:
+            dx = -dx
+            x = xMax
+        if x < xMin:
+            dx = -dx
+            x = xMin
+
+        y = y + dy
+        if bounceY:
+            if y > yMax:
+                dy = -dy
+                y = yMax
+            if y < yMin:
+                dy = -dy
+                y = yMin
+        elif y < yMin:
+            y = yMax
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+class Interceptor:
+    """ Aim points of outbound ants under intercept pursuit """
+
+    def __init__(self, accelTiers, horizon=HORIZON):
+        self.accelTiers = accelTiers
+        self.horizon = horizon
+
+        # (span, multiplier outside it, multiplier inside it),
+        # outermost first, for travelTicks()
+        self.steps = []
+        mf = 1
+        for limit, factor in sorted(accelTiers, reverse=True):
+            self.steps.append((limit, mf, factor))
+            mf = factor
+        self.innerFactor = mf
+
+    def travelTicks(self, span, speed):
+        # Same as ants_dispatch.outboundTicks(), with the tiers
+        # sorted once
+        ticks = 0.0
+        for limit, outer, inner in self.steps:
+            if span > limit:
+                ticks = ticks + (span - limit) / (speed * outer)
+                span = limit
+        return ticks + span / (speed * self.innerFactor)
+
+    def aimPoint(self, world, ant, target):
+        # (x, y) the ant should head for this tick
+        if target.hitCount > 0:
+            return target.center_x, target.center_y
+
+        now = world.tickCount
+        offset = now - target.pathTick
+        if target.path is None or offset > self.horizon // 2:
+            target.path = predictPath(target, self.horizon)
+            target.pathTick = now
+            offset = 0
+
+        xs, ys = target.path
+        x = ant.center_x
+        y = ant.center_y
+        speed = ant.speed
+        travelTicks = self.travelTicks
+        last = len(xs) - 1 - offset
+
+        def reachable(t):
+            span = math.hypot(xs[offset + t] - x, ys[offset + t] - y)
+            return travelTicks(span, speed) <= t
+
+        # Start from the tick picked last time, if any
+        t = min(max(ant.aimTick - now, 1), last)
+        if reachable(t):
+            while t > 1 and reachable(t - 1):
+                t = t - 1
+        else:
+            while t < last and not reachable(t):
+                t = t + 1
+            if not reachable(t):
+                # Out of reach within the horizon
+                ant.aimTick = -1
+                return target.center_x, target.center_y
+
+        ant.aimTick = now + t
+        return xs[offset + t], ys[offset + t]
+
+def measureLatencies(
+        pursuit, seconds, seed=1, spawnEvery=0.5, countAnts=8,
+        dispatch=DISPATCH_FIFO):
+    """
+    Run a headless world under given pursuit mode with a steady,
+    seeded stream of spawns (half spiders, half leaves).
+
+    Returns kind -> {"chase": [...], "capture": [...]}, latencies in
+    simulated seconds taken from the world's event log:
+        chase   - from lock until both ants of the pair hit the target
+        capture - from spawn to delivery
+    """
+    # ants_world imports this module, so import it only when needed
+    import ants_world
+    from ants_events import (
+        EventLog, EVENT_SPAWN, EVENT_LOCK, EVENT_HIT, EVENT_DELIVER)
+
+    spawner = random.Random(seed + 1)
+
+    world = ants_world.World(
+        countAnts=countAnts, countSpiders=0, countLeafs=0,
+        dispatch=dispatch, seed=seed, pursuit=pursuit)
+    events = EventLog()
+    subscription = events.subscribe(capacity=None)
+    world.events = events
+    world.setup()
+
+    deltaTime = ants_world.TICK
+    spawnTicks = max(1, round(spawnEvery * ants_world.FPS))
+    for tick in range(int(seconds * ants_world.FPS)):
+        if tick % spawnTicks == 0:
+            x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+            y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+            if spawner.random() < 0.5:
+                world.spawnSpider(x, y)
+            else:
+                world.spawnLeaf(x, y)
+        world.step(deltaTime)
+    events.close()
+
+    spawned = {}
+    locked = {}
+    hits = {}
+    latencies = {}
+    for event in subscription.poll():
+        found = latencies.setdefault(event.kind, {"chase": [], "capture": []})
+        if event.event == EVENT_SPAWN:
+            spawned[event.targetId] = event.tick
+        elif event.event == EVENT_LOCK:
+            locked.setdefault(event.targetId, event.tick)
+        elif event.event == EVENT_HIT:
+            hits[event.targetId] = hits.get(event.targetId, 0) + 1
+            if hits[event.targetId] == 2:
+                found["chase"].append(
+                    (event.tick - locked.pop(event.targetId)) * deltaTime)
+        elif event.event == EVENT_DELIVER:
+            found["capture"].append(
+                (event.tick - spawned.pop(event.targetId)) * deltaTime)
+    return latencies
+
+def summarize(latencies):
+    # (count, mean, p99) of a list of latencies
+    ordered = sorted(latencies)
+    count = len(ordered)
+    if count == 0:
+        return 0, None, None
+    rank = math.ceil(0.99 * count) - 1
+    return count, sum(ordered) / count, ordered[max(0, rank)]
+
+#====================
+def main():
+    """ Compare capture latency of direct & intercept pursuit """
+    parser = argparse.ArgumentParser(
+        description="Capture latency, direct vs intercept pursuit")
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--spawn-every", type=float, default=2.0,
+        help="simulated seconds between spawns")
+    parser.add_argument("--ants", type=int, default=8)
+    args = parser.parse_args()
+
+    results = {}
+    for pursuit in (PURSUIT_DIRECT, PURSUIT_INTERCEPT):
+        results[pursuit] = measureLatencies(
+            pursuit, args.seconds, args.seed, args.spawn_every, args.ants)
+
+    print("%-10s %-7s %-8s %6s %8s %8s" % (
+        "pursuit", "kind", "latency", "count", "mean s", "p99 s"))
+    for kind in sorted(results[PURSUIT_DIRECT]):
+        for latency in ("chase", "capture"):
+            stats = {}
+            for pursuit in (PURSUIT_DIRECT, PURSUIT_INTERCEPT):
+                found = results[pursuit].get(kind, {}).get(latency, [])
+                stats[pursuit] = summarize(found)
+                count, mean, p99 = stats[pursuit]
+                if count:
+                    print("%-10s %-7s %-8s %6d %8.2f %8.2f" % (
+                        pursuit, kind, latency, count, mean, p99))
+
+            direct = stats[PURSUIT_DIRECT]
+            intercept = stats[PURSUIT_INTERCEPT]
+            if direct[0] and intercept[0]:
+                print("%-27s mean %+.1f%%, p99 %+.1f%%" % (
+                    "  intercept vs direct:",
+                    100 * (intercept[1] / direct[1] - 1),
+                    100 * (intercept[2] / direct[2] - 1)))
+
+#====================
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Arc_AntsHunt - Lifecycle Registries
+===================================
+
+Indexed registries that bucket entities by their lifecycle state.
+
+Each bucket is an insertion ordered dict used as an ordered set, so
+moving an entity from one state to another, membership tests and
+picking the oldest members of a state are all constant time. The
+World uses them to find idle ants & fresh targets and to visit only
+the ants that are actually out on a job.
+"""
+from itertools import islice
+
+# Ant lifecycle states (same numbering as Ant.mode)
+ANT_IDLE = 0        # Idling in nest
+ANT_OUTBOUND = 1    # Moving outward to capture target
+ANT_CARRYING = 2    # Carrying target to holding point
+ANT_RETURNING = 3   # Returning to nest after completion of job
+
+# Registry state only: back in nest (Ant.mode is ANT_IDLE already), but
+# filed with the idle ants on the next tick, see World.getTarget
+ANT_HOME = 4
+
+ANT_STATES = (ANT_IDLE, ANT_OUTBOUND, ANT_CARRYING, ANT_RETURNING, ANT_HOME)
+ANT_ACTIVE_STATES = (ANT_OUTBOUND, ANT_CARRYING, ANT_RETURNING)
+
+# Target (spider / leaf) lifecycle states
+TARGET_FRESH = 0       # Not yet claimed by any ants
+TARGET_LOCKED = 1      # A pair of ants is on its way
+TARGET_CARRIED = 2     # Being dragged to holding point
+TARGET_DELIVERED = 3   # Resting in Spider Prison or Leaf Store
+
+TARGET_STATES = (
+    TARGET_FRESH, TARGET_LOCKED, TARGET_CARRIED, TARGET_DELIVERED)
+
+class Registry:
+    """
+    Entities bucketed by lifecycle state.
+
+    All operations except members() are O(1) (first() is O(n) in
+    the number of entities asked for).
+    """
+
+    def __init__(self, states):
+        self.buckets = {}
+        for state in states:
+            self.buckets[state] = {}
+
+        # Entity -> its current state
+        self.stateOf = {}
+
+    def __len__(self):
+        return len(self.stateOf)
+
+    def __contains__(self, entity):
+        return entity in self.stateOf
+
+    def add(self, entity, state):
+        self.buckets[state][entity] = None
+        self.stateOf[entity] = state
+
+    def addMany(self, entities, states):
+        # add() for entities & their states, pairwise
+        buckets = self.buckets
+        for entity, state in zip(entities, states):
+            buckets[state][entity] = None
+        self.stateOf.update(zip(entities, states))
+
+    def remove(self, entity):
+        state = self.stateOf.pop(entity)
+        del self.buckets[state][entity]
+
+    def move(self, entity, state):
+        # Shift entity to the end of the bucket for given state
+        old = self.stateOf[entity]
+        if old == state:
+            return
+        del self.buckets[old][entity]
+        self.buckets[state][entity] = None
+        self.stateOf[entity] = state
+
+    def state(self, entity):
+        return self.stateOf[entity]
+
+    def count(self, state):
+        return len(self.buckets[state])
+
+    def first(self, state, n=1):
+        # The n oldest members of given state
+        return list(islice(self.buckets[state], n))
+
+    def members(self, *states):
+        # Snapshot of all members in given states, safe to
+        # iterate while entities change state.
+        found = []
+        for state in states:
+            found.extend(self.buckets[state])
+        return found
@@ -0,0 +1,211 @@
+"""
+Arc_AntsHunt - Spawn Record & Replay
+====================================
+
+Everything random in a World comes from its own seeded rng, so a run
+is fully determined by the world's config (incl. seed) plus the spawns
+fed into it & the ticks at which they came.
+
+SpawnRecorder logs exactly that to a compact binary file:
+
+    magic       8 bytes  b"ANTREC1\\n"
+    configSize  uint32   little endian
+    config      JSON     World.config()
+    records     21 bytes each: tick uint32, kind uint8, x & y float64
+    end record  kind 255, tick = last tick of the session
+
+Changes of the world's quality level (see ants_governor.py) are
+records of kind 3, the level in x, as they change the ticks after.
+
+Coordinates are stored as float64, so replay() feeds back exactly the
+same values as were recorded & re-runs the session bit for bit, with
+no window or mouse. A bad session captured once in the game window
+can thus be profiled over & over:
+
+    python Arc_AntsHunt.py --record session.antrec
+    python ants_replay.py session.antrec --profile
+"""
+import argparse
+import hashlib
+import json
+import struct
+import sys
+import time
+
+import ants_engine
+import ants_world
+from ants_profile import FrameProfiler
+
+MAGIC = b"ANTREC1\n"
+CONFIG_SIZE = struct.Struct("<I")
+RECORD = struct.Struct("<IBdd")
+
+# Record kinds
+KIND_CODES = {
+    ants_engine.KIND_SPIDER: 1,
+    ants_engine.KIND_LEAF: 2,
+    }
+KIND_QUALITY = 3
+KIND_END = 255
+
+class SpawnRecorder:
+    """
+    Logs every spawn into world to the file at path. Attach after
+    setup(), before the first tick: replay() sets up a fresh world of
+    the recorded config itself, so the spawns of setup() must not be
+    in the recording.
+    """
+
+    def __init__(self, world, path):
+        if world.antsBig is None or world.tickCount != 0:
+            raise ValueError(
+                "SpawnRecorder needs a world just set up (tick 0),"
+                " attach after setup()")
+        self.world = world
+        self.path = path
+        self.count = 0
+
+        config = json.dumps(world.config(), sort_keys=True).encode()
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.file.write(CONFIG_SIZE.pack(len(config)))
+        self.file.write(config)
+        world.recorder = self
+
+    def spawn(self, tick, kind, x, y):
+        # Called by World.spawnSpider() / spawnLeaf()
+        self.file.write(RECORD.pack(tick, KIND_CODES[kind], x, y))
+        self.count = self.count + 1
+
+    def quality(self, tick, level):
+        # Called by World.setQuality()
+        self.file.write(RECORD.pack(tick, KIND_QUALITY, level, 0))
+
+    def close(self):
+        # Mark the end of the session & stop recording
+        if self.file is None:
+            return
+        self.file.write(RECORD.pack(self.world.tickCount, KIND_END, 0, 0))
+        self.file.close()
+        self.file = None
+        self.world.recorder = None
+
+class SpawnLog:
+    """ Contents of a file written by SpawnRecorder """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError("%s is not a spawn recording" % path)
+
+        offset = len(MAGIC)
+        (size,) = CONFIG_SIZE.unpack_from(data, offset)
+        offset = offset + CONFIG_SIZE.size
+        self.config = json.loads(data[offset:offset + size])
+        offset = offset + size
+
+        # [(tick, kind, x, y), ...] in recorded order & quality level
+        # changes [(tick, level), ...]
+        self.spawns = []
+        self.qualities = []
+        kinds = {code: kind for kind, code in KIND_CODES.items()}
+        self.endTick = None
+        # A partly written last record is dropped
+        end = offset + (len(data) - offset) // RECORD.size * RECORD.size
+        for tick, code, x, y in RECORD.iter_unpack(data[offset:end]):
+            if code == KIND_END:
+                self.endTick = tick
+                break
+            if code == KIND_QUALITY:
+                self.qualities.append((tick, int(x)))
+                continue
+            self.spawns.append((tick, kinds[code], x, y))
+
+        if self.endTick is None:
+            # Recording cut short, e.g. by a crash. Play up to the
+            # last spawn.
+            self.endTick = self.spawns[-1][0] if self.spawns else 0
+
+def replay(log, engine=ants_world.ENGINE_PYTHON, profiler=None):
+    """
+    Re-run a recorded session headless & return the World at its
+    end tick.
+    """
+    world = ants_world.World(engine=engine, **log.config)
+    world.setup()
+    world.profiler = profiler
+
+    spawn = {
+        ants_engine.KIND_SPIDER: world.spawnSpider,
+        ants_engine.KIND_LEAF: world.spawnLeaf,
+        }
+    spawns = log.spawns
+    qualities = log.qualities
+    n = 0
+    q = 0
+    while True:
+        # Spawns & quality changes of a tick came in before that tick
+        # was stepped
+        while n < len(spawns) and spawns[n][0] == world.tickCount:
+            tick, kind, x, y = spawns[n]
+            spawn[kind](x, y)
+            n = n + 1
+        while q < len(qualities) and qualities[q][0] == world.tickCount:
+            world.setQuality(qualities[q][1])
+            q = q + 1
+        if world.tickCount >= log.endTick:
+            break
+        world.step(ants_world.TICK)
+    return world
+
+def stateDigest(world):
+    # Hash of every entity position & angle, to compare two runs
+    digest = hashlib.sha1()
+    for entity in world.allEntities():
+        digest.update(struct.pack(
+            "<ddd", entity.center_x, entity.center_y, entity.angle))
+    digest.update(struct.pack("<q", world.captureCount()))
+    return digest.hexdigest()
+
+#====================
+def main():
+    """ Replay a recorded session without a window """
+    parser = argparse.ArgumentParser(
+        description="Replay an Arc_AntsHunt spawn recording")
+    parser.add_argument("path")
+    parser.add_argument(
+        "--engine",
+        choices=(ants_world.ENGINE_PYTHON, ants_world.ENGINE_NUMPY),
+        default=ants_world.ENGINE_PYTHON)
+    parser.add_argument(
+        "--repeat", type=int, default=1,
+        help="replay this many times, e.g. while profiling")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="print per-phase timings of the last replay")
+    args = parser.parse_args()
+
+    log = SpawnLog(args.path)
+    print("%d spawns over %d ticks, seed %d" % (
+        len(log.spawns), log.endTick, log.config["seed"]))
+
+    for n in range(args.repeat):
+        profiler = FrameProfiler(log.endTick or 1) if args.profile else None
+        start = time.perf_counter()
+        world = replay(log, args.engine, profiler)
+        elapsed = time.perf_counter() - start
+        print("%d ticks in %.3f sec (%.0f ticks/sec), %d captures,"
+              " digest %s" % (
+                  world.tickCount, elapsed,
+                  world.tickCount / max(elapsed, 1e-9),
+                  world.captureCount(), stateDigest(world)))
+
+    if profiler is not None:
+        for line in profiler.report():
+            print(line)
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,692 @@
+"""
+Arc_AntsHunt - Multi-Colony Shards
+==================================
+
+A map of cols x rows regions, each the size of the classic screen &
+home to a colony of its own: nest, store, prison & ants, all at their
+usual (local) positions. Each region is simulated by its own World in
+its own worker process (a shard), so a map of many colonies keeps as
+many cores busy.
+
+Neighbouring regions share their hunting grounds:
+    - Regions above one another meet at their north / south edges.
+    - Every even column is drawn mirrored, so that the hunting grounds
+      of columns 0 & 1, 2 & 3, ... face each other across their west
+      edges, with the nests on the far sides.
+Fresh spiders wander across these edges & leaves float down across
+them from one colony's world into the next (see World.openEdges).
+Locked targets stay where they are.
+
+Shards only talk through shared memory. Each has one block of float64
+holding its stats, an inbox of spawns posted by the main process, an
+outbox of targets handed off to its neighbours & the transforms of its
+entities for the renderer. Transforms are sorted into TILE x TILE tiles
+of the region, with the first row of each tile in an index, so the
+renderer reads only the tiles in view (see ShardSet.transforms) & its
+cost does not grow with the map. Shards run in rounds, in lockstep:
+    1. The main process posts spawns & starts the round.
+    2. Each shard runs the round's ticks, then moves the targets that
+       left its region from its World into its outbox.
+    3. Each shard adopts the targets addressed to it from all
+       outboxes & publishes its entities' transforms.
+A Barrier separates the steps. Between rounds all buffers are at rest,
+which is when the main process reads them. A round costs its barrier
+waits & a publish whatever its ticks, so the game window runs all
+ticks of a frame as one round (see ShardSet.step & flush).
+
+    python ants_shards.py --colonies 4x2 --ants 2000 --seconds 60
+    python Arc_AntsHunt.py --colonies 2x2
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+
+import ants_dispatch
+import ants_engine
+import ants_world
+from ants_clock import MAX_TICKS_PER_FRAME
+from ants_governor import QUALITY_FULL
+from ants_world import (
+    World,
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    SPAWN_X_MAX,
+    EDGE_WEST,
+    EDGE_SOUTH,
+    EDGE_NORTH)
+
+# Sprite codes in the transforms buffer
+SPRITE_BIG_ANT = 0
+SPRITE_SMALL_ANT = 1
+SPRITE_SPIDER = 2
+SPRITE_LEAF = 3
+
+# Image & scale per sprite code
+SPRITE_LOOKS = {
+    SPRITE_BIG_ANT: ("ant.png", ants_world.SCALING_BIG_ANT),
+    SPRITE_SMALL_ANT: ("ant.png", ants_world.SCALING_SMALL_ANT),
+    SPRITE_SPIDER: ("spider.png", ants_world.SCALING_SPIDER),
+    SPRITE_LEAF: ("leaf.png", ants_world.SCALING_LEAF),
+    }
+
+# Layout of a shard's block, in float64 slots
+STATS_SIZE = 8
+STAT_TICK = 0
+STAT_CAPTURES = 1
+STAT_ENTITIES = 2
+STAT_HANDED_OFF = 3
+STAT_ADOPTED = 4
+STAT_HIDDEN = 5
+
+# Spawns posted per round & shard: kind, x, y
+MAX_SPAWNS = 256
+SPAWN_SIZE = 3
+
+# Targets handed off per round & shard: destination shard, kind,
+# x, y, dx, dy, xMin, xMax, angle, spawnTick. Targets that do not
+# fit wait for the next round.
+MAX_HANDOFFS = 256
+HANDOFF_SIZE = 10
+
+# Transform rows: sprite code, x, y, angle
+TRANSFORM_SIZE = 4
+
+# Tiles the transforms are sorted into, row by row from the bottom
+# left of the region. Entities beyond the region's edges go into its
+# border tiles.
+TILE = 80
+TILES_X = -(-SCREEN_WIDTH // TILE)
+TILES_Y = -(-SCREEN_HEIGHT // TILE)
+TILE_COUNT = TILES_X * TILES_Y
+
+# Target kind codes in spawns & handoffs
+KIND_SPIDER = 1
+KIND_LEAF = 2
+
+# Control block: running flag, ticks this round, publish transforms,
+# then the quality level of each shard (see ants_governor.py)
+CONTROL_RUNNING = 0
+CONTROL_TICKS = 1
+CONTROL_PUBLISH = 2
+CONTROL_QUALITY = 3
+
+# Seconds the main process waits for a round before giving up
+ROUND_TIMEOUT = 60
+
+def parseColonies(text):
+    # "COLSxROWS" -> (cols, rows)
+    try:
+        cols, rows = (int(n) for n in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected COLSxROWS, e.g. 2x2")
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError("expected COLSxROWS, e.g. 2x2")
+    return cols, rows
+
+def isMirrored(col):
+    # Even columns face their odd neighbour, see module docstring
+    return col % 2 == 0
+
+def openEdges(col, row, cols, rows):
+    # Edges of region (col, row) shared with a neighbour
+    edges = set()
+    if col ^ 1 < cols:
+        edges.add(EDGE_WEST)
+    if row > 0:
+        edges.add(EDGE_SOUTH)
+    if row < rows - 1:
+        edges.add(EDGE_NORTH)
+    return frozenset(edges)
+
+def toMap(col, row, x, y, angle):
+    # Local coordinates of region (col, row) -> map coordinates
+    if isMirrored(col):
+        x = SCREEN_WIDTH - x
+        angle = 180 - angle
+    return col * SCREEN_WIDTH + x, row * SCREEN_HEIGHT + y, angle
+
+def toLocal(cols, rows, mapX, mapY):
+    # Map coordinates -> (col, row, x, y), None if off the map
+    col = int(mapX // SCREEN_WIDTH)
+    row = int(mapY // SCREEN_HEIGHT)
+    if not (0 <= col < cols and 0 <= row < rows):
+        return None
+    x = mapX - col * SCREEN_WIDTH
+    if isMirrored(col):
+        x = SCREEN_WIDTH - x
+    return col, row, x, mapY - row * SCREEN_HEIGHT
+
+def toLocalRect(col, row, rect):
+    # Part of map rect (left, bottom, right, top) inside region
+    # (col, row), in local coordinates. None if they do not meet.
+    left, bottom, right, top = rect
+    left = max(left - col * SCREEN_WIDTH, 0)
+    right = min(right - col * SCREEN_WIDTH, SCREEN_WIDTH)
+    bottom = max(bottom - row * SCREEN_HEIGHT, 0)
+    top = min(top - row * SCREEN_HEIGHT, SCREEN_HEIGHT)
+    if left >= right or bottom >= top:
+        return None
+    if isMirrored(col):
+        left, right = SCREEN_WIDTH - right, SCREEN_WIDTH - left
+    return left, bottom, right, top
+
+def tileOf(x, y):
+    # (tx, ty) of local position (x, y), clamped to the region
+    return (min(max(int(x // TILE), 0), TILES_X - 1),
+            min(max(int(y // TILE), 0), TILES_Y - 1))
+
+def blockSize(capacity):
+    # float64 slots of a shard's block
+    return (STATS_SIZE
+            + 1 + MAX_SPAWNS * SPAWN_SIZE
+            + 1 + MAX_HANDOFFS * HANDOFF_SIZE
+            + TILE_COUNT + 1
+            + 1 + capacity * TRANSFORM_SIZE)
+
+class ShardBlock:
+    """ A shard's shared memory block, split into its sections """
+
+    def __init__(self, name, capacity, create=False):
+        size = 8 * blockSize(capacity)
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = capacity
+
+        self.data = self.shm.buf.cast("d")
+        start = 0
+        self.stats = self.data[start:start + STATS_SIZE]
+        start = start + STATS_SIZE
+        self.spawns = self.data[start:start + 1 + MAX_SPAWNS * SPAWN_SIZE]
+        start = start + len(self.spawns)
+        self.handoffs = self.data[
+            start:start + 1 + MAX_HANDOFFS * HANDOFF_SIZE]
+        start = start + len(self.handoffs)
+        # First transform row of each tile, then the total
+        self.tiles = self.data[start:start + TILE_COUNT + 1]
+        start = start + len(self.tiles)
+        self.transforms = self.data[
+            start:start + 1 + capacity * TRANSFORM_SIZE]
+
+    def rows(self, section, size):
+        # Rows posted to section, as tuples
+        count = int(section[0])
+        flat = section[1:1 + count * size].tolist()
+        return [tuple(flat[n:n + size]) for n in range(0, len(flat), size)]
+
+    def transformsIn(self, left, bottom, right, top):
+        # Transform rows of the tiles meeting local rect, as tuples
+        tiles = self.tiles
+        section = self.transforms
+        count = int(section[0])
+        tx0, ty0 = tileOf(left, bottom)
+        tx1, ty1 = tileOf(right, top)
+        found = []
+        for ty in range(ty0, ty1 + 1):
+            # The tiles of a tile row in view are next to each other
+            first = min(int(tiles[ty * TILES_X + tx0]), count)
+            end = min(int(tiles[ty * TILES_X + tx1 + 1]), count)
+            flat = section[
+                1 + first * TRANSFORM_SIZE:1 + end * TRANSFORM_SIZE].tolist()
+            found.extend(
+                tuple(flat[n:n + TRANSFORM_SIZE])
+                for n in range(0, len(flat), TRANSFORM_SIZE))
+        return found
+
+    def post(self, section, size, flat):
+        # Replace the rows of section by flat (an array("d"))
+        section[1:1 + len(flat)] = flat
+        section[0] = len(flat) // size
+
+    def close(self, unlink=False):
+        # Views must go before the block they point into
+        for view in (self.stats, self.spawns, self.handoffs,
+                     self.tiles, self.transforms, self.data):
+            view.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class Shard:
+    """ One region's World, run inside a worker process """
+
+    def __init__(self, index, cols, rows, worldArgs, blocks):
+        self.index = index
+        self.col = index % cols
+        self.row = index // cols
+        self.cols = cols
+        self.blocks = blocks
+        self.block = blocks[index]
+
+        self.world = World(**worldArgs)
+        self.world.openEdges = openEdges(self.col, self.row, cols, rows)
+        self.world.setup()
+
+        self.handedOff = 0
+        self.adopted = 0
+
+    def takeSpawns(self):
+        world = self.world
+        for kind, x, y in self.block.rows(self.block.spawns, SPAWN_SIZE):
+            if not world.canSpawnAt(x, y):
+                continue
+            if kind == KIND_SPIDER:
+                world.spawnSpider(x, y)
+            else:
+                world.spawnLeaf(x, y)
+        self.block.spawns[0] = 0
+
+    def handOff(self):
+        # Move the targets that left the region into the outbox
+        flat = array("d")
+        for target, edge in self.world.emigrants():
+            if len(flat) == MAX_HANDOFFS * HANDOFF_SIZE:
+                break
+            x = target.center_x
+            y = target.center_y
+            dx = target.dx
+            angle = target.angle
+            if edge == EDGE_WEST:
+                # Into the facing, mirrored region of the same row
+                dest = self.row * self.cols + (self.col ^ 1)
+                x = -x
+                dx = -dx
+                angle = 180 - angle
+            elif edge == EDGE_SOUTH:
+                dest = self.index - self.cols
+                y = y + SCREEN_HEIGHT
+            else:
+                dest = self.index + self.cols
+                y = y - SCREEN_HEIGHT
+
+            kind = KIND_SPIDER if target.guid == "S" else KIND_LEAF
+            flat.extend((
+                dest, kind, x, y, dx, target.dy,
+                target.xMin, target.xMax, angle, target.spawnTick))
+            self.world.removeTarget(target)
+        self.block.post(self.block.handoffs, HANDOFF_SIZE, flat)
+        self.handedOff = self.handedOff + len(flat) // HANDOFF_SIZE
+
+    def adopt(self):
+        # Take in the targets the neighbours handed to this shard
+        world = self.world
+        for block in self.blocks:
+            for row in block.rows(block.handoffs, HANDOFF_SIZE):
+                (dest, kind, x, y, dx, dy,
+                 xMin, xMax, angle, spawnTick) = row
+                if dest != self.index:
+                    continue
+                if kind == KIND_SPIDER:
+                    target = world.spawnSpider(x, y)
+                else:
+                    target = world.spawnLeaf(x, y)
+                    # Leaves keep swaying about the same line
+                    target.xMin = xMin
+                    target.xMax = xMax
+                target.dx = dx
+                target.dy = dy
+                target.angle = angle
+                target.spawnTick = int(spawnTick)
+                self.adopted = self.adopted + 1
+
+    def publish(self, transforms):
+        world = self.world
+        block = self.block
+        stats = block.stats
+        stats[STAT_TICK] = world.tickCount
+        stats[STAT_CAPTURES] = world.captureCount()
+        stats[STAT_HANDED_OFF] = self.handedOff
+        stats[STAT_ADOPTED] = self.adopted
+
+        entities = 0
+        buckets = [array("d") for n in range(TILE_COUNT)]
+        for code, members in (
+                (SPRITE_BIG_ANT, world.antsBig),
+                (SPRITE_SMALL_ANT, world.antsSmall),
+                (SPRITE_SPIDER, world.spiders),
+                (SPRITE_LEAF, world.leafs)):
+            entities = entities + len(members)
+            if not transforms:
+                continue
+            for entity in members:
+                x = entity.center_x
+                y = entity.center_y
+                tx, ty = tileOf(x, y)
+                buckets[ty * TILES_X + tx].extend((code, x, y, entity.angle))
+
+        stats[STAT_ENTITIES] = entities
+        if not transforms:
+            return
+        flat = array("d")
+        tiles = block.tiles
+        for n, bucket in enumerate(buckets):
+            tiles[n] = len(flat) // TRANSFORM_SIZE
+            flat.extend(bucket)
+        tiles[TILE_COUNT] = len(flat) // TRANSFORM_SIZE
+        limit = block.capacity * TRANSFORM_SIZE
+        stats[STAT_HIDDEN] = max(0, len(flat) - limit) // TRANSFORM_SIZE
+        block.post(block.transforms, TRANSFORM_SIZE, flat[:limit])
+
+def runShard(
+        index, cols, rows, worldArgs, controlName, names, capacity,
+        barrier):
+    """ Worker process main loop, see module docstring """
+    control = shared_memory.SharedMemory(name=controlName)
+    controls = control.buf.cast("d")
+    blocks = [ShardBlock(name, capacity) for name in names]
+    try:
+        shard = Shard(index, cols, rows, worldArgs, blocks)
+        while True:
+            barrier.wait()
+            if not controls[CONTROL_RUNNING]:
+                break
+            shard.world.setQuality(int(controls[CONTROL_QUALITY + index]))
+            shard.takeSpawns()
+            for n in range(int(controls[CONTROL_TICKS])):
+                shard.world.step(ants_world.TICK)
+            shard.handOff()
+            barrier.wait()
+            shard.adopt()
+            shard.publish(bool(controls[CONTROL_PUBLISH]))
+            barrier.wait()
+    except threading.BrokenBarrierError:
+        # The main process gave up on this round
+        pass
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        for block in blocks:
+            block.close()
+        controls.release()
+        control.close()
+
+class ShardSet:
+    """
+    The shards of a cols x rows map, driven from the main process.
+    Has step() & savePrevious(), so ants_clock.FixedStepper can run
+    it like a World; step() only counts the tick, flush() then runs
+    the ticks counted as one round. close() when done.
+    """
+
+    def __init__(
+            self, cols, rows, countAnts=ants_world.COUNT_ANTS,
+            countSpiders=ants_world.COUNT_SPIDERS,
+            countLeafs=ants_world.COUNT_LEAFS,
+            engine=ants_world.ENGINE_PYTHON,
+            dispatch=ants_dispatch.DISPATCH_FIFO,
+            seed=None, capacity=None, publish=True):
+        self.cols = cols
+        self.rows = rows
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.worldArgs = {
+            "countAnts": countAnts,
+            "countSpiders": countSpiders,
+            "countLeafs": countLeafs,
+            "engine": engine,
+            "dispatch": dispatch,
+            }
+
+        # Transform rows per shard, room for plenty of targets
+        if capacity is None:
+            capacity = countAnts + 4096
+        self.capacity = capacity
+        self.publish = publish
+
+        # Spawns not yet posted, per shard
+        self.spawns = [[] for n in range(cols * rows)]
+        self.tickCount = 0
+
+        # Ticks counted by step() for the next round
+        self.pending = 0
+
+        self.control = None
+        self.blocks = []
+        self.processes = []
+        self.barrier = None
+
+    def __len__(self):
+        return self.cols * self.rows
+
+    def mapSize(self):
+        # (width, height) of the whole map
+        return self.cols * SCREEN_WIDTH, self.rows * SCREEN_HEIGHT
+
+    def start(self):
+        # Start a worker process per shard & wait for their first state
+        context = multiprocessing.get_context("spawn")
+        self.control = shared_memory.SharedMemory(
+            create=True, size=8 * (CONTROL_QUALITY + len(self)))
+        self.controls = self.control.buf.cast("d")
+        self.controls[CONTROL_RUNNING] = 1
+        self.controls[CONTROL_PUBLISH] = 1 if self.publish else 0
+        for index in range(len(self)):
+            self.controls[CONTROL_QUALITY + index] = QUALITY_FULL
+        self.blocks = [
+            ShardBlock(None, self.capacity, create=True)
+            for n in range(len(self))]
+        names = [block.name for block in self.blocks]
+        self.barrier = context.Barrier(len(self) + 1)
+
+        for index in range(len(self)):
+            worldArgs = dict(self.worldArgs, seed=self.seed + index)
+            process = context.Process(
+                target=runShard,
+                args=(index, self.cols, self.rows, worldArgs,
+                      self.control.name, names, self.capacity,
+                      self.barrier),
+                daemon=True)
+            process.start()
+            self.processes.append(process)
+
+        self.advance(0)
+
+    def spawn(self, kind, mapX, mapY):
+        """
+        Queue a spider (ants_engine.KIND_SPIDER) or leaf at map
+        position (mapX, mapY) for the next round. Returns False if
+        the position is off the map or too close to a nest.
+        """
+        found = toLocal(self.cols, self.rows, mapX, mapY)
+        if found is None:
+            return False
+        col, row, x, y = found
+        return self.spawnLocal(row * self.cols + col, kind, x, y)
+
+    def spawnLocal(self, index, kind, x, y):
+        # Queue a spawn at local position (x, y) of shard index
+        if x > SPAWN_X_MAX:
+            return False
+        if kind == ants_engine.KIND_SPIDER:
+            code = KIND_SPIDER
+        else:
+            code = KIND_LEAF
+        self.spawns[index].append((code, x, y))
+        return True
+
+    def advance(self, ticks):
+        # One round: ticks on every shard, then the handoffs
+        for index, block in enumerate(self.blocks):
+            spawns = self.spawns[index][:MAX_SPAWNS]
+            del self.spawns[index][:MAX_SPAWNS]
+            flat = array("d")
+            for spawn in spawns:
+                flat.extend(spawn)
+            block.post(block.spawns, SPAWN_SIZE, flat)
+
+        self.controls[CONTROL_TICKS] = ticks
+        for n in range(3):
+            self.barrier.wait(ROUND_TIMEOUT)
+        self.tickCount = self.tickCount + ticks
+
+    def setQuality(self, index, level):
+        # Quality level of shard index from the next round on
+        self.controls[CONTROL_QUALITY + index] = level
+
+    def inView(self, index, rect):
+        # Whether the region of shard index meets map rect
+        return toLocalRect(
+            index % self.cols, index // self.cols, rect) is not None
+
+    def step(self, deltaTime):
+        # Count one tick for the next round, for FixedStepper.
+        # Ticks beyond what a frame may run are dropped, as there.
+        self.pending = min(self.pending + 1, MAX_TICKS_PER_FRAME)
+
+    def flush(self):
+        # Run the ticks counted by step() as one round, if any
+        if self.pending > 0:
+            ticks = self.pending
+            self.pending = 0
+            self.advance(ticks)
+
+    def savePrevious(self):
+        # Shards keep no previous state; the renderer shows the
+        # latest one.
+        pass
+
+    def stats(self):
+        # Per shard dict of its counters
+        found = []
+        for block in self.blocks:
+            stats = block.stats
+            found.append({
+                "tick": int(stats[STAT_TICK]),
+                "captures": int(stats[STAT_CAPTURES]),
+                "entities": int(stats[STAT_ENTITIES]),
+                "handedOff": int(stats[STAT_HANDED_OFF]),
+                "adopted": int(stats[STAT_ADOPTED]),
+                "hidden": int(stats[STAT_HIDDEN]),
+                })
+        return found
+
+    def transforms(self, rect=None):
+        """
+        (sprite code, map x, map y, angle) for every entity of every
+        shard, as of the end of the last round.
+        With map rect (left, bottom, right, top), only for the tiles
+        meeting it: a superset of the entities inside rect, read
+        without looking at the rest.
+        """
+        found = []
+        for index, block in enumerate(self.blocks):
+            col = index % self.cols
+            row = index // self.cols
+            if rect is None:
+                rows = block.rows(block.transforms, TRANSFORM_SIZE)
+            else:
+                local = toLocalRect(col, row, rect)
+                if local is None:
+                    continue
+                rows = block.transformsIn(*local)
+            for code, x, y, angle in rows:
+                found.append((int(code),) + toMap(col, row, x, y, angle))
+        return found
+
+    def close(self):
+        # Stop the worker processes & free the shared memory
+        if self.control is None:
+            return
+        self.controls[CONTROL_RUNNING] = 0
+        try:
+            self.barrier.wait(ROUND_TIMEOUT)
+        except threading.BrokenBarrierError:
+            pass
+        for process in self.processes:
+            process.join(ROUND_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        for block in self.blocks:
+            block.close(unlink=True)
+        self.controls.release()
+        self.control.close()
+        self.control.unlink()
+        self.control = None
+
+#====================
+def main():
+    """ Run a multi-colony map headless & report its throughput """
+    parser = argparse.ArgumentParser(
+        description="Run Arc_AntsHunt colonies across processes")
+    parser.add_argument(
+        "--colonies", type=parseColonies, default=(2, 2),
+        metavar="COLSxROWS")
+    parser.add_argument(
+        "--ants", type=int, default=ants_world.COUNT_ANTS,
+        help="ants per colony")
+    parser.add_argument("--spiders", type=int, default=0)
+    parser.add_argument("--leafs", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument(
+        "--spawn-every", type=float, default=0.5,
+        help="simulated seconds between spawns, per colony")
+    parser.add_argument(
+        "--sync-every", type=int, default=1,
+        help="ticks per round, i.e. between handoffs")
+    parser.add_argument(
+        "--engine",
+        choices=(ants_world.ENGINE_PYTHON, ants_world.ENGINE_NUMPY),
+        default=ants_world.ENGINE_PYTHON)
+    parser.add_argument(
+        "--dispatch",
+        choices=(ants_dispatch.DISPATCH_FIFO,
+                 ants_dispatch.DISPATCH_BATCH,
+                 ants_dispatch.DISPATCH_TIMED),
+        default=ants_dispatch.DISPATCH_FIFO)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    cols, rows = args.colonies
+    shards = ShardSet(
+        cols, rows, args.ants, args.spiders, args.leafs, args.engine,
+        args.dispatch, args.seed, publish=False)
+    spawner = random.Random(args.seed - 1)
+    spawnTicks = max(1, round(args.spawn_every * ants_world.FPS))
+    ticks = int(args.seconds * ants_world.FPS)
+    syncTicks = max(1, args.sync_every)
+
+    shards.start()
+    try:
+        start = time.perf_counter()
+        nextSpawn = 0
+        while shards.tickCount < ticks:
+            while nextSpawn < shards.tickCount + syncTicks:
+                for index in range(len(shards)):
+                    kind = spawner.choice((
+                        ants_engine.KIND_SPIDER, ants_engine.KIND_LEAF))
+                    shards.spawnLocal(
+                        index, kind,
+                        spawner.uniform(20, SPAWN_X_MAX),
+                        spawner.uniform(20, SCREEN_HEIGHT - 20))
+                nextSpawn = nextSpawn + spawnTicks
+            shards.advance(min(syncTicks, ticks - shards.tickCount))
+        elapsed = time.perf_counter() - start
+        stats = shards.stats()
+    finally:
+        shards.close()
+
+    entities = sum(s["entities"] for s in stats)
+    print("%d colonies, %d processes: %d ticks in %.3f sec"
+          " (%.0f ticks/sec, %.0f entity-ticks/sec)" % (
+              len(stats), len(stats), ticks, elapsed,
+              ticks / max(elapsed, 1e-9),
+              entities * ticks / max(elapsed, 1e-9)))
+    for index, s in enumerate(stats):
+        print("  colony %d,%d  %6d entities  %5d captures"
+              "  %4d handed off  %4d adopted" % (
+                  index % cols, index // cols, s["entities"],
+                  s["captures"], s["handedOff"], s["adopted"]))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+Arc_AntsHunt - World Snapshots
+==============================
+
+Saves the complete state of a World to a compact binary file & loads
+it back, so that a large colony warmed up to steady state once can be
+restarted from there any number of times (game window, benchmarks,
+headless runs).
+
+The state is stored column by column rather than object by object:
+one typed array per attribute of ants & of targets (spiders and
+leaves), plus the archive, capture latencies, registry orders & states.
+
+File layout:
+    magic       8 bytes  b"ANTSNAP1"
+    headerSize  uint64   little endian
+    header      JSON, padded to a multiple of 8 bytes. World config,
+                tick count, rng state & for each column its type code,
+                offset & length.
+    columns     raw native arrays, each starting on an 8 byte boundary
+
+Columns are read as memoryviews straight out of the file, which for
+large snapshots is memory mapped, so only the pages actually touched
+are read from disk. With the NumPy engine, the motion columns are
+copied from there into its arrays one slice each; entities are built
+from a prototype's attributes plus the few remaining columns, which
+the registries & links need as Python objects.
+
+    python ants_world.py --ants 10000 --ticks 9000 --save warm.antsnap
+    python ants_bench.py --snapshot warm.antsnap
+"""
+import gc
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import ants_engine
+import ants_world
+
+MAGIC = b"ANTSNAP1"
+HEADER_SIZE = struct.Struct("<Q")
+VERSION = 4
+
+# Files from this size on are memory mapped by default
+MMAP_THRESHOLD = 1 << 20
+
+# Per-entity attributes stored as float64 ("d") & int64 ("q") columns
+ANT_FLOATS = (
+    "center_x", "center_y", "change_x", "change_y", "angle",
+    "tilt", "dTilt", "tiltMin", "tiltMax",
+    "dx", "dy", "xMin", "xMax", "yMin", "yMax",
+    "speed")
+ANT_INTS = ("mode", "hitRank", "uid", "aimTick")
+
+TARGET_FLOATS = (
+    "center_x", "center_y", "change_x", "change_y", "angle",
+    "tilt", "dTilt", "tiltMin", "tiltMax",
+    "dx", "dy", "xMin", "xMax", "yMin", "yMax",
+    "timeDelay")
+TARGET_INTS = (
+    "lockCount", "hitCount", "homeCount", "state", "spawnTick", "uid",
+    "senseTick")
+
+# Target kind column values
+KIND_CODES = {
+    ants_engine.KIND_SPIDER: 1,
+    ants_engine.KIND_LEAF: 2,
+    }
+
+def save(world, path):
+    """ Write the state of world to a snapshot file at path """
+    ants = world.antsBig + world.antsSmall
+    targets = list(world.spiders) + list(world.leafs)
+    targetIndex = {target: n for n, target in enumerate(targets)}
+    antIndex = {ant: n for n, ant in enumerate(ants)}
+
+    columns = {}
+    for name in ANT_FLOATS:
+        columns["ant." + name] = array(
+            "d", [getattr(ant, name) for ant in ants])
+    for name in ANT_INTS:
+        columns["ant." + name] = array(
+            "q", [getattr(ant, name) for ant in ants])
+    columns["ant.target"] = array("q", [
+        -1 if ant.targetSprite is None else targetIndex[ant.targetSprite]
+        for ant in ants])
+
+    for name in TARGET_FLOATS:
+        columns["target." + name] = array(
+            "d", [getattr(target, name) for target in targets])
+    for name in TARGET_INTS:
+        columns["target." + name] = array(
+            "q", [getattr(target, name) for target in targets])
+    columns["target.kind"] = array("q", (
+        [KIND_CODES[ants_engine.KIND_SPIDER]] * len(world.spiders)
+        + [KIND_CODES[ants_engine.KIND_LEAF]] * len(world.leafs)))
+
+    # Order within the registries decides which idle ants &
+    # fresh targets come first. The state is kept as well, as ants
+    # just back home are not idle there yet
+    for name, index in (
+            ("antsBigRegistry", antIndex),
+            ("antsSmallRegistry", antIndex),
+            ("spidersRegistry", targetIndex),
+            ("leafsRegistry", targetIndex)):
+        registry = getattr(world, name)
+        members = registry.members(*registry.buckets)
+        columns["order." + name] = array(
+            "q", [index[entity] for entity in members])
+        columns["state." + name] = array(
+            "q", [registry.stateOf[entity] for entity in members])
+
+    columns["world.captureLatencies"] = array(
+        "d", world.captureLatencies)
+    for kind, entries in world.archive.entries.items():
+        columns["archive." + kind] = entries
+
+    rngVersion, rngState, gauss = world.rng.getstate()
+    header = {
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "config": world.config(),
+        "tickCount": world.tickCount,
+        "simTime": world.simTime,
+        "captures": world.captures,
+        "nextId": world.nextId,
+        "quality": world.quality,
+        "countBig": len(world.antsBig),
+        "rng": [rngVersion, list(rngState), gauss],
+        "columns": {},
+        }
+
+    offset = 0
+    for name, column in columns.items():
+        size = len(column) * column.itemsize
+        header["columns"][name] = [column.typecode, offset, len(column)]
+        offset = offset + size + (-size % 8)
+
+    text = json.dumps(header).encode()
+    text = text + b" " * (-len(text) % 8)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_SIZE.pack(len(text)))
+        f.write(text)
+        for column in columns.values():
+            data = column.tobytes()
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+
+class Snapshot:
+    """
+    Read access to a snapshot file: header & columns, the latter as
+    memoryviews into the (memory mapped) file. close() when done.
+    """
+
+    def __init__(self, path, useMmap=None):
+        with open(path, "rb") as f:
+            if useMmap is None:
+                useMmap = os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD
+            if useMmap:
+                self.buffer = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.buffer = f.read()
+
+        self.view = memoryview(self.buffer)
+        self.views = []
+        if bytes(self.view[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError("%s is not a world snapshot" % path)
+
+        start = len(MAGIC)
+        (size,) = HEADER_SIZE.unpack_from(self.buffer, start)
+        start = start + HEADER_SIZE.size
+        self.header = json.loads(bytes(self.view[start:start + size]))
+        if self.header["version"] != VERSION:
+            self.close()
+            raise ValueError("Unsupported snapshot version: %r" % (
+                self.header["version"],))
+        self.dataStart = start + size
+        self.swap = self.header["byteorder"] != sys.byteorder
+
+    def column(self, name):
+        # Column as a typed memoryview (an array if byte swapped)
+        typecode, offset, length = self.header["columns"][name]
+        start = self.dataStart + offset
+        raw = self.view[start:start + length * array(typecode).itemsize]
+        if self.swap:
+            column = array(typecode, raw.tobytes())
+            column.byteswap()
+            return column
+        column = raw.cast(typecode)
+        self.views.append(column)
+        return column
+
+    def values(self, name):
+        # Column as a list of Python numbers
+        return self.column(name).tolist()
+
+    def array(self, name):
+        # Column as a NumPy array, read in place where not byte swapped.
+        # Drop it before close().
+        np = ants_engine.np
+        typecode = self.header["columns"][name][0]
+        return np.frombuffer(self.column(name), np.dtype(typecode))
+
+    def close(self):
+        # Views must go before the mapping they point into
+        for view in self.views:
+            view.release()
+        self.views = []
+        self.view.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+def load(path, engine=ants_world.ENGINE_PYTHON, useMmap=None):
+    """ New World in the state saved to the snapshot file at path """
+    snap = Snapshot(path, useMmap)
+    # Tens of thousands of new objects, none of them garbage: the
+    # cyclic garbage collector would only scan them over & over
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return restore(snap, engine)
+    finally:
+        if collecting:
+            gc.enable()
+        snap.close()
+
+def makeEntities(prototype, rows, names, skip):
+    """
+    New entities of the class of prototype, one per row of values for
+    names, holding a copy of the other attributes of prototype except
+    those in skip. Quicker than a constructor call for each.
+    Attributes are set via __dict__, as the entities are not yet bound
+    to the NumPy engine.
+    """
+    cls = prototype.__class__
+    template = {name: value for name, value in prototype.__dict__.items()
+                if name not in skip}
+    entities = []
+    for row in rows:
+        entity = cls.__new__(cls)
+        attrs = template.copy()
+        attrs.update(zip(names, row))
+        entity.__dict__ = attrs
+        entities.append(entity)
+    return entities
+
+def columnRows(snap, prefix, names):
+    # Rows of the columns of names, one per entity
+    return zip(*[snap.values(prefix + name) for name in names])
+
+def engineValues(snap, prefix, fields, start, end):
+    # Attribute -> rows start to end of its column, for the attributes
+    # in fields (see ants_engine.EntityArrays.addMany), None if none
+    if not fields:
+        return None
+    return {name: snap.array(prefix + name)[start:end] for name in fields}
+
+def restore(snap, engine):
+    header = snap.header
+    world = ants_world.World(engine=engine, **header["config"])
+    world.clear()
+    world.tickCount = header["tickCount"]
+    world.simTime = header["simTime"]
+    world.captures = header["captures"]
+    world.nextId = header["nextId"]
+    world.quality = header.get("quality", world.quality)
+    world.captureLatencies = snap.values("world.captureLatencies")
+    rngVersion, rngState, gauss = header["rng"]
+    world.rng.setstate((rngVersion, tuple(rngState), gauss))
+
+    for name in header["columns"]:
+        if name.startswith("archive."):
+            entries = array("f")
+            entries.frombytes(snap.column(name).tobytes())
+            world.archive.entries[name[len("archive."):]] = entries
+
+    # With the NumPy engine, the motion attributes go from the
+    # columns straight into its arrays, one slice each; only the
+    # remaining attributes are set entity by entity.
+    if world.engine is not None:
+        antFields = ants_engine.ANT_FIELDS
+        targetFields = ants_engine.TARGET_FIELDS
+    else:
+        antFields = targetFields = {}
+
+    # Targets, in their original order: spiders, then leaves
+    kinds = snap.values("target.kind")
+    countSpiders = kinds.count(KIND_CODES[ants_engine.KIND_SPIDER])
+    names = [name for name in TARGET_FLOATS + TARGET_INTS
+             if name not in targetFields]
+    spider = ants_world.Spider(
+        *ants_world.TARGET_LOOKS[ants_engine.KIND_SPIDER])
+    spider.guid = "S"
+    leaf = ants_world.Leaf(
+        *ants_world.TARGET_LOOKS[ants_engine.KIND_LEAF], 0)
+    leaf.guid = "L"
+    rows = columnRows(snap, "target.", names)
+    spiders = makeEntities(
+        spider, itertools.islice(rows, countSpiders), names, targetFields)
+    leafs = makeEntities(leaf, rows, names, targetFields)
+    targets = spiders + leafs
+    world.spiders.update(dict.fromkeys(spiders))
+    world.leafs.update(dict.fromkeys(leafs))
+    world.trackMany(
+        spiders, ants_engine.KIND_SPIDER,
+        engineValues(snap, "target.", targetFields, 0, countSpiders))
+    world.trackMany(
+        leafs, ants_engine.KIND_LEAF,
+        engineValues(snap, "target.", targetFields, countSpiders,
+                     len(targets)))
+
+    # Ants, big ones first
+    countBig = header["countBig"]
+    names = [name for name in ANT_FLOATS + ANT_INTS
+             if name not in antFields]
+    rows = columnRows(snap, "ant.", names)
+    world.antsBig = makeEntities(
+        ants_world.Ant("ant.png", ants_world.SCALING_BIG_ANT, 0,
+                       world.accelTiers, world.rng),
+        itertools.islice(rows, countBig), names, antFields)
+    world.antsSmall = makeEntities(
+        ants_world.Ant("ant.png", ants_world.SCALING_SMALL_ANT, 0,
+                       world.accelTiers, world.rng),
+        rows, names, antFields)
+    ants = world.antsBig + world.antsSmall
+    for ant, link in zip(ants, snap.values("ant.target")):
+        if link >= 0:
+            ant.targetSprite = targets[link]
+    world.trackMany(
+        ants, ants_engine.KIND_ANT,
+        engineValues(snap, "ant.", antFields, 0, len(ants)))
+
+    for name, entities in (
+            ("antsBigRegistry", ants),
+            ("antsSmallRegistry", ants),
+            ("spidersRegistry", targets),
+            ("leafsRegistry", targets)):
+        world.registerMany(
+            [entities[n] for n in snap.values("order." + name)],
+            getattr(world, name), snap.values("state." + name))
+    return world
+    return world
@@ -0,0 +1,234 @@
+"""
+Arc_AntsHunt - Spatial Hash Grid
+================================
+
+Uniform grid for proximity queries over world entities.
+
+Each entity lives in exactly one square cell, keyed by the integer
+cell coordinates of its center. The grid is updated incrementally: an
+entity is only moved between cells when it actually crosses a cell
+border, so most per-tick updates are a single key comparison.
+
+Queries supported:
+    nearest()       - the n nearest entities to a point
+    within()        - all entities within a radius of a point
+    ZoneIndex       - which circular zone (nest, store, prison)
+                      contains a point
+"""
+import heapq
+import math
+
+# Default cell edge in pixels.
+# Large enough that a bouncing spider changes cell only every
+# few dozen frames, small enough to keep the nest in a few cells.
+CELL_SIZE = 128
+
+class SpatialHash:
+    """ Entities bucketed into square cells of cellSize pixels """
+
+    def __init__(self, cellSize=CELL_SIZE):
+        self.cellSize = cellSize
+
+        # (cellX, cellY) -> {entity: None}
+        self.cells = {}
+
+        # Entity -> (cellX, cellY)
+        self.cellOf = {}
+
+    def __len__(self):
+        return len(self.cellOf)
+
+    def __contains__(self, entity):
+        return entity in self.cellOf
+
+    def key(self, x, y):
+        cs = self.cellSize
+        return (math.floor(x / cs), math.floor(y / cs))
+
+    def insert(self, entity):
+        key = self.key(entity.center_x, entity.center_y)
+        self.cellOf[entity] = key
+        bucket = self.cells.get(key)
+        if bucket is None:
+            bucket = self.cells[key] = {}
+        bucket[entity] = None
+        return key
+
+    def insertMany(self, entities, keys):
+        # insert() for entities whose cell keys are known already
+        cells = self.cells
+        self.cellOf.update(zip(entities, keys))
+        for entity, key in zip(entities, keys):
+            bucket = cells.get(key)
+            if bucket is None:
+                bucket = cells[key] = {}
+            bucket[entity] = None
+
+    def remove(self, entity):
+        key = self.cellOf.pop(entity)
+        bucket = self.cells[key]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[key]
+
+    def move(self, entity, key):
+        # Shift entity into the cell with given key
+        old = self.cellOf[entity]
+        if old == key:
+            return
+        bucket = self.cells[old]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[old]
+
+        self.cellOf[entity] = key
+        bucket = self.cells.get(key)
+        if bucket is None:
+            bucket = self.cells[key] = {}
+        bucket[entity] = None
+
+    def update(self, entity):
+        # Re-file entity after it has moved
+        self.move(entity, self.key(entity.center_x, entity.center_y))
+
+    def ring(self, cx, cy, r):
+        # Keys of the cells at Chebyshev distance r from (cx, cy)
+        if r == 0:
+            yield (cx, cy)
+            return
+        for x in range(cx - r, cx + r + 1):
+            yield (x, cy - r)
+            yield (x, cy + r)
+        for y in range(cy - r + 1, cy + r):
+            yield (cx - r, y)
+            yield (cx + r, y)
+
+    def nearest(self, x, y, n, accept=None):
+        """
+        Up to n entities nearest to (x, y), closest first.
+        Only entities for which accept(entity) is true are
+        considered, if accept is given.
+
+        Cells are searched in growing square rings around the point
+        & the search stops as soon as no unvisited cell can hold
+        anything closer than the n-th best found so far.
+        """
+        if n <= 0 or not self.cells:
+            return []
+
+        cs = self.cellSize
+        cx, cy = self.key(x, y)
+
+        # Max-heap of the best n as (-distance squared, seq, entity)
+        best = []
+        seq = 0
+        visited = 0
+        r = 0
+        while visited < len(self.cells):
+            for key in self.ring(cx, cy, r):
+                bucket = self.cells.get(key)
+                if bucket is None:
+                    continue
+                visited = visited + 1
+                for entity in bucket:
+                    if accept is not None and not accept(entity):
+                        continue
+                    dx = entity.center_x - x
+                    dy = entity.center_y - y
+                    d2 = dx * dx + dy * dy
+                    seq = seq + 1
+                    if len(best) < n:
+                        heapq.heappush(best, (-d2, seq, entity))
+                    elif d2 < -best[0][0]:
+                        heapq.heapreplace(best, (-d2, seq, entity))
+
+            # Anything beyond ring r is at least r cells away
+            if len(best) == n:
+                reach = r * cs
+                if -best[0][0] <= reach * reach:
+                    break
+            r = r + 1
+
+        best.sort(reverse=True)
+        return [entity for _, _, entity in best]
+
+    def within(self, x, y, radius, accept=None):
+        """ All entities within radius of (x, y) """
+        x0, y0 = self.key(x - radius, y - radius)
+        x1, y1 = self.key(x + radius, y + radius)
+        r2 = radius * radius
+
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(self.cells):
+            keys = [(kx, ky)
+                    for kx in range(x0, x1 + 1)
+                    for ky in range(y0, y1 + 1)]
+        else:
+            # Sparse grid, cheaper to walk the occupied cells
+            keys = [(kx, ky) for (kx, ky) in self.cells
+                    if x0 <= kx <= x1 and y0 <= ky <= y1]
+
+        found = []
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket is None:
+                continue
+            for entity in bucket:
+                dx = entity.center_x - x
+                dy = entity.center_y - y
+                if dx * dx + dy * dy <= r2:
+                    if accept is None or accept(entity):
+                        found.append(entity)
+        return found
+
+class Zone:
+    """ Named circular area of the world (nest, store, prison) """
+
+    def __init__(self, name, centerX, centerY, radius):
+        self.name = name
+        self.center_x = centerX
+        self.center_y = centerY
+        self.radius = radius
+
+    def contains(self, x, y, margin=0):
+        r = self.radius + margin
+        dx = x - self.center_x
+        dy = y - self.center_y
+        return dx * dx + dy * dy <= r * r
+
+class ZoneIndex:
+    """
+    Zones pre-filed into grid cells, so that a point lookup only
+    tests the zones overlapping the cell of that point.
+    """
+
+    def __init__(self, zones, cellSize=CELL_SIZE, margin=0):
+        self.cellSize = cellSize
+        self.margin = margin
+        self.zones = list(zones)
+
+        # (cellX, cellY) -> [Zone, ...]
+        self.cells = {}
+        for zone in self.zones:
+            r = zone.radius + margin
+            x0 = math.floor((zone.center_x - r) / cellSize)
+            x1 = math.floor((zone.center_x + r) / cellSize)
+            y0 = math.floor((zone.center_y - r) / cellSize)
+            y1 = math.floor((zone.center_y + r) / cellSize)
+            for kx in range(x0, x1 + 1):
+                for ky in range(y0, y1 + 1):
+                    # Closest point of the cell to zone center
+                    nx = min(max(zone.center_x, kx * cellSize),
+                             (kx + 1) * cellSize)
+                    ny = min(max(zone.center_y, ky * cellSize),
+                             (ky + 1) * cellSize)
+                    if zone.contains(nx, ny, margin):
+                        self.cells.setdefault((kx, ky), []).append(zone)
+
+    def zoneAt(self, x, y):
+        # Zone containing (x, y), or None
+        cs = self.cellSize
+        key = (math.floor(x / cs), math.floor(y / cs))
+        for zone in self.cells.get(key, ()):
+            if zone.contains(x, y, self.margin):
+                return zone
+        return None
@@ -0,0 +1,655 @@
+"""
+Arc_AntsHunt - State Stream
+===========================
+
+Watch a running World from another process, on the same host or over
+the network, without the simulation owning a window:
+
+    python ants_stream.py --ants 2000            # headless simulation
+    python Arc_AntsHunt.py --view localhost:5600  # viewer window
+
+StatePublisher serves the world on a TCP port. After each tick it
+sends every viewer the fields that changed since the last tick, of the
+entities they changed for: position, angle, mode / state, lockCount &
+hitCount. Resting prey is left out, & delivered prey is sent only once,
+when it is archived (see ants_archive.py). A viewer that connects
+first gets the world's config & a keyframe of the full state.
+
+Frames are binary, little endian:
+    size        uint32   bytes of the frame from here on
+    kind        uint8    FRAME_CONFIG, FRAME_KEY or FRAME_DELTA
+    tick        uint32
+    counts      3 x uint32: entities, removed ids, stamps
+    ids         entity ids in ascending order, each as the gap to the
+                previous one in a varint (1 byte, mostly)
+    changes     uint8 per entity, which of the columns below it is in
+    columns     per column, the values of the entities in it:
+                    CODE     uint8 sprite code, for new entities
+                    MOVED    2 x int8 x & y change, or else
+                    PLACED   2 x int16 x & y
+                    TURNED   int8 angle change, or else
+                    ROTATED  uint16 angle
+                    STATE    uint8 mode of an ant, state of a target
+                    COUNTS   2 x uint8 lockCount & hitCount
+    removed     ids of entities gone, as ids above
+    stamps      STAMP each: sprite code, x, y, angle of archived prey
+A config frame carries World.config() as JSON instead.
+
+Positions are quantized to 1/POSITION_SCALE pixel, angles to
+ANGLE_STEPS per turn, & changes are taken between quantized values, so
+they do not add up to errors. As all ants wander & tilt, an ant that
+moves costs about 5 bytes a tick instead of 14 for all its fields. A
+keyframe is the same encoding, of all entities as new.
+
+Backpressure: the publisher never waits for a viewer. Frames a viewer
+has not taken are queued, & once more than MAX_QUEUED bytes are
+waiting, the queued frames are dropped & replaced by a fresh keyframe:
+a slow viewer skips intermediate ticks instead of slowing down the
+simulation or falling ever further behind.
+
+Compare the size of keyframes & deltas without a socket:
+    python ants_stream.py --ants 2000 --measure
+"""
+import argparse
+import json
+import random
+import socket
+import struct
+import sys
+import time
+from array import array
+
+import ants_world
+from ants_overlap import STAMP_CODES
+from ants_shards import (
+    SPRITE_BIG_ANT,
+    SPRITE_SMALL_ANT,
+    SPRITE_SPIDER,
+    SPRITE_LEAF)
+
+HOST = "localhost"
+PORT = 5600
+
+FRAME_CONFIG = 0
+FRAME_KEY = 1
+FRAME_DELTA = 2
+
+SIZE = struct.Struct("<I")
+HEADER = struct.Struct("<BIIII")
+STAMP = struct.Struct("<BhhH")
+
+# Columns of a frame: change flag, array type, values per entity
+CODE = 1
+MOVED = 2
+PLACED = 4
+TURNED = 8
+ROTATED = 16
+STATE = 32
+COUNTS = 64
+COLUMNS = (
+    (CODE, "B", 1),
+    (MOVED, "b", 2),
+    (PLACED, "h", 2),
+    (TURNED, "b", 1),
+    (ROTATED, "H", 1),
+    (STATE, "B", 1),
+    (COUNTS, "B", 2),
+    )
+
+# Quantization: steps per pixel & per turn
+POSITION_SCALE = 16
+ANGLE_STEPS = 4096
+
+# Bytes queued for a viewer beyond which its frames are dropped
+MAX_QUEUED = 1 << 20
+
+def quantizePosition(value):
+    return min(max(int(round(value * POSITION_SCALE)), -32768), 32767)
+
+def quantizeAngle(value):
+    return int(round(value * ANGLE_STEPS / 360)) % ANGLE_STEPS
+
+def turn(old, new):
+    # Shortest change of a quantized angle from old to new
+    return (new - old + ANGLE_STEPS // 2) % ANGLE_STEPS - ANGLE_STEPS // 2
+
+def packIds(ids):
+    # Ascending ids as varint gaps
+    packed = bytearray()
+    last = -1
+    for uid in ids:
+        gap = uid - last - 1
+        last = uid
+        while gap >= 0x80:
+            packed.append(gap & 0x7f | 0x80)
+            gap = gap >> 7
+        packed.append(gap)
+    return packed
+
+def unpackIds(frame, offset, count):
+    # (ids, offset after them) of count ids packed at offset
+    ids = []
+    last = -1
+    for n in range(count):
+        gap = 0
+        shift = 0
+        while True:
+            byte = frame[offset]
+            offset = offset + 1
+            gap = gap | (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift = shift + 7
+        last = last + gap + 1
+        ids.append(last)
+    return ids, offset
+
+def toBytes(values):
+    # Little endian bytes of an array
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+def fromBytes(typecode, frame, offset, count):
+    # (array of count values, offset after them) read at offset
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.frombytes(frame[offset:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, end
+
+def parseAddress(text):
+    # "HOST:PORT" or "PORT" -> (host, port)
+    host, sep, port = text.rpartition(":")
+    try:
+        return host or HOST, int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected HOST:PORT, e.g. %s:%d"
+                                         % (HOST, PORT))
+
+def encode(kind, tick, previous=None, current=None, stamps=(),
+           payload=b""):
+    """
+    One frame, see module docstring, taking the state from previous to
+    current (id -> quantized (code, x, y, angle, state, lock, hit)).
+    """
+    previous = previous or {}
+    current = current or {}
+    ids = sorted(uid for uid, entity in current.items()
+                 if previous.get(uid) != entity)
+    removed = sorted(uid for uid in previous if uid not in current)
+
+    changes = bytearray()
+    columns = {flag: array(typecode) for flag, typecode, size in COLUMNS}
+    for uid in ids:
+        code, x, y, angle, state, lock, hit = current[uid]
+        old = previous.get(uid)
+        if old is None:
+            columns[CODE].append(code)
+            columns[PLACED].extend((x, y))
+            columns[ROTATED].append(angle)
+            columns[STATE].append(state)
+            columns[COUNTS].extend((lock, hit))
+            changes.append(CODE | PLACED | ROTATED | STATE | COUNTS)
+            continue
+
+        flags = 0
+        dx = x - old[1]
+        dy = y - old[2]
+        if dx or dy:
+            if -128 <= dx < 128 and -128 <= dy < 128:
+                flags = MOVED
+                columns[MOVED].extend((dx, dy))
+            else:
+                flags = PLACED
+                columns[PLACED].extend((x, y))
+        if angle != old[3]:
+            da = turn(old[3], angle)
+            if -128 <= da < 128:
+                flags = flags | TURNED
+                columns[TURNED].append(da)
+            else:
+                flags = flags | ROTATED
+                columns[ROTATED].append(angle)
+        if state != old[4]:
+            flags = flags | STATE
+            columns[STATE].append(state)
+        if lock != old[5] or hit != old[6]:
+            flags = flags | COUNTS
+            columns[COUNTS].extend((lock, hit))
+        changes.append(flags)
+
+    parts = [HEADER.pack(kind, tick, len(ids), len(removed), len(stamps)),
+             packIds(ids), changes]
+    parts.extend(toBytes(columns[flag]) for flag, typecode, size in COLUMNS)
+    parts.append(packIds(removed))
+    parts.extend(STAMP.pack(*stamp) for stamp in stamps)
+    parts.append(payload)
+    body = b"".join(parts)
+    return SIZE.pack(len(body)) + body
+
+class Viewer:
+    """ A connected viewer & the frames queued for it """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.queue = []
+        self.queued = 0
+        # Bytes of queue[0] already sent
+        self.offset = 0
+        self.closed = False
+        self.needsKeyframe = True
+
+    def send(self, frame):
+        self.queue.append(frame)
+        self.queued = self.queued + len(frame)
+        self.flush()
+
+    def flush(self):
+        # Send as much of the queue as the socket takes right now
+        while self.queue and not self.closed:
+            frame = self.queue[0]
+            try:
+                sent = self.sock.send(memoryview(frame)[self.offset:])
+            except BlockingIOError:
+                return
+            except OSError:
+                self.close()
+                return
+            self.offset = self.offset + sent
+            self.queued = self.queued - sent
+            if self.offset < len(frame):
+                return
+            self.queue.pop(0)
+            self.offset = 0
+
+    def dropQueued(self):
+        # Drop all frames not yet begun; a frame partly sent must be
+        # finished, or the viewer loses track of the frame bounds
+        keep = self.queue[:1] if self.offset else []
+        dropped = len(self.queue) - len(keep)
+        self.queue = keep
+        self.queued = sum(len(frame) for frame in keep) - self.offset
+        return dropped
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+
+class StatePublisher:
+    """
+    Serves world to viewers on (host, port), see module docstring,
+    or only encodes frames without listen. Call publish() after each
+    tick & close() when done.
+    """
+
+    def __init__(self, world, host=HOST, port=PORT, maxQueued=MAX_QUEUED,
+                 listen=True):
+        self.world = world
+        self.maxQueued = maxQueued
+        self.server = None
+        if listen:
+            self.server = socket.create_server((host, port))
+            self.server.setblocking(False)
+        self.viewers = []
+
+        # id -> quantized entity as last published & archive entries
+        # published so far, per kind
+        self.sent = {}
+        self.stamped = {}
+
+        # Frames & bytes handed to viewers, frames dropped for slow ones
+        self.frames = 0
+        self.keyframes = 0
+        self.bytesSent = 0
+        self.dropped = 0
+
+    def address(self):
+        # (host, port) actually listened on, e.g. for port 0
+        return self.server.getsockname()[:2]
+
+    def accept(self):
+        # Take in viewers that connected since the last call
+        if self.server is None:
+            return
+        while True:
+            try:
+                sock, address = self.server.accept()
+            except BlockingIOError:
+                return
+            viewer = Viewer(sock)
+            config = json.dumps(self.world.config()).encode()
+            viewer.send(encode(
+                FRAME_CONFIG, self.world.tickCount, payload=config))
+            self.viewers.append(viewer)
+
+    def capture(self):
+        # id -> quantized (code, x, y, angle, state, lock, hit)
+        world = self.world
+        found = {}
+        for code, members in (
+                (SPRITE_BIG_ANT, world.antsBig),
+                (SPRITE_SMALL_ANT, world.antsSmall),
+                (SPRITE_SPIDER, world.spiders),
+                (SPRITE_LEAF, world.leafs)):
+            ants = code in (SPRITE_BIG_ANT, SPRITE_SMALL_ANT)
+            for entity in members:
+                if ants:
+                    state = entity.mode
+                    lock = hit = 0
+                else:
+                    state = entity.state
+                    lock = min(entity.lockCount, 255)
+                    hit = min(entity.hitCount, 255)
+                found[entity.uid] = (
+                    code,
+                    quantizePosition(entity.center_x),
+                    quantizePosition(entity.center_y),
+                    quantizeAngle(entity.angle), state, lock, hit)
+        return found
+
+    def archived(self, start=None):
+        # Quantized stamps of the prey archived since start (a kind ->
+        # count dict, default: since the last call) or ever ({})
+        archive = self.world.archive
+        if start is None:
+            start = self.stamped
+        stamps = []
+        for kind in archive.kinds():
+            for x, y, angle in archive.since(kind, start.get(kind, 0)):
+                stamps.append((
+                    STAMP_CODES[kind], quantizePosition(x),
+                    quantizePosition(y), quantizeAngle(angle)))
+        return stamps
+
+    def keyframe(self):
+        # Full state as of the last publish()
+        return encode(
+            FRAME_KEY, self.world.tickCount, None, self.sent,
+            self.archived({}))
+
+    def delta(self):
+        # Frame of what changed since the last call, taking it as sent
+        current = self.capture()
+        stamps = self.archived()
+        archive = self.world.archive
+        self.stamped = {kind: archive.count(kind)
+                        for kind in archive.kinds()}
+        frame = encode(
+            FRAME_DELTA, self.world.tickCount, self.sent, current, stamps)
+        self.sent = current
+        return frame
+
+    def publish(self):
+        """
+        Send the changes of the last tick to every viewer, a keyframe
+        to new ones & those that fell behind.
+        """
+        self.accept()
+        delta = self.delta()
+        keyframe = None
+        for viewer in self.viewers:
+            viewer.flush()
+            if not viewer.needsKeyframe and viewer.queued > self.maxQueued:
+                # Too slow: skip to the present
+                self.dropped = self.dropped + viewer.dropQueued()
+                viewer.needsKeyframe = True
+            if viewer.needsKeyframe:
+                if keyframe is None:
+                    keyframe = self.keyframe()
+                frame = keyframe
+                viewer.needsKeyframe = False
+                self.keyframes = self.keyframes + 1
+            else:
+                frame = delta
+            viewer.send(frame)
+            self.frames = self.frames + 1
+            self.bytesSent = self.bytesSent + len(frame)
+        self.viewers = [viewer for viewer in self.viewers
+                        if not viewer.closed]
+
+    def close(self):
+        for viewer in self.viewers:
+            viewer.close()
+        self.viewers = []
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+class StateClient:
+    """
+    Viewer end of a StatePublisher: poll() applies the frames
+    received so far to entities (id -> quantized [code, x, y, angle,
+    state, lockCount, hitCount]) & collects the stamps of newly
+    archived prey.
+    """
+
+    def __init__(self, host=HOST, port=PORT):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setblocking(False)
+        self.buffer = bytearray()
+        self.closed = False
+
+        self.config = None
+        self.tick = 0
+        self.entities = {}
+
+        # Stamps (code, x, y, angle) not yet taken & whether a keyframe
+        # replaced the state since the last takeStamps()
+        self.stamps = []
+        self.resynced = False
+
+    def poll(self):
+        # Apply all complete frames received, return their number
+        while not self.closed:
+            try:
+                data = self.sock.recv(1 << 16)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b""
+            if not data:
+                self.closed = True
+                break
+            self.buffer.extend(data)
+
+        frames = 0
+        start = 0
+        buffer = self.buffer
+        while len(buffer) - start >= SIZE.size:
+            (size,) = SIZE.unpack_from(buffer, start)
+            if len(buffer) - start - SIZE.size < size:
+                break
+            self.apply(memoryview(buffer)[
+                start + SIZE.size:start + SIZE.size + size])
+            start = start + SIZE.size + size
+            frames = frames + 1
+        del buffer[:start]
+        return frames
+
+    def apply(self, frame):
+        kind, tick, entities, removed, stamps = HEADER.unpack_from(frame)
+        self.tick = tick
+        offset = HEADER.size
+        if kind == FRAME_CONFIG:
+            self.config = json.loads(bytes(frame[offset:]))
+            return
+        if kind == FRAME_KEY:
+            self.entities = {}
+            self.stamps = []
+            self.resynced = True
+
+        ids, offset = unpackIds(frame, offset, entities)
+        changes = frame[offset:offset + entities]
+        offset = offset + entities
+        columns = {}
+        for flag, typecode, size in COLUMNS:
+            count = size * sum(1 for change in changes if change & flag)
+            columns[flag], offset = fromBytes(
+                typecode, frame, offset, count)
+        # Position in each column
+        at = dict.fromkeys(columns, 0)
+
+        state = self.entities
+        for uid, change in zip(ids, changes):
+            if change & CODE:
+                entity = state[uid] = [columns[CODE][at[CODE]],
+                                       0, 0, 0, 0, 0, 0]
+                at[CODE] = at[CODE] + 1
+            else:
+                entity = state[uid]
+            if change & MOVED:
+                n = at[MOVED]
+                entity[1] = entity[1] + columns[MOVED][n]
+                entity[2] = entity[2] + columns[MOVED][n + 1]
+                at[MOVED] = n + 2
+            elif change & PLACED:
+                n = at[PLACED]
+                entity[1] = columns[PLACED][n]
+                entity[2] = columns[PLACED][n + 1]
+                at[PLACED] = n + 2
+            if change & TURNED:
+                entity[3] = (entity[3] + columns[TURNED][at[TURNED]]) \
+                    % ANGLE_STEPS
+                at[TURNED] = at[TURNED] + 1
+            elif change & ROTATED:
+                entity[3] = columns[ROTATED][at[ROTATED]]
+                at[ROTATED] = at[ROTATED] + 1
+            if change & STATE:
+                entity[4] = columns[STATE][at[STATE]]
+                at[STATE] = at[STATE] + 1
+            if change & COUNTS:
+                n = at[COUNTS]
+                entity[5] = columns[COUNTS][n]
+                entity[6] = columns[COUNTS][n + 1]
+                at[COUNTS] = n + 2
+
+        removed, offset = unpackIds(frame, offset, removed)
+        for uid in removed:
+            state.pop(uid, None)
+        for n in range(stamps):
+            code, x, y, angle = STAMP.unpack_from(frame, offset)
+            self.stamps.append((
+                code, x / POSITION_SCALE, y / POSITION_SCALE,
+                angle * 360 / ANGLE_STEPS))
+            offset = offset + STAMP.size
+        frame.release()
+
+    def transforms(self):
+        # (sprite code, x, y, angle) of every entity
+        return [(code, x / POSITION_SCALE, y / POSITION_SCALE,
+                 angle * 360 / ANGLE_STEPS)
+                for code, x, y, angle, state, lock, hit
+                in self.entities.values()]
+
+    def takeStamps(self):
+        # (resynced, stamps) since the last call; after a resync the
+        # stamps are all prey archived so far
+        found = (self.resynced, self.stamps)
+        self.resynced = False
+        self.stamps = []
+        return found
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+
+#====================
+def main():
+    """ Serve a headless world to viewers, or measure frame sizes """
+    parser = argparse.ArgumentParser(
+        description="Publish a headless world to viewer processes")
+    parser.add_argument("--ants", type=int, default=ants_world.COUNT_ANTS)
+    parser.add_argument(
+        "--seconds", type=float, default=None,
+        help="simulated seconds to run (default: until interrupted,"
+        " 60 with --measure)")
+    parser.add_argument(
+        "--spawn-every", type=float, default=0.5,
+        help="simulated seconds between spawns")
+    parser.add_argument(
+        "--address", type=parseAddress, default=(HOST, PORT),
+        metavar="HOST:PORT")
+    parser.add_argument(
+        "--obstacles", action="store_true",
+        help="place rocks for the ants to route round (see ants_flow.py)")
+    parser.add_argument(
+        "--measure", action="store_true",
+        help="no socket: compare keyframe & delta sizes per tick")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    obstacles = ants_world.DEMO_OBSTACLES if args.obstacles else ()
+    world = ants_world.World(
+        countAnts=args.ants, countSpiders=0, countLeafs=0, seed=args.seed,
+        obstacles=obstacles)
+    world.setup()
+    spawner = random.Random(args.seed)
+    spawnTicks = max(1, round(args.spawn_every * ants_world.FPS))
+    seconds = args.seconds
+    if seconds is None and args.measure:
+        seconds = 60
+    ticks = None if seconds is None else int(seconds * ants_world.FPS)
+
+    publisher = StatePublisher(
+        world, *args.address, listen=not args.measure)
+    if not args.measure:
+        print("Serving on %s:%d" % publisher.address())
+
+    keyBytes = 0
+    deltaBytes = 0
+    keyTime = 0.0
+    deltaTime = 0.0
+    start = time.perf_counter()
+    try:
+        while ticks is None or world.tickCount < ticks:
+            x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+            y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+            if (world.tickCount % spawnTicks == 0
+                    and world.canSpawnAt(x, y)):
+                if spawner.random() < 0.5:
+                    world.spawnSpider(x, y)
+                else:
+                    world.spawnLeaf(x, y)
+            world.step(ants_world.TICK)
+
+            if args.measure:
+                t = time.perf_counter()
+                deltaBytes = deltaBytes + len(publisher.delta())
+                t2 = time.perf_counter()
+                keyBytes = keyBytes + len(publisher.keyframe())
+                deltaTime = deltaTime + t2 - t
+                keyTime = keyTime + time.perf_counter() - t2
+                continue
+
+            publisher.publish()
+            # Real time: wait for the next tick
+            delay = start + world.tickCount * ants_world.TICK \
+                - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close()
+
+    count = max(world.tickCount, 1)
+    if args.measure:
+        print("%d ticks, %d entities, %d archived prey" % (
+            count, len(publisher.sent), len(world.archive)))
+        print("keyframe %8.0f bytes/tick, %.3f ms to encode" % (
+            keyBytes / count, 1000 * keyTime / count))
+        print("delta    %8.0f bytes/tick, %.3f ms to diff & encode" % (
+            deltaBytes / count, 1000 * deltaTime / count))
+    else:
+        print("%d ticks, %d frames (%d keyframes) sent, %d bytes,"
+              " %d frames dropped for slow viewers" % (
+                  count, publisher.frames, publisher.keyframes,
+                  publisher.bytesSent, publisher.dropped))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
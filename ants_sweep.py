@@ -0,0 +1,277 @@
+"""
+Arc_AntsHunt - Parameter Sweep
+==============================
+
+Runs the headless World over a grid of tunables, one configuration
+(cell) per process of a pool spanning all cores.
+
+Tunables (World keyword arguments):
+    countAnts, speedBigAnt, speedSmallAnt, senseDelay, accelTiers
+
+Each cell is run with a steady, seeded stream of spawns and reports:
+    - captures per simulated second
+    - mean capture latency (simulated seconds, spawn to delivery)
+    - idle ratio, i.e. the fraction of ant-ticks spent idling in nest
+
+Every cell gets its own seed, derived from the base seed & the cell's
+parameters, so a cell produces the same result whichever worker runs
+it & in whatever order.
+
+Results are streamed, one JSON line per finished cell, to a single
+results file. A sweep that is interrupted & started again skips the
+cells already in that file. A cell's key holds everything its result
+depends on: its parameters, replica & seed plus the run settings
+(seconds, engine, dispatch, spawn interval), so a rerun with other
+settings into the same file runs all its cells afresh.
+
+    python ants_sweep.py --param countAnts=8,16,32 \\
+        --param senseDelay=0.5,1.5 --seconds 120
+    python ants_sweep.py --grid grid.json --seeds 3
+
+A grid file maps tunables to lists of values, e.g.
+    {"speedBigAnt": [3.0, 4.0],
+     "accelTiers": [[[100, 12], [200, 6], [300, 3]], [[150, 8]]]}
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import zlib
+
+import ants_dispatch
+import ants_world
+from ants_registry import ANT_IDLE, ANT_HOME
+
+RESULTS_FILE = "sweep_results.jsonl"
+
+# World keyword arguments that may be swept
+TUNABLES = (
+    "countAnts",
+    "speedBigAnt",
+    "speedSmallAnt",
+    "senseDelay",
+    "accelTiers",
+    )
+
+def parseParam(text):
+    # "name=v1,v2,..." -> (name, [values])
+    name, sep, values = text.partition("=")
+    if not sep or name not in TUNABLES:
+        raise argparse.ArgumentTypeError(
+            "expected NAME=V1,V2,... with NAME one of %s"
+            % ", ".join(TUNABLES))
+    if name == "accelTiers":
+        raise argparse.ArgumentTypeError(
+            "accelTiers can only be swept via --grid")
+    convert = int if name == "countAnts" else float
+    try:
+        return name, [convert(v) for v in values.split(",")]
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err))
+
+def runSettings(seconds, engine, dispatch, spawnEvery):
+    # Settings shared by all cells of a sweep, part of each cell's key
+    return {
+        "seconds": seconds,
+        "engine": engine,
+        "dispatch": dispatch,
+        "spawnEvery": spawnEvery,
+        }
+
+def makeCells(grid, seeds, baseSeed, settings):
+    """
+    One cell per combination of grid values & seed replica.
+    grid maps tunable name -> list of values, settings is the
+    runSettings() of the sweep.
+    """
+    names = sorted(grid)
+    cells = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        for replica in range(seeds):
+            seed = cellSeed(params, replica, baseSeed)
+            cells.append({
+                "key": cellKey(params, replica, seed, settings),
+                "params": params,
+                "replica": replica,
+                "seed": seed,
+                })
+    return cells
+
+def cellSeed(params, replica, baseSeed):
+    # Seed of a cell, from the base seed & the cell's parameters only
+    text = json.dumps(
+        {"params": params, "replica": replica}, sort_keys=True)
+    return (baseSeed + zlib.crc32(text.encode())) % 2**31
+
+def cellKey(params, replica, seed, settings):
+    return json.dumps(
+        dict(settings, params=params, replica=replica, seed=seed),
+        sort_keys=True)
+
+def runCell(cell, seconds, engine, dispatch, spawnEvery):
+    """ Run one configuration headless & return its result line """
+    seed = cell["seed"]
+    spawner = random.Random(seed + 1)
+
+    world = ants_world.World(
+        engine=engine, dispatch=dispatch, seed=seed, **cell["params"])
+    world.setup()
+
+    ants = (world.antsBigRegistry, world.antsSmallRegistry)
+    countAnts = len(ants[0]) + len(ants[1])
+    idleTicks = 0
+
+    deltaTime = ants_world.TICK
+    spawnTicks = max(1, round(spawnEvery * ants_world.FPS))
+    ticks = int(seconds * ants_world.FPS)
+    started = time.perf_counter()
+    for tick in range(ticks):
+        if tick % spawnTicks == 0:
+            x = spawner.uniform(20, ants_world.SPAWN_X_MAX)
+            y = spawner.uniform(20, ants_world.SCREEN_HEIGHT - 20)
+            if spawner.random() < 0.5:
+                world.spawnSpider(x, y)
+            else:
+                world.spawnLeaf(x, y)
+        world.step(deltaTime)
+        # Ants back home count as idle before they join the idle ants
+        for registry in ants:
+            idleTicks = (idleTicks + registry.count(ANT_IDLE)
+                         + registry.count(ANT_HOME))
+
+    latencies = world.captureLatencies
+    return {
+        "key": cell["key"],
+        "params": cell["params"],
+        "replica": cell["replica"],
+        "seed": seed,
+        "seconds": seconds,
+        "engine": engine,
+        "dispatch": dispatch,
+        "spawnEvery": spawnEvery,
+        "captures": world.captureCount(),
+        "capturesPerSec": world.captureCount() / world.simTime,
+        "meanLatencySec": (
+            sum(latencies) / len(latencies) if latencies else None),
+        "idleRatio": (
+            idleTicks / (ticks * countAnts) if countAnts else None),
+        "wallSec": time.perf_counter() - started,
+        }
+
+def runCellArgs(args):
+    # Pool.imap_unordered() passes a single argument
+    return runCell(*args)
+
+def finishedKeys(path):
+    # Keys of the cells already in the results file
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                # Partly written line of an interrupted sweep
+                continue
+    return done
+
+def endsWithNewline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def sweep(
+        cells, path, seconds, engine, dispatch, spawnEvery,
+        workers=None):
+    """
+    Run the cells not yet in the results file at path, across a pool
+    of worker processes, appending each result as it comes in.
+    Returns the number of cells run.
+    """
+    done = finishedKeys(path)
+    todo = [cell for cell in cells if cell["key"] not in done]
+    if not todo:
+        return 0
+
+    jobs = [(cell, seconds, engine, dispatch, spawnEvery)
+            for cell in todo]
+    with open(path, "a") as out, \
+            multiprocessing.Pool(workers) as pool:
+        if out.tell() > 0 and not endsWithNewline(path):
+            # Keep the partly written line of an interrupted sweep
+            # apart from the first new one
+            out.write("\n")
+        for n, result in enumerate(
+                pool.imap_unordered(runCellArgs, jobs), 1):
+            out.write(json.dumps(result, sort_keys=True) + "\n")
+            out.flush()
+            print("[%d/%d] %s  %.3f captures/sec  idle %.2f" % (
+                n, len(todo), json.dumps(result["params"], sort_keys=True),
+                result["capturesPerSec"], result["idleRatio"] or 0))
+    return len(todo)
+
+#====================
+def main():
+    """ Sweep tunables across a grid, in parallel """
+    parser = argparse.ArgumentParser(
+        description="Arc_AntsHunt parameter sweep")
+    parser.add_argument(
+        "--param", action="append", type=parseParam, default=[],
+        help="NAME=V1,V2,... (repeatable), NAME one of: %s"
+        % ", ".join(TUNABLES))
+    parser.add_argument(
+        "--grid", help="JSON file mapping tunables to lists of values")
+    parser.add_argument(
+        "--seeds", type=int, default=1,
+        help="seeded replicas per configuration")
+    parser.add_argument("--seed", type=int, default=1, help="base seed")
+    parser.add_argument(
+        "--seconds", type=float, default=120,
+        help="simulated seconds per cell")
+    parser.add_argument(
+        "--spawn-every", type=float, default=0.5,
+        help="simulated seconds between spawns")
+    parser.add_argument(
+        "--engine",
+        choices=(ants_world.ENGINE_PYTHON, ants_world.ENGINE_NUMPY),
+        default=ants_world.ENGINE_PYTHON)
+    parser.add_argument(
+        "--dispatch",
+        choices=(ants_dispatch.DISPATCH_FIFO,
+                 ants_dispatch.DISPATCH_BATCH,
+                 ants_dispatch.DISPATCH_TIMED),
+        default=ants_dispatch.DISPATCH_FIFO)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    grid.update(dict(args.param))
+    unknown = sorted(set(grid) - set(TUNABLES))
+    if unknown:
+        parser.error("unknown tunables: %s" % ", ".join(unknown))
+
+    settings = runSettings(
+        args.seconds, args.engine, args.dispatch, args.spawn_every)
+    cells = makeCells(grid, args.seeds, args.seed, settings)
+    ran = sweep(
+        cells, args.out, args.seconds, args.engine, args.dispatch,
+        args.spawn_every, args.workers)
+    print("%d of %d cells run, results in %s" % (
+        ran, len(cells), args.out))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
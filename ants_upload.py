@@ -0,0 +1,262 @@
+"""
+Arc_AntsHunt - Bulk Sprite Upload
+=================================
+
+Each assignment to a sprite's center_x, center_y or angle runs a
+property setter, which looks up the sprite's slot in each of its
+SpriteLists & writes a float or two into their buffers. Views drawing
+rows (sprite code, x, y, angle) of a world simulated elsewhere (the
+overlapped, sharded & streamed views of Arc_AntsHunt.py) made three of
+those calls per sprite & frame, most of their frame at tens of
+thousands of sprites.
+
+A SpriteBatch holds the sprites of one look (texture & scale) in a
+SpriteList that is only ever appended to, so sprite i stays in slot i
+of the list's buffers. The positions & angles of all its sprites are
+then written with one copy per buffer, straight from float32 arrays
+(place()), or, with NumPy, converted right into the buffers through
+array views of them (views(), used by fillRows()). Sprites no longer
+needed are not removed, which would cost a scan of the list each & mix
+up the slots, but parked: their size in the buffer is set to 0 so
+they draw nothing, until a later resize() takes them back.
+
+The sprites' own attributes are not updated (sprite.center_x is
+stale); nothing in the views asks them. This reaches into SpriteList
+internals of arcade 2.6 (_sprite_pos_data & co.); where they are
+missing, supported() is False & SpriteBatch uses the setters.
+
+Time placing the sprites each way, without drawing:
+    python ants_upload.py --sprites 20000
+"""
+import argparse
+import random
+import sys
+import time
+from array import array
+
+import ants_engine
+
+# SpriteList internals written to directly
+INTERNALS = (
+    "_sprite_pos_data", "_sprite_angle_data", "_sprite_size_data",
+    "_sprite_pos_changed", "_sprite_angle_changed", "_sprite_size_changed")
+
+def supported(spriteList):
+    # True if spriteList has the buffers SpriteBatch writes into
+    return all(hasattr(spriteList, name) for name in INTERNALS)
+
+def copyInto(data, start, values):
+    # Copy the float32 buffer values into array("f") data from index
+    # start, as one block
+    with memoryview(data) as target, memoryview(values) as source:
+        source = source.cast("B")
+        target = target.cast("B")
+        begin = start * data.itemsize
+        target[begin:begin + len(source)] = source
+
+class SpriteBatch:
+    """
+    count sprites of one texture & scale in spriteList, taken from
+    spritePool & placed in bulk, see module docstring. bulk=False (or
+    an arcade without the internals) places them one by one instead.
+    """
+
+    def __init__(self, spriteList, texture, scale, spritePool, bulk=True):
+        self.spriteList = spriteList
+        self.texture = texture
+        self.scale = scale
+        self.spritePool = spritePool
+        self.bulk = bulk and supported(spriteList)
+
+        # Sprites in use; those of the list beyond are parked
+        self.count = 0
+
+        # Width & height of a sprite, as held by the size buffer
+        self.size = None
+
+    def resize(self, count):
+        # Make count sprites available for place() / views()
+        spriteList = self.spriteList
+        if not self.bulk:
+            while len(spriteList) > count:
+                self.spritePool.release(spriteList.pop())
+        while len(spriteList) < count:
+            sprite = self.spritePool.acquire()
+            sprite.texture = self.texture
+            sprite.scale = self.scale
+            spriteList.append(sprite)
+            if self.size is None:
+                self.size = array("f", (sprite.width, sprite.height))
+
+        if self.bulk and count != self.count:
+            # Park the sprites no longer used, take back parked ones
+            low = min(count, self.count)
+            high = min(max(count, self.count), len(spriteList))
+            if count > self.count:
+                sizes = self.size * (high - low)
+            else:
+                sizes = array("f", bytes(8 * (high - low)))
+            copyInto(spriteList._sprite_size_data, 2 * low, sizes)
+            spriteList._sprite_size_changed = True
+        self.count = count
+
+    def place(self, xy, angles):
+        """
+        Set the positions & angles of the sprites in use: xy holds
+        x, y of each in turn, angles one each, as float32 buffers,
+        e.g. array("f") or NumPy arrays.
+        """
+        spriteList = self.spriteList
+        if not self.bulk:
+            for n, sprite in enumerate(spriteList):
+                sprite.center_x = xy[2 * n]
+                sprite.center_y = xy[2 * n + 1]
+                sprite.angle = angles[n]
+            return
+        copyInto(spriteList._sprite_pos_data, 0, xy)
+        copyInto(spriteList._sprite_angle_data, 0, angles)
+        spriteList._sprite_pos_changed = True
+        spriteList._sprite_angle_changed = True
+
+    def views(self):
+        """
+        (xy, angles): NumPy float32 arrays of shape (count, 2) &
+        (count,) over the buffers, to write the sprites in use into.
+        Drop them before the next resize(): the buffers can not grow
+        while they are held.
+        """
+        if not ants_engine.available():
+            raise ImportError(
+                "SpriteBatch.views() requires NumPy (pip install numpy)")
+        np = ants_engine.np
+        spriteList = self.spriteList
+        xy = np.frombuffer(
+            spriteList._sprite_pos_data, np.float32, 2 * self.count)
+        angles = np.frombuffer(
+            spriteList._sprite_angle_data, np.float32, self.count)
+        spriteList._sprite_pos_changed = True
+        spriteList._sprite_angle_changed = True
+        return xy.reshape(self.count, 2), angles
+
+    def draw(self):
+        self.spriteList.draw()
+
+def fillRows(batches, transforms, useNumpy=True):
+    """
+    Match batches (sprite code -> SpriteBatch) to transforms: a list
+    of rows (sprite code, x, y, angle), or the same flat in a buffer of
+    doubles such as shared memory. With NumPy (& all batches bulk), a
+    buffer is read in place & the rows of each code are converted
+    right into the sprite buffers. A list is quicker to go through
+    array("f") than to turn into a NumPy array first.
+    """
+    flat = not isinstance(transforms, list)
+    if (flat and useNumpy and ants_engine.available()
+            and all(batch.bulk for batch in batches.values())):
+        np = ants_engine.np
+        table = np.frombuffer(transforms, np.float64).reshape(-1, 4)
+        codes = table[:, 0]
+        for code, batch in batches.items():
+            rows = table[codes == code]
+            batch.resize(len(rows))
+            if len(rows):
+                xy, angles = batch.views()
+                xy[:] = rows[:, 1:3]
+                angles[:] = rows[:, 3]
+        return
+
+    if flat:
+        values = memoryview(transforms).tolist()
+        transforms = zip(
+            values[0::4], values[1::4], values[2::4], values[3::4])
+    byCode = {code: (array("f"), array("f")) for code in batches}
+    for code, x, y, angle in transforms:
+        xy, angles = byCode[code]
+        xy.append(x)
+        xy.append(y)
+        angles.append(angle)
+    for code, batch in batches.items():
+        xy, angles = byCode[code]
+        batch.resize(len(angles))
+        batch.place(xy, angles)
+
+#====================
+def main():
+    """ Time placing sprites from transform rows, per method """
+    import arcade
+    from ants_assets import loadTextures, TEXTURE_FILES
+    from ants_pool import Pool
+    from ants_shards import SPRITE_LOOKS
+
+    parser = argparse.ArgumentParser(
+        description="Per-sprite setters vs bulk upload")
+    parser.add_argument("--sprites", type=int, default=20000)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Rows of all sprite codes, their number varying by frame as in a
+    # view, as a list & flat as in shared memory
+    spawner = random.Random(args.seed)
+    frames = []
+    for frame in range(args.frames):
+        count = args.sprites - spawner.randrange(args.sprites // 10 + 1)
+        frames.append([
+            (spawner.choice(list(SPRITE_LOOKS)), spawner.uniform(0, 800),
+             spawner.uniform(0, 560), spawner.uniform(0, 360))
+            for n in range(count)])
+    flatFrames = [array("d", [value for row in rows for value in row])
+                  for rows in frames]
+
+    textures = loadTextures(TEXTURE_FILES)
+    methods = [
+        ("setters", False, False, frames),
+        ("bulk", True, False, frames),
+        ("bulk flat", True, False, flatFrames)]
+    if ants_engine.available():
+        methods.append(("bulk numpy", True, True, flatFrames))
+
+    placed = {}
+    for name, bulk, useNumpy, inputs in methods:
+        pool = Pool(arcade.Sprite)
+        batches = {
+            code: SpriteBatch(arcade.SpriteList(), textures[imgFile],
+                              scale, pool, bulk)
+            for code, (imgFile, scale) in SPRITE_LOOKS.items()}
+        # The first frame creates the sprites, leave it out
+        fillRows(batches, inputs[-1], useNumpy)
+        start = time.perf_counter()
+        for rows in inputs:
+            fillRows(batches, rows, useNumpy)
+        elapsed = time.perf_counter() - start
+
+        # What each batch holds after the last frame, for comparison
+        found = []
+        for batch in batches.values():
+            spriteList = batch.spriteList
+            if bulk:
+                flat = spriteList._sprite_pos_data[:2 * batch.count]
+                found.append(list(zip(
+                    flat[0::2], flat[1::2],
+                    spriteList._sprite_angle_data[:batch.count])))
+            else:
+                found.append([
+                    (s.center_x, s.center_y, s.angle) for s in spriteList])
+        placed[name] = found
+        print("%-10s %7.2f ms/frame for %d sprites" % (
+            name, 1000 * elapsed / len(inputs), args.sprites))
+
+    # All methods end up with the same positions (to float32)
+    reference = placed["setters"]
+    for name, found in placed.items():
+        same = all(
+            len(a) == len(b) and all(
+                abs(p - q) < 1e-3 for u, v in zip(a, b)
+                for p, q in zip(u, v))
+            for a, b in zip(reference, found))
+        print("%-10s matches setters: %s" % (name, same))
+    return 0
+
+#====================
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1503 @@
+"""
+Arc_AntsHunt - Simulation Core
+==============================
+
+This module holds the complete game logic of Arc_AntsHunt, i.e. the
+ants, spiders & leaves along with the World object that owns them.
+
+Nothing in here needs an arcade window. The World can be stepped
+directly, which lets us run thousands of ticks per second on machines
+without any display (CI boxes, servers, batch experiments).
+
+The arcade window in Arc_AntsHunt.py is just a thin renderer & input
+adapter over the World defined here.
+
+Headless run:
+    python ants_world.py --ticks 3000 [--engine numpy]
+"""
+import argparse
+import random
+import math
+import time
+
+import ants_dispatch
+import ants_engine
+import ants_pursuit
+from ants_archive import PreyArchive
+from ants_flow import FlowFields
+from ants_governor import QUALITY_FULL, QUALITY_MINIMAL
+from ants_events import (
+    EventLog,
+    EVENT_SPAWN,
+    EVENT_LOCK,
+    EVENT_HIT,
+    EVENT_DELIVER,
+    EVENT_HOME)
+from ants_pool import Pool, POOL_SIZE
+from ants_spatial import SpatialHash, Zone, ZoneIndex
+from ants_registry import (
+    Registry,
+    ANT_STATES,
+    ANT_ACTIVE_STATES,
+    ANT_IDLE,
+    ANT_OUTBOUND,
+    ANT_CARRYING,
+    ANT_RETURNING,
+    ANT_HOME,
+    TARGET_STATES,
+    TARGET_FRESH,
+    TARGET_LOCKED,
+    TARGET_CARRIED,
+    TARGET_DELIVERED)
+
+# --- Constants ---
+# Motion engines accepted by World
+ENGINE_PYTHON = "python"
+ENGINE_NUMPY = "numpy"
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 560
+FPS = 30   # Frames per sec
+
+# Simulated seconds per tick. All motion is expressed per tick, so the
+# World is always stepped by TICK (see ants_clock.py).
+TICK = 1 / FPS
+
+# Moves longer than this within one tick are jumps (e.g. scatter into
+# prison) & are not interpolated when rendering between ticks.
+TELEPORT_SPAN = 50
+
+SCALING_LEAF = 1.4
+SCALING_BIG_ANT = 1.2
+SCALING_SMALL_ANT = 0.8
+SCALING_SPIDER = 1.0
+
+# Image & scale per kind of target, as drawn by the renderer
+TARGET_LOOKS = {
+    ants_engine.KIND_SPIDER: ("spider.png", SCALING_SPIDER),
+    ants_engine.KIND_LEAF: ("leaf.png", SCALING_LEAF),
+    }
+
+COUNT_ANTS = 8
+COUNT_SPIDERS = 4
+COUNT_LEAFS = 4
+SPEED_BIG_ANT = 3.0
+SPEED_SMALL_ANT = 2.5
+
+# Deliberate time delay (sec) in sensing a fresh target
+SENSE_DELAY = 1.5
+
+# Speed multiplier while carrying a target & returning to nest
+CARRY_FACTOR = 4
+
+# Acceleration on approaching a target:
+# (span below which it applies, speed multiplier), innermost first.
+# Beyond the last span, ants move at their normal speed.
+ACCEL_TIERS = ((100, 12), (200, 6), (300, 3))
+
+NEST_RADIUS = 120
+STORE_RADIUS = (
+    SCREEN_HEIGHT - 10 - 2 * NEST_RADIUS) / 4
+PRISON_RADIUS = STORE_RADIUS
+NEST_CENTER_X = SCREEN_WIDTH - NEST_RADIUS - 10
+NEST_CENTER_Y = SCREEN_HEIGHT / 2
+STORE_CENTER_X = NEST_CENTER_X
+STORE_CENTER_Y = (
+    NEST_CENTER_Y
+    + NEST_RADIUS
+    + STORE_RADIUS)
+PRISON_CENTER_X = NEST_CENTER_X
+PRISON_CENTER_Y = (
+    NEST_CENTER_Y
+    - NEST_RADIUS
+    - PRISON_RADIUS)
+
+# Mouse clicks / spawns beyond this x are too close to ants nest
+SPAWN_X_MAX = NEST_CENTER_X - NEST_RADIUS - 100
+
+# Names of the zones in World.zones
+ZONE_NEST = "nest"
+ZONE_STORE = "store"
+ZONE_PRISON = "prison"
+
+# Name of obstacle zones (see World.setObstacles)
+ZONE_OBSTACLE = "obstacle"
+
+# Rocks between the hunting ground & the nest, as (x, y, radius)
+DEMO_OBSTACLES = ((480, 280, 45), (470, 120, 35), (470, 440, 35))
+
+# Edges of the hunting ground that fresh targets may cross into a
+# neighbouring world (see World.openEdges & ants_shards.py). The east
+# edge is the nest's side & always closed.
+EDGE_WEST = "west"
+EDGE_SOUTH = "south"
+EDGE_NORTH = "north"
+
+class Entity:
+    """
+    Minimal stand-in for arcade.Sprite, carrying only what the
+    simulation needs (position, velocity & angle).
+
+    The image file & scale are retained so that the renderer can
+    build a matching arcade.Sprite for each entity.
+    """
+
+    def __init__(self, imgFile, scaleFactor):
+        self.imgFile = imgFile
+        self.scale = scaleFactor
+
+        self.center_x = 0.0
+        self.center_y = 0.0
+        self.change_x = 0.0
+        self.change_y = 0.0
+        self.angle = 0.0
+
+        # World & lifecycle registry the entity belongs to
+        # (set by World)
+        self.world = None
+        self.registry = None
+
+        # Id in the world's event log, see World.newId()
+        self.uid = -1
+
+class Ant(Entity):
+
+    def __init__(
+            self, imgFile, scaleFactor, speed, accelTiers=ACCEL_TIERS,
+            rng=random):
+
+        super().__init__(imgFile, scaleFactor)
+
+        self.targetSprite = None
+
+        # For angular squiggle
+        self.dTilt = 0.5  # degrees
+        self.tiltMin = -2.5
+        self.tiltMax = 2.5
+        self.tilt = 0
+
+        # For perpetual linear movement within defined boundaries
+        # speed argument is supplied while creating the Ant() object
+        # in class World.
+        self.speed = speed
+        self.accelTiers = accelTiers
+
+        # Tick at which the ant expects to meet its target under
+        # intercept pursuit, -1 if none (see ants_pursuit.py)
+        self.aimTick = -1
+
+        # Random source for scatter(), the World's own when created
+        # by the World
+        self.rng = rng
+
+        self.xMin = NEST_CENTER_X - 0.7 * NEST_RADIUS
+        self.yMin = NEST_CENTER_Y - 0.7 * NEST_RADIUS
+        self.xMax = self.xMin + 1.4 * NEST_RADIUS
+        self.yMax = self.yMin + 1.4 * NEST_RADIUS
+        self.dx = 0.3
+        self.dy = 0.3
+
+        # Mode:
+        # 0 - Idling in nest.
+        # 1 - Moving outward to capture target.
+        # 2 - Carrying target to holding point (Store or Prison).
+        # 3 - Returning to nest after completion of job.
+        self.mode = 0
+
+        # Hit Rank:
+        # (Used for re-positioning of ant pair after hitting the target)
+        # 1 - It is the first ant to hit the given target
+        # 2 - It is the 2nd ant to hit the given target
+        self.hitRank = 0
+
+    def setMode(self, mode):
+        # Change mode & move the ant to the matching registry bucket
+        self.mode = mode
+        if self.registry is not None:
+            self.registry.move(self, mode)
+
+    def chaseTarget(self):
+        """
+        This function handles ant activities covering tracking &
+        capture of target, dragging it to holding point (Spider Prison
+        or Leaf Store) and finally - return to ants nest.
+
+        Note:
+            change_x & change_y carry the per-frame velocity,
+            same as the built-in attributes of arcade.Sprite class
+        """
+        # No action if there is no target assigned
+        if not self.targetSprite:
+            return
+
+        # Get the destination location (& its zone)
+        if self.mode == 1:
+            # It is outward trip towards the target.
+            dest_x = self.targetSprite.center_x
+            dest_y = self.targetSprite.center_y
+            zone = None
+        elif self.mode == 2:
+            # Dragging the target to holding point.
+            if self.targetSprite.guid == "S":
+                # If Spider - To Prison
+                dest_x = PRISON_CENTER_X
+                dest_y = PRISON_CENTER_Y
+                zone = ZONE_PRISON
+            else:
+                # If Leaf - To Store
+                dest_x = STORE_CENTER_X
+                dest_y = STORE_CENTER_Y
+                zone = ZONE_STORE
+        else:
+            # Return To Nest
+            dest_x = NEST_CENTER_X
+            dest_y = NEST_CENTER_Y
+            zone = ZONE_NEST
+
+        # Distance upto destination
+        span = self.getDiagonal(
+            dest_x - self.center_x,
+            dest_y - self.center_y)
+
+        # Accelerate on approaching target by using
+        # multiplying  factor mf
+        if self.mode == 1:
+            mf = 1
+            for limit, factor in self.accelTiers:
+                if span < limit:
+                    mf = factor
+                    break
+        else:
+            # Return at a uniform speed, faster than normal
+            mf = CARRY_FACTOR
+
+        # If too close to the target, snap into it & start return journey
+        # after both ants of the pair have hit the target.
+        if span <= self.getDiagonal(
+                    self.change_x * mf,
+                    self.change_y * mf):
+            self.center_x = dest_x
+            self.center_y = dest_y
+
+            if self.mode == 1:
+                # We have reached the end of outward trip
+                # Prepare for moving to holding point:
+                self.targetSprite.hitCount = self.targetSprite.hitCount + 1
+                if self.targetSprite.hitCount > 1:
+                    # Both ants of the pair are on it now
+                    self.targetSprite.setState(TARGET_CARRIED)
+
+                # Assign hitRank
+                # (i.e. whether the ant is first or second one to hit the target)
+                if self.hitRank == 0:
+                    self.hitRank = self.targetSprite.hitCount
+
+                # Reposition the ant pair as per hitRank
+                if self.hitRank > 1:
+                    self.center_x = self.targetSprite.center_x + 5
+                    self.center_y = self.targetSprite.center_y + 5
+                else:
+                    self.center_x = self.targetSprite.center_x - 5
+                    self.center_y = self.targetSprite.center_y - 5
+
+                # Set the velocity based upon normallized vector
+                # taking into account the pertinent holding point.
+                if self.targetSprite.guid == "S":
+                    self.setVelocity(
+                        PRISON_CENTER_X,
+                        PRISON_CENTER_Y)
+                else:
+                    self.setVelocity(
+                        STORE_CENTER_X,
+                        STORE_CENTER_Y)
+
+                # Set the mode for moving to holding point
+                self.setMode(ANT_CARRYING)
+                self.logEvent(EVENT_HIT, self.targetSprite)
+
+            elif self.mode == 2:
+                # We have reached the holding point
+                if self.targetSprite.guid == "S":
+                    self.targetSprite.center_x = PRISON_CENTER_X
+                    self.targetSprite.center_y = PRISON_CENTER_Y
+                    self.scatter(self.targetSprite, 0.7 * PRISON_RADIUS)
+                else:
+                    self.targetSprite.center_x = STORE_CENTER_X
+                    self.targetSprite.center_y = STORE_CENTER_Y
+                    self.scatter(self.targetSprite, 0.7 * STORE_RADIUS)
+                if self.targetSprite.state != TARGET_DELIVERED:
+                    self.logEvent(EVENT_DELIVER, self.targetSprite)
+                self.targetSprite.setState(TARGET_DELIVERED)
+
+                # Proceed to the nest now
+                self.setVelocity(
+                    NEST_CENTER_X,
+                    NEST_CENTER_Y)
+
+                # Set the mode for returning to ants nest
+                self.setMode(ANT_RETURNING)
+
+            elif self.mode == 3:
+                # We have returned to ants nest
+
+                # Stop motion
+                self.change_x = 0
+                self.change_y = 0
+                self.hitRank = 0
+
+                # Reposition the returning ants via random scatter
+                self.scatter(self, 0.7 * NEST_RADIUS)
+
+                # Set the mode to idle. The ant joins the idle ants
+                # on the next tick only, see World.getTarget
+                self.mode = ANT_IDLE
+                if self.registry is not None:
+                    self.registry.move(self, ANT_HOME)
+
+                # Job Finished - De-assign targetSprite
+                target = self.targetSprite
+                self.targetSprite = None
+                self.logEvent(EVENT_HOME, target)
+
+                # Once the pair is home, no ant refers to the
+                # target any more & it can be reused.
+                target.homeCount = target.homeCount + 1
+                if (target.homeCount >= target.lockCount
+                        and self.world is not None):
+                    self.world.releaseTarget(target)
+
+        else:
+            # Make sure outward or inward movement takes
+            # place only when a pair of ants is active for same target
+            if ((self.mode <= 1
+                        and  self.targetSprite.lockCount > 1)
+                        or (self.mode > 1
+                        and  self.targetSprite.hitCount > 1)):
+                if (zone is not None and self.world is not None
+                        and self.world.flow is not None):
+                    # Route round the world's obstacles
+                    self.steer(
+                        self.world.flow.field(zone), dest_x, dest_y, span)
+                self.center_x += self.change_x * mf
+                self.center_y += self.change_y * mf
+
+                if self.mode == 2:
+                    # Drag the target to holding point
+                    # by linking it to ant movement.
+                    self.targetSprite.center_x = self.center_x + 5
+                    self.targetSprite.center_y = self.center_y + 5
+
+        # Constant tracking of moving target, heading for where it
+        # can be met under intercept pursuit.
+        if self.mode == 1:
+            if self.world is not None and self.world.interceptor:
+                dest_x, dest_y = self.world.interceptor.aimPoint(
+                    self.world, self, self.targetSprite)
+            self.setVelocity(dest_x, dest_y)
+
+    def logEvent(self, event, target):
+        # Report event of this ant's job to the world's event log
+        world = self.world
+        if world is not None and world.events is not None:
+            world.events.emit(
+                world.tickCount, event, world.targetKind(target),
+                self.uid, target.uid, self.center_x, self.center_y)
+
+    def setVelocity(self, dest_x, dest_y):
+        # Calculate the angle in radians between the start points
+        # and end points. This is the angle the ant will follow.
+        x_diff = dest_x - self.center_x
+        y_diff = dest_y - self.center_y
+
+        # Vector angle in radians
+        angle = math.atan2(y_diff, x_diff)
+
+        # Taking into account the angle, calculate change_x
+        # and change_y. Velocity is how fast the ant travels.
+        self.change_x = math.cos(angle) * self.speed
+        self.change_y = math.sin(angle) * self.speed
+
+        # Rotate the ant so as to point towards destination.
+        # Sprite angle is to be applied in degrees
+        self.angle = math.degrees(angle)
+
+    def steer(self, field, dest_x, dest_y, span):
+        # Head down the flow field (see ants_flow.py), or straight for
+        # the destination once inside its zone
+        if span <= field.radius:
+            self.setVelocity(dest_x, dest_y)
+            return
+        headX, headY, angle = field.heading(self.center_x, self.center_y)
+        self.change_x = headX * self.speed
+        self.change_y = headY * self.speed
+        self.angle = angle
+
+    def getDiagonal(self, spanX, spanY):
+        return math.sqrt(spanX**2 + spanY**2)
+
+    def getVectorAngleRadians(
+                    self, startX, startY, destX, destY):
+        return math.atan2(
+            (destY - startY), (destX - startX))
+
+    def getVectorAngleDegrees(
+                    self, startX, startY, destX, destY):
+        return math.degrees(
+            self.getVectorAngleRadians(
+            startX, startY, destX, destY))
+
+    def scatter(self, mySprite, halfRange):
+        # Random scattering of sprite object within given range.
+        hr = int(halfRange)
+        fr = 2 * hr
+        mySprite.center_x = \
+            mySprite.center_x + self.rng.randrange(fr) - hr
+        mySprite.center_y = \
+            mySprite.center_y + self.rng.randrange(fr) - hr
+
+    def animate(self):
+        # Some squiggling animation:
+        self.tilt = self.tilt + self.dTilt
+
+        if self.tilt > self.tiltMax:
+            self.dTilt = -self.dTilt
+            self.tilt = self.tiltMax
+
+        if self.tilt < self.tiltMin:
+            self.dTilt = -self.dTilt
+            self.tilt = self.tiltMin
+
+        self.angle = self.angle + self.tilt
+
+    def idleMove(self):
+        # Perpetual movement within specified boundaries
+        if self.mode != 0:
+            return
+
+        self.center_x = self.center_x + self.dx
+        if self.center_x > self.xMax:
+            self.dx = - self.dx
+            self.center_x = self.xMax
+
+        if self.center_x < self.xMin:
+            self.dx = - self.dx
+            self.center_x = self.xMin
+
+        self.center_y = self.center_y + self.dy
+        if self.center_y > self.yMax:
+            self.dy = - self.dy
+            self.center_y = self.yMax
+
+        if self.center_y < self.yMin:
+            self.dy = - self.dy
+            self.center_y = self.yMin
+
+class Target(Entity):
+    """
+    Common part of the ants' prey, i.e. Spider & Leaf.
+    Subclasses call reset() from their own __init__().
+    """
+
+    def reset(self):
+        # Fresh target state, also used when a pooled target is reused
+        self.angle = 0.0
+        self.change_x = 0.0
+        self.change_y = 0.0
+        self.lockCount = 0
+        self.hitCount = 0
+
+        # Ants of the pair back in the nest after delivery
+        self.homeCount = 0
+
+        # Lifecycle state (see ants_registry.py)
+        self.state = TARGET_FRESH
+
+        # For time delay in sensing target, & the tick at which it
+        # counts as sensed under timed dispatch (-1 until scheduled,
+        # see ants_dispatch.TimedDispatcher)
+        self.timeDelay = 0
+        self.senseTick = -1
+
+        # Predicted path & the tick it starts at, under intercept
+        # pursuit (see ants_pursuit.py)
+        self.path = None
+        self.pathTick = 0
+
+        # World tick at which the target appeared
+        self.spawnTick = 0
+
+    def setState(self, state):
+        # Change state & move the target to the matching registry bucket
+        if state == self.state:
+            return
+        self.state = state
+        if self.registry is not None:
+            self.registry.move(self, state)
+        if state == TARGET_DELIVERED and self.world is not None:
+            self.world.targetDelivered(self)
+
+class Leaf(Target):
+    def __init__(self, imgFile, scaleFactor, centerX):
+        super().__init__(imgFile, scaleFactor)
+        self.reset(centerX)
+
+    def reset(self, centerX=0):
+        super().reset()
+
+        # For angular oscillation
+        self.dTilt = 0.2  # degrees
+        self.tiltMin = -2.5
+        self.tiltMax = 2.5
+        self.tilt = 0
+
+        # For horizontal oscillation while floating downwards.
+        self.dx = 1.0
+        self.dy = -0.9
+        self.xMin = centerX - 30
+        self.xMax = centerX + 30
+        self.yMin = 0
+        self.yMax = SCREEN_HEIGHT
+
+    def openBounds(self, edges):
+        # Keep floating down across an open south edge, instead of
+        # starting over at the top
+        if EDGE_SOUTH in edges:
+            self.yMin = -math.inf
+
+    def closeBounds(self):
+        self.yMin = 0
+
+    def animate(self, tilt=True):
+        # Some squiggling animation, unless tilt is False:
+        if self.hitCount > 0:
+            return
+
+        # Angular oscillation
+        if tilt:
+            self.tilt = self.tilt + self.dTilt
+
+            if self.tilt > self.tiltMax:
+                self.dTilt = -self.dTilt
+                self.tilt = self.tiltMax
+
+            if self.tilt < self.tiltMin:
+                self.dTilt = -self.dTilt
+                self.tilt = self.tiltMin
+
+            self.angle = self.angle + self.tilt
+
+        # Horizontal oscillation while floating downwards.
+        self.center_x = self.center_x + self.dx
+        if self.center_x > self.xMax:
+            self.dx = -self.dx
+            self.center_x = self.xMax
+
+        if self.center_x < self.xMin:
+            self.dx = -self.dx
+            self.center_x = self.xMin
+
+        self.center_y = self.center_y + self.dy
+        if self.center_y < self.yMin:
+            self.center_y = self.yMax
+
+class Spider(Target):
+    def __init__(self, imgFile, scaleFactor):
+        super().__init__(imgFile, scaleFactor)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+
+        # For angular ooscillation
+        self.dTilt = 0.5  # degrees
+        self.tiltMin = -2.5
+        self.tiltMax = 2.5
+        self.tilt = 0
+
+        # For perpetual movement within given boundaries.
+        self.dx = 2.0
+        self.dy = 3.5
+        self.xMin = 0
+        self.xMax = SPAWN_X_MAX
+        self.yMin = 0
+        self.yMax = SCREEN_HEIGHT
+
+    def openBounds(self, edges):
+        # Wander off across the given edges, instead of bouncing
+        if EDGE_WEST in edges:
+            self.xMin = -math.inf
+        if EDGE_SOUTH in edges:
+            self.yMin = -math.inf
+        if EDGE_NORTH in edges:
+            self.yMax = math.inf
+
+    def closeBounds(self):
+        self.xMin = 0
+        self.yMin = 0
+        self.yMax = SCREEN_HEIGHT
+
+    def animate(self, tilt=True):
+        # Some squiggling animation, unless tilt is False:
+        if self.hitCount > 0:
+            return
+
+        # For angular ooscillation
+        if tilt:
+            self.tilt = self.tilt + self.dTilt
+
+            if self.tilt > self.tiltMax:
+                self.dTilt = -self.dTilt
+                self.tilt = self.tiltMax
+
+            if self.tilt < self.tiltMin:
+                self.dTilt = -self.dTilt
+                self.tilt = self.tiltMin
+
+            self.angle = self.angle + self.tilt
+
+        # For perpetual movement within given boundaries.
+        self.center_x = self.center_x + self.dx
+        if self.center_x > self.xMax:
+            self.dx = -self.dx
+            self.center_x = self.xMax
+
+        if self.center_x < self.xMin:
+            self.dx = -self.dx
+            self.center_x = self.xMin
+
+        self.center_y = self.center_y + self.dy
+        if self.center_y > self.yMax:
+            self.dy = -self.dy
+            self.center_y = self.yMax
+
+        if self.center_y < self.yMin:
+            self.dy = -self.dy
+            self.center_y = self.yMin
+
+class World:
+    """
+    Owns the ants, spiders & leaves and advances all of them
+    via step(). No window or GL context is required.
+
+    engine selects how the per-frame motion is computed:
+        ENGINE_PYTHON - animate() / idleMove() per entity.
+        ENGINE_NUMPY - one vectorized pass (see ants_engine.py).
+
+    dispatch selects how idle ants are assigned to fresh targets:
+        DISPATCH_FIFO - oldest target, one pair per frame.
+        DISPATCH_BATCH - all targets at once (see ants_dispatch.py).
+        DISPATCH_TIMED - as FIFO, but all targets are sensed at once,
+        by deadline (see ants_dispatch.py).
+
+    quality (see ants_governor.py & setQuality) selects how much
+    cosmetic work step() does, QUALITY_FULL by default.
+
+    pursuit selects where outbound ants head for:
+        PURSUIT_DIRECT - the target's current position.
+        PURSUIT_INTERCEPT - the earliest point at which they can meet
+        the target (see ants_pursuit.py).
+
+    obstacles are circles (x, y, radius) that carrying & returning
+    ants route round, see setObstacles().
+
+    poolSize spiders & leaves each are pre-built during setup().
+    Delivered targets go back to their pool & are reused by later
+    spawns (see ants_pool.py).
+
+    All randomness comes from the World's own rng, re-seeded with
+    seed by setup(). Two worlds of the same seed & config, fed the
+    same spawns at the same ticks, run identically.
+    """
+
+    def __init__(
+            self,
+            countAnts=COUNT_ANTS,
+            countSpiders=COUNT_SPIDERS,
+            countLeafs=COUNT_LEAFS,
+            engine=ENGINE_PYTHON,
+            dispatch=ants_dispatch.DISPATCH_FIFO,
+            poolSize=POOL_SIZE,
+            speedBigAnt=SPEED_BIG_ANT,
+            speedSmallAnt=SPEED_SMALL_ANT,
+            senseDelay=SENSE_DELAY,
+            accelTiers=ACCEL_TIERS,
+            seed=None,
+            pursuit=ants_pursuit.PURSUIT_DIRECT,
+            obstacles=()):
+
+        if engine not in (ENGINE_PYTHON, ENGINE_NUMPY):
+            raise ValueError("Unknown engine: %r" % (engine,))
+        if dispatch not in (
+                ants_dispatch.DISPATCH_FIFO,
+                ants_dispatch.DISPATCH_BATCH,
+                ants_dispatch.DISPATCH_TIMED):
+            raise ValueError("Unknown dispatch: %r" % (dispatch,))
+        if pursuit not in (
+                ants_pursuit.PURSUIT_DIRECT,
+                ants_pursuit.PURSUIT_INTERCEPT):
+            raise ValueError("Unknown pursuit: %r" % (pursuit,))
+        if engine == ENGINE_NUMPY and not ants_engine.available():
+            raise ImportError(
+                "The numpy engine requires NumPy (pip install numpy)")
+
+        self.countAnts = countAnts
+        self.countSpiders = countSpiders
+        self.countLeafs = countLeafs
+        self.engineName = engine
+        self.dispatchName = dispatch
+        self.pursuitName = pursuit
+        self.poolSize = poolSize
+
+        # Tunables, defaulting to the module constants
+        self.speedBigAnt = speedBigAnt
+        self.speedSmallAnt = speedSmallAnt
+        self.senseDelay = senseDelay
+        self.accelTiers = tuple(sorted(
+            tuple(tier) for tier in accelTiers))
+
+        # Seed of rng, picked at random unless given
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng = None
+
+        # Optional ants_replay.SpawnRecorder logging every spawn
+        self.recorder = None
+
+        # Edges of the hunting ground that fresh targets may leave the
+        # world by (EDGE_WEST, EDGE_SOUTH, EDGE_NORTH), see emigrants()
+        self.openEdges = frozenset()
+
+        # Optional ants_events.EventLog receiving lifecycle events &
+        # the id given to the next entity
+        self.events = None
+        self.nextId = 0
+
+        # Batch or timed dispatcher (none for FIFO dispatch)
+        if dispatch == ants_dispatch.DISPATCH_BATCH:
+            self.dispatcher = ants_dispatch.BatchDispatcher(
+                NEST_CENTER_X, NEST_CENTER_Y, CARRY_FACTOR,
+                self.accelTiers)
+        elif dispatch == ants_dispatch.DISPATCH_TIMED:
+            self.dispatcher = ants_dispatch.TimedDispatcher(
+                self.senseDelay, TICK)
+        else:
+            self.dispatcher = None
+
+        # Aim point predictor (intercept pursuit only)
+        if pursuit == ants_pursuit.PURSUIT_INTERCEPT:
+            self.interceptor = ants_pursuit.Interceptor(self.accelTiers)
+        else:
+            self.interceptor = None
+
+        # Struct-of-arrays motion engine (numpy engine only)
+        self.engine = None
+
+        # Variables that will hold entity lists, in drawing order.
+        # Leaves & spiders are dicts used as ordered sets, as they
+        # leave the world again once delivered.
+        self.antsBig = None
+        self.antsSmall = None
+        self.leafs = None
+        self.spiders = None
+
+        # Free lists of spiders & leaves
+        self.spiderPool = None
+        self.leafPool = None
+
+        # Optional callable(target), called just before a delivered
+        # target leaves the world for its pool (e.g. by the renderer)
+        self.releaseHook = None
+
+        # Resting places of the targets gone back to their pool,
+        # see ants_archive.py
+        self.archive = None
+
+        # Lifecycle registries, see ants_registry.py
+        self.antsBigRegistry = None
+        self.antsSmallRegistry = None
+        self.leafsRegistry = None
+        self.spidersRegistry = None
+
+        # Spatial hash of all entities & the nest / store / prison
+        # zones, see ants_spatial.py
+        self.grid = None
+        self.zones = ZoneIndex([
+            Zone(ZONE_NEST, NEST_CENTER_X, NEST_CENTER_Y, NEST_RADIUS),
+            Zone(ZONE_STORE, STORE_CENTER_X, STORE_CENTER_Y, STORE_RADIUS),
+            Zone(ZONE_PRISON, PRISON_CENTER_X, PRISON_CENTER_Y,
+                 PRISON_RADIUS),
+            ])
+
+        # Obstacles as (x, y, radius), the same as zones & the flow
+        # fields round them (none without obstacles)
+        self.obstacles = []
+        self.obstacleZones = ZoneIndex([])
+        self.flow = None
+        self.setObstacles(obstacles)
+
+        # Number of steps taken & simulated seconds so far
+        self.tickCount = 0
+        self.simTime = 0.0
+
+        # Entity -> (x, y, angle) before the latest tick
+        # (python engine only, the numpy engine keeps its own)
+        self.previous = {}
+
+        # Simulated seconds from spawn to delivery, per capture
+        self.captureLatencies = []
+        self.captures = 0
+
+        # Optional ants_profile.FrameProfiler timing each phase of step()
+        self.profiler = None
+
+        # Cosmetic work done by step(), see setQuality()
+        self.quality = QUALITY_FULL
+
+    def getTargetSpider(self, deltaTime):
+        self.getTarget(
+            self.spidersRegistry, self.antsBigRegistry, deltaTime)
+
+    def getTargetLeaf(self, deltaTime):
+        self.getTarget(
+            self.leafsRegistry, self.antsSmallRegistry, deltaTime)
+
+    def getTarget(self, targets, ants, deltaTime):
+        """
+        Lock a pair of idle ants onto the oldest fresh target and
+        move all ants that are out on a job.
+
+        Only the active ants are visited, so the cost does not
+        depend upon the number of idle ants or resting targets.
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.dispatch(self, targets, ants, deltaTime)
+
+        elif (targets.count(TARGET_FRESH) > 0
+                    and ants.count(ANT_IDLE) > 1):
+
+            target = targets.first(TARGET_FRESH)[0]
+            # Time delay of 1.5 sec in sensing target
+            target.timeDelay = target.timeDelay + deltaTime
+            if target.timeDelay > self.senseDelay:
+                self.launchPair(ants.first(ANT_IDLE, 2), target, True)
+
+        # Ants that came home during the last tick join the back of
+        # the idle ants only now, after dispatch & in list order, as
+        # they always have
+        if ants.count(ANT_HOME) > 0:
+            for ant in sorted(ants.members(ANT_HOME),
+                              key=lambda ant: ant.uid):
+                ants.move(ant, ANT_IDLE)
+
+        # Active ants move in list order too, which decides the order
+        # of their random draws
+        active = sorted(ants.members(*ANT_ACTIVE_STATES),
+                        key=lambda ant: ant.uid)
+        for ant in active:
+            # If both ants in the pair have locked on
+            # the target, call chaseTarget() method in Ant class
+            if ant.targetSprite.lockCount > 1:
+                ant.chaseTarget()
+
+    def launchPair(self, pair, target, fromNest):
+        """
+        Lock given pair of idle ants onto target.
+        If fromNest, the ants first line up at the nest center,
+        else they set out from wherever they are.
+        """
+        target.timeDelay = 0
+        for n in range(2):
+            ant = pair[n]
+            ant.targetSprite = target
+            ant.aimTick = -1
+            ant.setMode(ANT_OUTBOUND)
+            if fromNest:
+                ant.center_x = NEST_CENTER_X
+                if n > 0:
+                    ant.center_y = NEST_CENTER_Y + 20
+                else:
+                    ant.center_y = NEST_CENTER_Y - 20
+
+        # Set the target sprite lock count
+        target.lockCount = target.lockCount + 2
+        target.setState(TARGET_LOCKED)
+
+        # A locked target stays in this world
+        if self.openEdges:
+            target.closeBounds()
+
+        if self.events is not None:
+            for ant in pair[:2]:
+                self.events.emit(
+                    self.tickCount, EVENT_LOCK, self.targetKind(target),
+                    ant.uid, target.uid, target.center_x, target.center_y)
+
+    def holdingPoint(self, target):
+        # Spiders go to Spider Prison, leaves to Leaf Store
+        if target.guid == "S":
+            return (PRISON_CENTER_X, PRISON_CENTER_Y)
+        return (STORE_CENTER_X, STORE_CENTER_Y)
+
+    def targetDelivered(self, target):
+        # Called once the target rests in Spider Prison / Leaf Store
+        self.captures = self.captures + 1
+        self.captureLatencies.append(
+            (self.tickCount - target.spawnTick) * TICK)
+
+    def targetKind(self, target):
+        # KIND_SPIDER or KIND_LEAF
+        if target.guid == "S":
+            return ants_engine.KIND_SPIDER
+        return ants_engine.KIND_LEAF
+
+    def newId(self):
+        # Next entity id, unique over the life of the world (a pooled
+        # target gets a new one on each spawn)
+        uid = self.nextId
+        self.nextId = uid + 1
+        return uid
+
+    def captureCount(self):
+        # Number of targets delivered so far
+        return self.captures
+
+    def releaseTarget(self, target):
+        """
+        Take a delivered target out of the world & back to its pool,
+        leaving only an entry in the archive.
+        Called once both ants of the pair are back in the nest.
+        """
+        if self.releaseHook is not None:
+            self.releaseHook(target)
+
+        self.archive.add(
+            self.targetKind(target),
+            target.center_x, target.center_y, target.angle)
+        self.removeTarget(target)
+
+    def removeTarget(self, target):
+        # Take target out of the world & back to its pool
+        target.registry.remove(target)
+        target.registry = None
+        self.grid.remove(target)
+        if self.engine is not None:
+            self.engine.remove(target)
+        self.previous.pop(target, None)
+        target.world = None
+
+        if target.guid == "S":
+            del self.spiders[target]
+            self.spiderPool.release(target)
+        else:
+            del self.leafs[target]
+            self.leafPool.release(target)
+
+    def emigrants(self):
+        """
+        (target, edge) for each fresh target beyond an open edge of
+        the hunting ground, to be handed over to the neighbouring
+        world (see ants_shards.py) & removed via removeTarget().
+        """
+        edges = self.openEdges
+        if not edges:
+            return []
+        found = []
+        for spider in self.spidersRegistry.members(TARGET_FRESH):
+            if spider.center_x < 0 and EDGE_WEST in edges:
+                found.append((spider, EDGE_WEST))
+            elif spider.center_y < 0 and EDGE_SOUTH in edges:
+                found.append((spider, EDGE_SOUTH))
+            elif (spider.center_y > SCREEN_HEIGHT
+                    and EDGE_NORTH in edges):
+                found.append((spider, EDGE_NORTH))
+
+        # Leaves only float down
+        if EDGE_SOUTH in edges:
+            for leaf in self.leafsRegistry.members(TARGET_FRESH):
+                if leaf.center_y < 0:
+                    found.append((leaf, EDGE_SOUTH))
+        return found
+
+    def clear(self):
+        """
+        Empty world at tick 0, as set up by setup() before creating
+        the ants, spiders & leaves (also used by ants_snapshot.load)
+        """
+        # Entity lists
+        self.antsBig = []
+        self.antsSmall = []
+        self.leafs = {}
+        self.spiders = {}
+        self.tickCount = 0
+        self.simTime = 0.0
+        self.previous = {}
+        self.captureLatencies = []
+        self.captures = 0
+        self.nextId = 0
+        self.archive = PreyArchive()
+        self.rng = random.Random(self.seed)
+
+        self.spiderPool = Pool(
+            lambda: Spider(*TARGET_LOOKS[ants_engine.KIND_SPIDER]),
+            self.poolSize)
+        self.leafPool = Pool(
+            lambda: Leaf(*TARGET_LOOKS[ants_engine.KIND_LEAF], 0),
+            self.poolSize)
+
+        self.antsBigRegistry = Registry(ANT_STATES)
+        self.antsSmallRegistry = Registry(ANT_STATES)
+        self.leafsRegistry = Registry(TARGET_STATES)
+        self.spidersRegistry = Registry(TARGET_STATES)
+        self.grid = SpatialHash()
+        if self.dispatchName == ants_dispatch.DISPATCH_TIMED:
+            self.dispatcher.reset()
+
+        if self.engineName == ENGINE_NUMPY:
+            self.engine = ants_engine.MotionEngine()
+        else:
+            self.engine = None
+
+    def setup(self):
+        # Fresh world with the configured number of ants & targets
+        self.clear()
+
+        # Create the leafs
+        # Keep margin of 100 from ant's nest
+        xRange = SCREEN_WIDTH - 2 * NEST_RADIUS - 100
+
+        # First leaf at x value of 50
+        if self.countLeafs > 0:
+            spacing = (xRange - 50) / self.countLeafs
+
+        for n in range(self.countLeafs):
+            centerX = 50 + n * spacing
+            self.spawnLeaf(centerX, SCREEN_HEIGHT)
+
+        # Create the spiders
+        if self.countSpiders > 0:
+            spacing = (SCREEN_HEIGHT - 40) / self.countSpiders
+
+        for n in range(self.countSpiders):
+            self.spawnSpider(20, 20 + n * spacing)
+
+        # Create the ants, half big & half small
+        rr = 0.7 * NEST_RADIUS
+        halfCount = self.countAnts // 2
+
+        for n in range(self.countAnts):
+            if n < halfCount:
+                ant = Ant(
+                    "ant.png",
+                    SCALING_BIG_ANT,
+                    self.speedBigAnt,
+                    self.accelTiers,
+                    self.rng)
+                ant.uid = self.newId()
+                ant.center_x = NEST_CENTER_X
+                ant.center_y = NEST_CENTER_Y
+                ant.scatter(ant, rr)
+                self.track(ant, ants_engine.KIND_ANT)
+                self.register(ant, self.antsBigRegistry, ant.mode)
+                self.antsBig.append(ant)
+            else:
+                ant = Ant(
+                    "ant.png",
+                    SCALING_SMALL_ANT,
+                    self.speedSmallAnt,
+                    self.accelTiers,
+                    self.rng)
+                ant.uid = self.newId()
+                ant.center_x = NEST_CENTER_X
+                ant.center_y = NEST_CENTER_Y
+                ant.scatter(ant, rr)
+                self.track(ant, ants_engine.KIND_ANT)
+                self.register(ant, self.antsSmallRegistry, ant.mode)
+                self.antsSmall.append(ant)
+
+    def step(self, deltaTime):
+        """ Movement and game logic for one tick """
+        prof = self.profiler
+        if prof is not None:
+            t = prof.start()
+
+        # Cosmetic work left out below full / reduced quality
+        tilt = self.quality >= QUALITY_FULL
+        wander = self.quality > QUALITY_MINIMAL
+
+        if self.engine is not None:
+            # All entities in one vectorized pass
+            self.engine.advance(tilt, wander)
+        else:
+            for ants in (self.antsBig, self.antsSmall):
+                if tilt:
+                    for ant in ants:
+                        ant.animate()
+                if wander:
+                    for ant in ants:
+                        ant.idleMove()
+
+            # Targets stop moving once hit, so only the fresh &
+            # locked ones need a visit.
+            for leaf in self.leafsRegistry.members(
+                    TARGET_FRESH, TARGET_LOCKED):
+                leaf.animate(tilt)
+
+            for spider in self.spidersRegistry.members(
+                    TARGET_FRESH, TARGET_LOCKED):
+                spider.animate(tilt)
+
+        if prof is not None:
+            t = prof.lap("update.animate", t)
+
+        self.getTargetSpider(deltaTime)
+        if prof is not None:
+            t = prof.lap("update.getTargetSpider", t)
+
+        self.getTargetLeaf(deltaTime)
+        if prof is not None:
+            t = prof.lap("update.getTargetLeaf", t)
+
+        self.updateGrid()
+        if prof is not None:
+            prof.lap("update.grid", t)
+
+        self.tickCount = self.tickCount + 1
+        self.simTime = self.simTime + deltaTime
+
+    def setQuality(self, level):
+        """
+        Set the quality level (see ants_governor.py) of the following
+        ticks. Changes are logged to the spawn recorder, if any, so
+        that a replay takes them at the same tick.
+        """
+        if level == self.quality:
+            return
+        self.quality = level
+        if self.recorder is not None:
+            self.recorder.quality(self.tickCount, level)
+
+    def updateGrid(self):
+        """ Re-file the entities that moved into a different cell """
+        if self.engine is not None:
+            for entity, key in self.engine.changedCells(
+                    self.grid.cellSize):
+                self.grid.move(entity, key)
+            return
+
+        grid = self.grid
+        for ants in (self.antsBigRegistry, self.antsSmallRegistry):
+            for ant in ants.members(*ANT_STATES):
+                grid.update(ant)
+                if ant.targetSprite is not None:
+                    # Also covers targets just dropped at holding point
+                    grid.update(ant.targetSprite)
+
+        for targets in (self.spidersRegistry, self.leafsRegistry):
+            for target in targets.members(TARGET_FRESH, TARGET_LOCKED):
+                grid.update(target)
+
+    def track(self, entity, kind):
+        # Hand a new entity over to the motion engine, if any,
+        # & file it into the spatial hash.
+        entity.world = self
+        if self.engine is not None:
+            self.engine.add(entity, kind)
+        self.grid.insert(entity)
+
+    def trackMany(self, entities, kind, values=None):
+        # track() for a list of entities of the same kind, in bulk.
+        # With the NumPy engine, values may hold their motion
+        # attributes instead, see ants_engine.EntityArrays.addMany().
+        for entity in entities:
+            entity.world = self
+        if self.engine is None:
+            for entity in entities:
+                self.grid.insert(entity)
+            return
+        keys = self.engine.addMany(
+            entities, kind, values, self.grid.cellSize)
+        self.grid.insertMany(entities, keys)
+
+    def nearestIdleAnts(self, x, y, n, ants):
+        # Up to n idle ants of given registry nearest to (x, y)
+        stateOf = ants.stateOf
+        return self.grid.nearest(
+            x, y, n,
+            lambda entity: stateOf.get(entity) == ANT_IDLE)
+
+    def targetsWithin(self, x, y, radius, targets, state=None):
+        # Targets of given registry (& state, if given) near (x, y)
+        stateOf = targets.stateOf
+        if state is None:
+            return self.grid.within(
+                x, y, radius, lambda entity: entity in stateOf)
+        return self.grid.within(
+            x, y, radius, lambda entity: stateOf.get(entity) == state)
+
+    def allEntities(self):
+        # Every entity, in drawing order
+        return (self.antsBig + self.antsSmall
+                + list(self.spiders) + list(self.leafs))
+
+    def savePrevious(self):
+        # Remember current positions & angles for render interpolation
+        if self.engine is not None:
+            self.engine.savePrevious()
+            return
+        self.previous = {
+            entity: (entity.center_x, entity.center_y, entity.angle)
+            for entity in self.allEntities()}
+
+    def lerpTransforms(self, alpha):
+        """
+        (entity, x, y, angle) for every entity, at fraction alpha
+        of the way from the previous tick to the current one.
+        """
+        if self.engine is not None:
+            return self.engine.lerpTransforms(alpha, TELEPORT_SPAN)
+
+        found = []
+        back = 1.0 - alpha
+        for entity in self.allEntities():
+            x = entity.center_x
+            y = entity.center_y
+            angle = entity.angle
+            prev = self.previous.get(entity)
+            if prev is not None:
+                dx = x - prev[0]
+                dy = y - prev[1]
+                if dx * dx + dy * dy <= TELEPORT_SPAN * TELEPORT_SPAN:
+                    # Turn the shortest way round
+                    dAngle = (angle - prev[2] + 180) % 360 - 180
+                    x = x - dx * back
+                    y = y - dy * back
+                    angle = angle - dAngle * back
+            found.append((entity, x, y, angle))
+        return found
+
+    def zoneAt(self, x, y):
+        # Name of the zone (nest, store, prison) at (x, y), or None
+        zone = self.zones.zoneAt(x, y)
+        if zone is None:
+            return None
+        return zone.name
+
+    def register(self, entity, registry, state):
+        # Put entity into the lifecycle registry it belongs to
+        entity.registry = registry
+        registry.add(entity, state)
+        if (self.dispatchName == ants_dispatch.DISPATCH_TIMED
+                and isinstance(entity, Target)
+                and state == TARGET_FRESH):
+            self.dispatcher.schedule(self, entity)
+
+    def registerMany(self, entities, registry, states):
+        # register() for entities & their states, pairwise
+        for entity in entities:
+            entity.registry = registry
+        registry.addMany(entities, states)
+        if self.dispatchName == ants_dispatch.DISPATCH_TIMED:
+            for entity, state in zip(entities, states):
+                if isinstance(entity, Target) and state == TARGET_FRESH:
+                    self.dispatcher.schedule(self, entity)
+
+    def canSpawnAt(self, x, y):
+        # Spawning is not effective too close to ants nest,
+        # or inside any of nest, store, prison & the obstacles.
+        return (x <= SPAWN_X_MAX and self.zones.zoneAt(x, y) is None
+                and self.obstacleZones.zoneAt(x, y) is None)
+
+    def obstacleAt(self, x, y):
+        # Obstacle zone containing (x, y), or None
+        return self.obstacleZones.zoneAt(x, y)
+
+    def setObstacles(self, obstacles):
+        """
+        Replace the obstacles by the circles (x, y, radius) given &
+        recompute the flow fields that carrying & returning ants
+        route by (see ants_flow.py). Obstacles must keep clear of
+        nest, store & prison.
+        Obstacles are part of config(), so a spawn recording or
+        snapshot keeps those of the time it was started / taken.
+        """
+        obstacles = [tuple(float(n) for n in obstacle)
+                     for obstacle in obstacles]
+        zones = []
+        for x, y, radius in obstacles:
+            for zone in self.zones.zones:
+                if zone.contains(x, y, radius):
+                    raise ValueError("Obstacle at (%g, %g) overlaps the %s"
+                                     % (x, y, zone.name))
+            zones.append(Zone(ZONE_OBSTACLE, x, y, radius))
+
+        self.obstacles = obstacles
+        self.obstacleZones = ZoneIndex(zones)
+        if not zones:
+            # Straight lines, as ever
+            self.flow = None
+        elif self.flow is None:
+            self.flow = FlowFields(
+                SCREEN_WIDTH, SCREEN_HEIGHT, self.zones.zones, zones)
+        else:
+            self.flow.setObstacles(zones)
+
+    def config(self):
+        # Constructor arguments re-creating this world, minus engine
+        # (both engines run identically), see ants_replay.py
+        return {
+            "countAnts": self.countAnts,
+            "countSpiders": self.countSpiders,
+            "countLeafs": self.countLeafs,
+            "dispatch": self.dispatchName,
+            "pursuit": self.pursuitName,
+            "poolSize": self.poolSize,
+            "speedBigAnt": self.speedBigAnt,
+            "speedSmallAnt": self.speedSmallAnt,
+            "senseDelay": self.senseDelay,
+            "accelTiers": [list(tier) for tier in self.accelTiers],
+            "seed": self.seed,
+            "obstacles": [list(obstacle) for obstacle in self.obstacles],
+            }
+
+    def spawnSpider(self, x, y):
+        # Create Spider at given position
+        return self.spawnSpiders([(x, y)])[0]
+
+    def spawnLeaf(self, x, y):
+        # Create Leaf at given position
+        return self.spawnLeafs([(x, y)])[0]
+
+    def spawnSpiders(self, points):
+        # Create a Spider at each (x, y) of points, in one go,
+        # reusing pooled ones where possible
+        spiders = []
+        for x, y in points:
+            if self.recorder is not None:
+                self.recorder.spawn(
+                    self.tickCount, ants_engine.KIND_SPIDER, x, y)
+            spider = self.spiderPool.acquire()
+            spider.reset()
+            spider.openBounds(self.openEdges)
+            spider.uid = self.newId()
+            spider.guid = "S"
+            spider.center_x = x
+            spider.center_y = y
+            spider.spawnTick = self.tickCount
+            spiders.append(spider)
+            if self.events is not None:
+                self.events.emit(
+                    self.tickCount, EVENT_SPAWN, ants_engine.KIND_SPIDER,
+                    -1, spider.uid, x, y)
+
+        self.trackMany(spiders, ants_engine.KIND_SPIDER)
+        for spider in spiders:
+            self.register(spider, self.spidersRegistry, spider.state)
+            self.spiders[spider] = None
+        return spiders
+
+    def spawnLeafs(self, points):
+        # Create a Leaf at each (x, y) of points, in one go,
+        # reusing pooled ones where possible
+        leafs = []
+        for x, y in points:
+            if self.recorder is not None:
+                self.recorder.spawn(
+                    self.tickCount, ants_engine.KIND_LEAF, x, y)
+            leaf = self.leafPool.acquire()
+            leaf.reset(x)
+            leaf.openBounds(self.openEdges)
+            leaf.uid = self.newId()
+            leaf.guid = "L"
+            leaf.center_x = x
+            leaf.center_y = y
+            leaf.spawnTick = self.tickCount
+            leafs.append(leaf)
+            if self.events is not None:
+                self.events.emit(
+                    self.tickCount, EVENT_SPAWN, ants_engine.KIND_LEAF,
+                    -1, leaf.uid, x, y)
+
+        self.trackMany(leafs, ants_engine.KIND_LEAF)
+        for leaf in leafs:
+            self.register(leaf, self.leafsRegistry, leaf.state)
+            self.leafs[leaf] = None
+        return leafs
+
+#====================
+def main():
+    """ Headless run: step the world & report tick rate """
+    parser = argparse.ArgumentParser(
+        description="Run Arc_AntsHunt simulation without a window")
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--ants", type=int, default=COUNT_ANTS)
+    parser.add_argument("--spiders", type=int, default=COUNT_SPIDERS)
+    parser.add_argument("--leafs", type=int, default=COUNT_LEAFS)
+    parser.add_argument(
+        "--engine",
+        choices=(ENGINE_PYTHON, ENGINE_NUMPY),
+        default=ENGINE_PYTHON)
+    parser.add_argument(
+        "--dispatch",
+        choices=(ants_dispatch.DISPATCH_FIFO, ants_dispatch.DISPATCH_BATCH,
+                 ants_dispatch.DISPATCH_TIMED),
+        default=ants_dispatch.DISPATCH_FIFO)
+    parser.add_argument(
+        "--pursuit",
+        choices=(ants_pursuit.PURSUIT_DIRECT,
+                 ants_pursuit.PURSUIT_INTERCEPT),
+        default=ants_pursuit.PURSUIT_DIRECT)
+    parser.add_argument(
+        "--obstacles", action="store_true",
+        help="place DEMO_OBSTACLES for the ants to route round")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--snapshot", metavar="PATH",
+        help="start from this snapshot instead of a fresh world")
+    parser.add_argument(
+        "--save", metavar="PATH",
+        help="save a snapshot of the world after the run")
+    parser.add_argument(
+        "--events", metavar="PATH",
+        help="log lifecycle events, as JSON lines if PATH ends in"
+        " .jsonl, else binary (see ants_events.py)")
+    args = parser.parse_args()
+
+    # ants_snapshot imports this module, so import it only when needed
+    import ants_snapshot
+
+    events = EventLog(args.events) if args.events else None
+    if args.snapshot:
+        start = time.perf_counter()
+        world = ants_snapshot.load(args.snapshot, args.engine)
+        world.events = events
+        print("Loaded %s (tick %d) in %.3f sec" % (
+            args.snapshot, world.tickCount, time.perf_counter() - start))
+    else:
+        world = World(
+            args.ants, args.spiders, args.leafs, args.engine,
+            args.dispatch, seed=args.seed, pursuit=args.pursuit,
+            obstacles=DEMO_OBSTACLES if args.obstacles else ())
+        world.events = events
+        world.setup()
+
+    start = time.perf_counter()
+    for n in range(args.ticks):
+        world.step(TICK)
+    elapsed = time.perf_counter() - start
+
+    print("%d ticks in %.3f sec (%.0f ticks/sec)" % (
+        args.ticks, elapsed, args.ticks / max(elapsed, 1e-9)))
+
+    if events is not None:
+        events.close()
+        print("%d events logged to %s, %d dropped" % (
+            events.written, args.events, events.dropped))
+
+    if args.save:
+        ants_snapshot.save(world, args.save)
+        print("Saved %s (tick %d)" % (args.save, world.tickCount))
+
+#====================
+if __name__ == "__main__":
+    main()